@@ -1,9 +1,57 @@
 #-*- coding: utf-8 -*-
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+from utils.async_pool import iterate_in_thread
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+
+class PooledASGIHandler(ASGIHandler):
+    """
+    ASGI обработчик, который перебирает потоковые ответы
+    (выгрузка паролей) в отдельном потоке, а не в цикле событий:
+    генератор ответа ходит в базу, а ORM нельзя вызывать из async кода.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            response_headers.append(
+                (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers,
+        })
+
+        with ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='asgi-stream') as executor:
+            async for part in iterate_in_thread(response, executor):
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+django.setup(set_prefix=False)
+application = PooledASGIHandler()
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+# Настройки gunicorn (entrypoint.sh: --config python:config.gunicorn)
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker) -> None:
+    # Метрики завершённого воркера остаются в сумме счётчиков,
+    # но его mmap файлы больше не читаются как живые
+    multiprocess.mark_process_dead(worker.pid)
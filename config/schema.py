@@ -3,20 +3,24 @@
 import graphql_jwt
 from graphene import ObjectType, Schema
 
-from users.schema import Mutation as UsersMutation
+from passwords.schema import (Mutation as PasswordsMutation,
+                              Query as PasswordsQuery)
+from users.schema import Mutation as UsersMutation, Query as UsersQuery
 
 
 class Query(
+    UsersQuery,
+    PasswordsQuery,
     ObjectType
 ):
     pass
 
 class Mutation(
     UsersMutation,
+    PasswordsMutation,
     ObjectType,
 ):
     verify_token = graphql_jwt.Verify.Field()
     token_auth = graphql_jwt.ObtainJSONWebToken.Field()
 
-# query потом
-schema = Schema(mutation=Mutation)
+schema = Schema(query=Query, mutation=Mutation)
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 
 import os
+import sys
+
+from django.core.exceptions import ImproperlyConfigured
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -9,6 +12,9 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 
 DEBUG = os.getenv('DEBUG') == 'True'
 
+# Запуск тестов (manage.py test)
+TESTING = sys.argv[1:2] == ['test']
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -27,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.middleware.DatabaseMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -59,16 +66,58 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# wsgi - gunicorn с синхронными воркерами, asgi - gunicorn с воркерами
+# uvicorn (см. entrypoint.sh). В asgi режиме API выполняется в пуле
+# из ASGI_THREADS потоков на процесс (utils.async_pool)
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
+
+# Соединения с базой (./manage.sh bench_db_connections сравнивает режимы):
+# DB_CONN_MAX_AGE - сколько секунд держать соединение между запросами
+# (0 - новое на каждый запрос, none - без ограничения), перед повторным
+# использованием соединение проверяется (DB_HEALTH_CHECKS).
+# DB_POOL_MODE=pgbouncer - подключение через PgBouncer в режиме
+# transaction pooling: серверные курсоры отключаются, потому что
+# не переживают смену серверного соединения между транзакциями
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '60')
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'direct')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'utils.backends.postgresql',
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
-        'HOST': 'db'
+        'HOST': os.getenv('DB_HOST', 'db'),
+        'PORT': os.getenv('DB_PORT', ''),
+        'CONN_MAX_AGE': (
+            None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE)
+        ),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_HEALTH_CHECKS', 'True') == 'True',
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOL_MODE == 'pgbouncer',
+        'OPTIONS': {
+            'connect_timeout': 5,
+            # Обнаруживаем оборванные постоянные соединения
+            'keepalives': 1,
+            'keepalives_idle': 60,
+            'keepalives_interval': 10,
+            'keepalives_count': 3,
+        },
     }
 }
 
+# Реплика для чтения (utils.routers.ReplicaRouter): GraphQL запросы
+# без мутаций читают с DB_REPLICA_HOST, всё остальное - с основной базы
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['utils.routers.ReplicaRouter']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -85,8 +134,38 @@ AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
+    {
+        'NAME': 'utils.breached.BreachedPasswordValidator',
+    },
 ]
 
+# Хэшер новых паролей (utils.hashers): pbkdf2, argon2 или bcrypt.
+# Остальные остаются в списке, чтобы проверять старые пароли
+# и перехэшировать их при входе. Стоимость подбирается командой
+# ./manage.sh tune_hasher под целевое время на конкретном сервере.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'utils.hashers.TunablePBKDF2PasswordHasher',
+    'argon2': 'utils.hashers.TunableArgon2PasswordHasher',
+    'bcrypt': 'utils.hashers.TunableBCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS.pop(PASSWORD_HASHER)] + list(
+    _PASSWORD_HASHERS.values()
+)
+
+PBKDF2_ITERATIONS = int(os.getenv('PBKDF2_ITERATIONS', 216000))
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', 512))
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', 2))
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+
+# Пул хэширования паролей (utils.hashers.run_hashing): не больше
+# PASSWORD_HASHING_WORKERS хэшей одновременно, ещё QUEUE_SIZE ждут
+# в очереди до QUEUE_TIMEOUT секунд. 0 потоков - хэшировать в потоке запроса
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', 2))
+PASSWORD_HASHING_QUEUE_SIZE = int(os.getenv('PASSWORD_HASHING_QUEUE_SIZE', 32))
+PASSWORD_HASHING_QUEUE_TIMEOUT = 10
+
 
 LANGUAGE_CODE = 'ru-RU'
 
@@ -109,9 +188,29 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 GRAPHENE = {
-    "SCHEMA": "config.schema.schema"
+    "SCHEMA": "config.schema.schema",
+    "MIDDLEWARE": [
+        "graphql_jwt.middleware.JSONWebTokenMiddleware",
+        "utils.tracing.TracingMiddleware",
+    ],
+}
+
+# GraphiQL на /api/ - по умолчанию только в DEBUG. Интроспекция
+# работает и без него обычными POST запросами
+GRAPHIQL = os.getenv('GRAPHIQL', str(DEBUG)) == 'True'
+
+GRAPHQL_JWT = {
+    'JWT_GET_USER_BY_NATURAL_KEY_HANDLER':
+        'users.services.auth.get_user_by_natural_key',
+    'JWT_ENCODE_HANDLER': 'users.services.auth.jwt_encode',
+    'JWT_DECODE_HANDLER': 'users.services.auth.jwt_decode',
 }
 
+AUTHENTICATION_BACKENDS = [
+    'graphql_jwt.backends.JSONWebTokenBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 try:
     from .local_settings import *
 except ImportError:
@@ -119,3 +218,103 @@ except ImportError:
 
 
 INACTIVE_USER_DAYS = 183
+
+# Буферизация событий активности (users.services.record_activity):
+# буфер сбрасывается после запроса, когда в нём ACTIVITY_FLUSH_SIZE событий
+# или самое старое событие ждёт дольше ACTIVITY_FLUSH_INTERVAL секунд
+ACTIVITY_FLUSH_SIZE = 500
+ACTIVITY_FLUSH_INTERVAL = 5
+ACTIVITY_BUFFER_LIMIT = 10000
+
+# Партиции таблицы активности (./manage.sh prune_activity, раз в сутки):
+# создаются на ACTIVITY_PARTITIONS_AHEAD месяцев вперёд, удаляются когда
+# старше INACTIVE_USER_DAYS + ACTIVITY_RETENTION_GRACE_DAYS дней
+ACTIVITY_PARTITIONS_AHEAD = 2
+ACTIVITY_RETENTION_GRACE_DAYS = 30
+ACTIVITY_ARCHIVE_SCHEMA = 'archive'
+
+# Кэш пользователей по JWT (users.services.get_user_by_natural_key):
+# JWT_USER_CACHE_SIZE записей на процесс на JWT_USER_CACHE_TTL секунд,
+# JWT_USER_CACHE_BACKEND - имя общего кэша из CACHES или None
+JWT_USER_CACHE_SIZE = 10000
+JWT_USER_CACHE_TTL = 60
+JWT_USER_CACHE_BACKEND = None
+
+# Закрепление за основной базой после записи (utils.routers):
+# REPLICA_STICKY_SECONDS секунд пользователь читает свои изменения
+# с основной базы, пока их догоняет реплика.
+# REPLICA_PIN_CACHE_BACKEND - имя общего кэша из CACHES или None
+REPLICA_STICKY_SECONDS = 5
+REPLICA_PIN_CACHE_SIZE = 10000
+REPLICA_PIN_CACHE_BACKEND = None
+
+# Кэш запросов GraphQL (utils.graphql): GRAPHQL_DOCUMENT_CACHE_SIZE
+# разобранных и проверенных документов на процесс, реестр Automatic
+# Persisted Queries - GRAPHQL_PERSISTED_QUERIES_SIZE текстов запросов
+# на GRAPHQL_PERSISTED_QUERIES_TTL секунд,
+# GRAPHQL_PERSISTED_QUERIES_BACKEND - имя общего кэша из CACHES или None
+GRAPHQL_DOCUMENT_CACHE_SIZE = 500
+GRAPHQL_PERSISTED_QUERIES_SIZE = 1000
+GRAPHQL_PERSISTED_QUERIES_TTL = 60 * 60 * 24
+GRAPHQL_PERSISTED_QUERIES_BACKEND = None
+
+# Ограничение сложности запросов GraphQL (utils.complexity): запросы
+# дороже GRAPHQL_MAX_COST объектов или глубже GRAPHQL_MAX_DEPTH
+# отклоняются до выполнения. Для списков без first/last оценка
+# GRAPHQL_DEFAULT_LIST_SIZE элементов
+GRAPHQL_MAX_COST = 10000
+GRAPHQL_MAX_DEPTH = 10
+GRAPHQL_DEFAULT_LIST_SIZE = 50
+
+# Трассировка GraphQL (utils.tracing): время резолверов и SQL запросы
+# отдаются в extensions.tracing запросам с заголовком X-GraphQL-Tracing
+# (в DEBUG или персоналу), агрегаты - всегда на /metrics. SQL, повторённый
+# в запросе больше GRAPHQL_N_PLUS_ONE_THRESHOLD раз, пишется в лог как N+1
+GRAPHQL_TRACING_HEADER = 'HTTP_X_GRAPHQL_TRACING'
+GRAPHQL_N_PLUS_ONE_THRESHOLD = 10
+
+# Токен для /metrics (Authorization: Bearer <token>), без него - открыт.
+# Имён GraphQL операций в метриках не больше METRICS_MAX_OPERATIONS
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_MAX_OPERATIONS = 200
+
+# Шифрование паролей хранилища (passwords.services.crypto): AES-256-GCM,
+# ключ пользователя выводится scrypt (VAULT_KDF_*) из VAULT_ENCRYPTION_KEY.
+# VAULT_ENCRYPTION_KEY обязателен и не зависит от SECRET_KEY. Его нельзя
+# менять никогда: со сменой ключа все сохранённые пароли становятся
+# нечитаемыми, а отпечатки паролей (passwords.services.health) - неверными.
+# Выведенные ключи хранятся VAULT_KEY_CACHE_TTL секунд, не больше
+# VAULT_KEY_CACHE_SIZE на процесс
+VAULT_ENCRYPTION_KEY = os.getenv('VAULT_ENCRYPTION_KEY')
+if not VAULT_ENCRYPTION_KEY:
+    if not (DEBUG or TESTING):
+        raise ImproperlyConfigured('Не задан VAULT_ENCRYPTION_KEY')
+    # Только для разработки и тестов
+    VAULT_ENCRYPTION_KEY = 'insecure-development-vault-key'
+VAULT_KDF_N = 2 ** 14
+VAULT_KDF_R = 8
+VAULT_KDF_P = 1
+VAULT_KEY_CACHE_SIZE = 1000
+VAULT_KEY_CACHE_TTL = 300
+
+# Локальная база утёкших паролей (utils.breached.BreachedPasswordValidator),
+# собирается командой build_breach_corpus. Файл отображается в память
+# и общий для всех воркеров. Без файла проверка отключена
+BREACHED_PASSWORDS_CORPUS = os.getenv('BREACHED_PASSWORDS_CORPUS')
+
+# Отчёт о здоровье хранилища (passwords.services.health): слабые - стойкость
+# ниже VAULT_WEAK_STRENGTH (0-4), устаревшие - пароль не менялся дольше
+# VAULT_STALE_DAYS дней. Отчёт кэшируется до следующей ревизии хранилища
+VAULT_WEAK_STRENGTH = 2
+VAULT_STALE_DAYS = 365
+VAULT_HEALTH_CACHE_SIZE = 10000
+VAULT_HEALTH_CACHE_TTL = 60 * 60
+VAULT_HEALTH_CACHE_BACKEND = None
+
+# Автозаполнение (passwords.services.autofill): карта доменов хранилищ
+# в памяти процесса - не больше AUTOFILL_CACHE_SIZE пользователей
+# и AUTOFILL_MAX_DOMAINS доменов на пользователя, карта сбрасывается
+# при смене ревизии хранилища или через AUTOFILL_CACHE_TTL секунд
+AUTOFILL_CACHE_SIZE = 10000
+AUTOFILL_CACHE_TTL = 60 * 10
+AUTOFILL_MAX_DOMAINS = 256
@@ -1,7 +1,5 @@
 # -*- coding: utf-8 -*-
 
-from graphene_django.views import GraphQLView
-
 from django.contrib import admin
 from django.urls import path, re_path
 from django.conf import settings
@@ -9,10 +7,33 @@ from django.conf.urls.static import static
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 from django.views.generic import TemplateView
 
+from passwords.views import export_passwords_view, import_passwords_view
+from utils.async_pool import pooled_view
+from utils.graphql import graphql_backend
+from utils.metrics import metrics_view
+from utils.views import APIGraphQLView
+
+
+graphql_view = csrf_exempt(APIGraphQLView.as_view(
+    graphiql=settings.GRAPHIQL, backend=graphql_backend,
+))
+import_view = csrf_exempt(import_passwords_view)
+export_view = export_passwords_view
+
+if settings.SERVER_MODE == 'asgi':
+    # Запросы к API выполняются в ограниченном пуле потоков, а не
+    # в единственном потоке, который Django 3.1 отдаёт синхронным view
+    graphql_view = pooled_view(graphql_view)
+    import_view = pooled_view(import_view)
+    export_view = pooled_view(export_view)
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path('api/', graphql_view),
+    path('api/passwords/import/', import_view),
+    path('api/passwords/export/', export_view),
+    path('metrics', metrics_view),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 urlpatterns += [
@@ -3,4 +3,17 @@
 ./manage.sh migrate --no-input
 ./manage.sh collectstatic --no-input
 
-gunicorn config.wsgi:application --bind 0.0.0.0:8000
+# Метрики всех воркеров gunicorn собираются через общий каталог
+# (utils.metrics), он очищается при каждом запуске
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+if [[ $SERVER_MODE = 'asgi' ]]; then
+    gunicorn config.asgi:application --bind 0.0.0.0:8000 \
+        --config python:config.gunicorn \
+        --worker-class uvicorn.workers.UvicornWorker
+else
+    gunicorn config.wsgi:application --bind 0.0.0.0:8000 \
+        --config python:config.gunicorn
+fi
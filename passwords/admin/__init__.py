@@ -1 +1,3 @@
 # -*- coding: utf-8 -*-
+
+from .password import PasswordAdmin
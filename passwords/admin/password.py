@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+from itertools import groupby
+
+from django.contrib import admin
+from django.db.models import QuerySet
+from django.forms import ModelForm
+from django.http import HttpRequest
+
+from passwords.models import Password
+from passwords.services import (allocate_revision, bulk_delete_passwords,
+                                update_url_index)
+from passwords.services.bulk import BULK_MAX_ITEMS
+
+
+@admin.register(Password)
+class PasswordAdmin(admin.ModelAdmin):
+    # Сам (зашифрованный) пароль в админке не показываем
+    exclude = (
+        'passwords',
+    )
+
+    readonly_fields = (
+        'owner',
+        'updated_at',
+        'revision',
+    )
+
+    list_display = (
+        'title',
+        'url',
+        'login',
+        'owner',
+    )
+
+    list_select_related = (
+        'owner__user',
+    )
+
+    # ILIKE по триграммным индексам (passwords.services.search)
+    search_fields = (
+        'title__trgm_icontains',
+        'url__trgm_icontains',
+        'login__trgm_icontains',
+        'owner__user__username__trgm_icontains',
+    )
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def save_model(
+        self, request: HttpRequest, obj: Password, form: ModelForm, change: bool,
+    ) -> None:
+        # Изменение из админки тоже должно дойти до клиентов при синхронизации
+        obj.revision = allocate_revision(obj.owner_id)
+        # Хост и домен для автозаполнения (passwords.services.autofill)
+        if 'url' in form.changed_data:
+            update_url_index(obj)
+        super().save_model(request, obj, form, change)
+
+    def delete_model(self, request: HttpRequest, obj: Password) -> None:
+        bulk_delete_passwords(owner_id=obj.owner_id, ids=[obj.pk])
+
+    def delete_queryset(self, request: HttpRequest, queryset: QuerySet) -> None:
+        passwords = queryset.order_by('owner_id').values_list('owner_id', 'pk')
+        for owner_id, group in groupby(passwords, key=lambda row: row[0]):
+            ids = [pk for _, pk in group]
+            for start in range(0, len(ids), BULK_MAX_ITEMS):
+                bulk_delete_passwords(
+                    owner_id=owner_id, ids=ids[start:start + BULK_MAX_ITEMS],
+                )
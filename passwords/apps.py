@@ -6,3 +6,6 @@ from django.apps import AppConfig
 class PasswordsConfig(AppConfig):
     name = 'passwords'
     label = 'passwords'
+
+    def ready(self) -> None:
+        from passwords import signals
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+from django.db import models
+
+
+class SyncObjectChoices(models.TextChoices):
+    PASSWORD = 'password', 'пароль'
+    TAG = 'tag', 'тег'
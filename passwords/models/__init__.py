@@ -2,4 +2,4 @@
 
 from .passwords import Password
 from .tags import Tag
-
+from .tombstone import Tombstone
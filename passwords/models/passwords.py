@@ -11,7 +11,7 @@ class Password(models.Model):
     owner = models.ForeignKey(
             'users.Profile',
             on_delete=models.CASCADE,
-            related_name='tag_owner'
+            related_name='passwords'
     )
 
     title = models.CharField(
@@ -25,6 +25,22 @@ class Password(models.Model):
             null=True, blank=True
     )
 
+    # Хост и регистрируемый домен url для автозаполнения
+    # (passwords.services.autofill), заполняются при записи
+    host = models.CharField(
+            max_length=253,
+            null=True, blank=True,
+            editable=False,
+            verbose_name='Хост'
+    )
+
+    domain = models.CharField(
+            max_length=253,
+            null=True, blank=True,
+            editable=False,
+            verbose_name='Домен'
+    )
+
     login = models.CharField(
             max_length=128,
             verbose_name='Логин',
@@ -35,3 +51,49 @@ class Password(models.Model):
              verbose_name='Зашифрованный пароль',
              max_length=1024
     )
+
+    updated_at = models.DateTimeField(
+            auto_now=True,
+            verbose_name='Изменён'
+    )
+
+    # Ревизия хранилища владельца на момент последнего изменения
+    revision = models.PositiveBigIntegerField(
+            default=0,
+            verbose_name='Ревизия'
+    )
+
+    # Поля здоровья хранилища заполняются при записи пароля
+    # (passwords.services.health): HMAC открытого текста для поиска
+    # повторов, оценка стойкости 0-4 и время смены самого пароля
+    fingerprint = models.CharField(
+            max_length=64,
+            null=True, blank=True,
+            editable=False,
+            verbose_name='Отпечаток пароля'
+    )
+
+    strength = models.PositiveSmallIntegerField(
+            null=True, blank=True,
+            editable=False,
+            verbose_name='Стойкость'
+    )
+
+    password_changed_at = models.DateTimeField(
+            null=True, blank=True,
+            editable=False,
+            verbose_name='Пароль изменён'
+    )
+
+    class Meta:
+        indexes = [
+            # Автозаполнение по адресу страницы (passwords.services.autofill)
+            models.Index(fields=['owner', 'domain']),
+            # Повторы паролей (passwords.services.health)
+            models.Index(fields=['owner', 'fingerprint']),
+            # Постраничная выборка по ключу (passwords.services.pagination)
+            models.Index(fields=['owner', 'id']),
+            models.Index(fields=['owner', 'title', 'id']),
+            # Выборка изменений для синхронизации (passwords.services.sync)
+            models.Index(fields=['owner', 'revision']),
+        ]
@@ -39,3 +39,20 @@ class Tag(models.Model):
             choices=COLOR_PICKER,
             verbose_name='Цвет'
     )
+
+    updated_at = models.DateTimeField(
+            auto_now=True,
+            verbose_name='Изменён'
+    )
+
+    # Ревизия хранилища владельца на момент последнего изменения
+    revision = models.PositiveBigIntegerField(
+            default=0,
+            verbose_name='Ревизия'
+    )
+
+    class Meta:
+        indexes = [
+            # Выборка изменений для синхронизации (passwords.services.sync)
+            models.Index(fields=['owner', 'revision']),
+        ]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+
+from django.db import models
+
+from passwords.choices import SyncObjectChoices
+
+
+class Tombstone(models.Model):
+    """
+    Запись об удалённом пароле или теге.
+    По ней клиенты узнают об удалениях при синхронизации.
+    """
+
+    owner = models.ForeignKey(
+            'users.Profile',
+            on_delete=models.CASCADE,
+            related_name='tombstones'
+    )
+
+    kind = models.CharField(
+            max_length=16,
+            choices=SyncObjectChoices.choices,
+            verbose_name='Тип объекта'
+    )
+
+    object_id = models.BigIntegerField(
+            verbose_name='ID удалённого объекта'
+    )
+
+    revision = models.PositiveBigIntegerField(
+            verbose_name='Ревизия'
+    )
+
+    deleted_at = models.DateTimeField(
+            auto_now_add=True,
+            verbose_name='Удалён'
+    )
+
+    class Meta:
+        verbose_name = 'удалённый объект'
+        verbose_name_plural = 'удалённые объекты'
+        indexes = [
+            models.Index(fields=['owner', 'revision']),
+        ]
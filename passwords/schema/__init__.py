@@ -1 +1,4 @@
 # -*- coding: utf-8 -*-
+
+from .password import PasswordConnection, PasswordNode, PasswordOrder, TagNode
+from .schema import Mutation, Query
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any, Dict, List, Tuple, Type
+
+import graphene
+from django.core.exceptions import ValidationError
+from graphene import relay
+from graphql.error import GraphQLError
+from graphql_jwt.decorators import login_required
+from graphql_relay import from_global_id
+
+from passwords.services import (BulkItemError, BulkResult,
+                                bulk_delete_passwords, bulk_delete_tags,
+                                bulk_upsert_passwords)
+from users.services import get_user_profile
+
+from .password import PasswordNode, TagNode
+
+
+class BulkError(graphene.ObjectType):
+    """ Ошибка элемента пакетной мутации """
+
+    index = graphene.Int(required=True)
+    messages = graphene.List(graphene.NonNull(graphene.String), required=True)
+
+
+class TagInput(graphene.InputObjectType):
+    tag = graphene.String(required=True)
+    color = graphene.String()
+
+
+class PasswordInput(graphene.InputObjectType):
+    id = graphene.ID()
+    title = graphene.String()
+    url = graphene.String()
+    login = graphene.String()
+    passwords = graphene.String()
+    tags = graphene.List(graphene.NonNull(TagInput))
+
+
+def _decode_id(global_id: str, node: Type[graphene.ObjectType]) -> int:
+    """
+    Раскодирует глобальный relay ID объекта.
+
+    :raises ValueError: ID повреждён или выдан для другого типа
+    """
+
+    try:
+        type_name, pk = from_global_id(global_id)
+        if type_name != node._meta.name:
+            raise ValueError
+        return int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError('Некорректный ID')
+
+
+def _decode_items(
+    items: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[int], List[BulkItemError]]:
+    """
+    Раскодирует ID элементов. Элементы с некорректным ID сразу
+    уходят в ошибки, для остальных запоминается индекс в запросе.
+    """
+
+    decoded, positions, errors = [], [], []
+    for index, item in enumerate(items):
+        item = dict(item)
+        if item.get('id') is not None:
+            try:
+                item['id'] = _decode_id(item['id'], PasswordNode)
+            except ValueError as error:
+                errors.append(BulkItemError(index, [str(error)]))
+                continue
+        decoded.append(item)
+        positions.append(index)
+    return decoded, positions, errors
+
+
+def _decode_ids(
+    ids: List[str], node: Type[graphene.ObjectType],
+) -> Tuple[List[int], List[int], List[BulkItemError]]:
+    decoded, positions, errors = [], [], []
+    for index, global_id in enumerate(ids):
+        try:
+            decoded.append(_decode_id(global_id, node))
+        except ValueError as error:
+            errors.append(BulkItemError(index, [str(error)]))
+            continue
+        positions.append(index)
+    return decoded, positions, errors
+
+
+def _run_bulk(
+    info: graphene.ResolveInfo, service: Any, arguments: Dict[str, Any],
+    positions: List[int], errors: List[BulkItemError],
+) -> Tuple[List[Any], List[BulkError]]:
+    """
+    Выполняет пакетный сервис для профиля текущего пользователя
+    и возвращает индексы ошибок к нумерации исходного запроса.
+    """
+
+    profile = get_user_profile(info.context.user)
+    try:
+        result: BulkResult = service(owner_id=profile.pk, **arguments)
+    except ValidationError as error:
+        raise GraphQLError(message='\n'.join(error.messages))
+
+    errors = errors + [
+        BulkItemError(positions[error.index], error.messages)
+        for error in result.errors
+    ]
+    errors.sort(key=lambda error: error.index)
+    return result.items, [
+        BulkError(index=error.index, messages=error.messages)
+        for error in errors
+    ]
+
+
+class BulkUpsertPasswordsMutation(relay.ClientIDMutation):
+    """
+    Мутация пакетного создания и изменения паролей.
+    Все элементы применяются одной транзакцией, элементы с ошибками
+    пропускаются и возвращаются в errors.
+    """
+
+    passwords = graphene.List(graphene.NonNull(PasswordNode), required=True)
+    errors = graphene.List(graphene.NonNull(BulkError), required=True)
+
+    class Input:
+        passwords = graphene.List(graphene.NonNull(PasswordInput), required=True)
+
+    @staticmethod
+    @login_required
+    def mutate_and_get_payload(
+        root: Any,
+        info: graphene.ResolveInfo,
+        **input: Dict[str, Any]
+    ):
+        """
+        Создаёт пароли без id и изменяет пароли с id.
+
+        :param root: Корневой объект, который передаётся в мутацию.
+         Обычно не используется.
+        :param info: Информация о запросе,
+         включая контекст выполнения и аргументы.
+        :param input: Словарь со списком паролей.
+
+        :return: Объект мутации с сохранёнными паролями и ошибками.
+        """
+
+        items, positions, errors = _decode_items(input['passwords'])
+        passwords, errors = _run_bulk(
+            info, bulk_upsert_passwords, {'items': items}, positions, errors,
+        )
+        return BulkUpsertPasswordsMutation(passwords=passwords, errors=errors)
+
+
+class BulkDeletePasswordsMutation(relay.ClientIDMutation):
+    """ Мутация пакетного удаления паролей вместе с их тегами """
+
+    deleted_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+    errors = graphene.List(graphene.NonNull(BulkError), required=True)
+
+    class Input:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    @staticmethod
+    @login_required
+    def mutate_and_get_payload(
+        root: Any,
+        info: graphene.ResolveInfo,
+        **input: Dict[str, Any]
+    ):
+        """ Удаляет пароли текущего пользователя одним запросом """
+
+        ids, positions, errors = _decode_ids(input['ids'], PasswordNode)
+        deleted, errors = _run_bulk(
+            info, bulk_delete_passwords, {'ids': ids}, positions, errors,
+        )
+        return BulkDeletePasswordsMutation(
+            deleted_ids=[
+                relay.Node.to_global_id(PasswordNode._meta.name, pk)
+                for pk in deleted
+            ],
+            errors=errors,
+        )
+
+
+class BulkDeleteTagsMutation(relay.ClientIDMutation):
+    """ Мутация пакетного удаления тегов """
+
+    deleted_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+    errors = graphene.List(graphene.NonNull(BulkError), required=True)
+
+    class Input:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    @staticmethod
+    @login_required
+    def mutate_and_get_payload(
+        root: Any,
+        info: graphene.ResolveInfo,
+        **input: Dict[str, Any]
+    ):
+        """ Удаляет теги текущего пользователя одним запросом """
+
+        ids, positions, errors = _decode_ids(input['ids'], TagNode)
+        deleted, errors = _run_bulk(
+            info, bulk_delete_tags, {'ids': ids}, positions, errors,
+        )
+        return BulkDeleteTagsMutation(
+            deleted_ids=[
+                relay.Node.to_global_id(TagNode._meta.name, pk)
+                for pk in deleted
+            ],
+            errors=errors,
+        )
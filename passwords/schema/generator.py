@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+import graphene
+
+from passwords.services import GeneratedPasswords
+
+
+class GeneratedPasswordsType(graphene.ObjectType):
+    """ Предложенные пароли """
+
+    class Meta:
+        name = 'GeneratedPasswords'
+
+    passwords = graphene.List(graphene.NonNull(graphene.String), required=True)
+    entropy = graphene.Float(
+        required=True,
+        description='Энтропия одного пароля в битах',
+    )
+
+    @staticmethod
+    def resolve_passwords(generated: GeneratedPasswords, info: graphene.ResolveInfo) -> list:
+        return generated.passwords
+
+    @staticmethod
+    def resolve_entropy(generated: GeneratedPasswords, info: graphene.ResolveInfo) -> float:
+        return generated.entropy
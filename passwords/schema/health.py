@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from typing import List
+
+import graphene
+from graphene import relay
+
+from passwords.services import VaultHealth
+
+from .password import PasswordNode
+
+
+def _global_ids(ids: List[int]) -> List[str]:
+    return [relay.Node.to_global_id(PasswordNode._meta.name, pk) for pk in ids]
+
+
+class VaultHealthType(graphene.ObjectType):
+    """ Здоровье хранилища: повторы, слабые и устаревшие пароли """
+
+    class Meta:
+        name = 'VaultHealth'
+
+    revision = graphene.Int(
+        required=True,
+        description='Ревизия хранилища, на которую посчитан отчёт',
+    )
+    total = graphene.Int(required=True)
+    reused_password_ids = graphene.List(
+        graphene.NonNull(graphene.List(graphene.NonNull(graphene.ID), required=True)),
+        required=True,
+        description='Группы паролей с одинаковым значением',
+    )
+    weak_password_ids = graphene.List(
+        graphene.NonNull(graphene.ID), required=True,
+    )
+    stale_password_ids = graphene.List(
+        graphene.NonNull(graphene.ID), required=True,
+    )
+    unchecked = graphene.Int(
+        required=True,
+        description='Пароли, ещё не попавшие в отчёт',
+    )
+
+    @staticmethod
+    def resolve_revision(health: VaultHealth, info: graphene.ResolveInfo) -> int:
+        return health.revision
+
+    @staticmethod
+    def resolve_total(health: VaultHealth, info: graphene.ResolveInfo) -> int:
+        return health.total
+
+    @staticmethod
+    def resolve_reused_password_ids(
+        health: VaultHealth, info: graphene.ResolveInfo,
+    ) -> list:
+        return [_global_ids(group) for group in health.reused]
+
+    @staticmethod
+    def resolve_weak_password_ids(
+        health: VaultHealth, info: graphene.ResolveInfo,
+    ) -> list:
+        return _global_ids(health.weak)
+
+    @staticmethod
+    def resolve_stale_password_ids(
+        health: VaultHealth, info: graphene.ResolveInfo,
+    ) -> list:
+        return _global_ids(health.stale)
+
+    @staticmethod
+    def resolve_unchecked(health: VaultHealth, info: graphene.ResolveInfo) -> int:
+        return health.unchecked
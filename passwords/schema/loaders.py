@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict
+from typing import List
+
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from passwords.models import Password, Tag
+from passwords.services import decrypt_secrets
+
+
+class PasswordsByOwnerLoader(DataLoader):
+    """
+    Загружает пароли сразу для всех запрошенных профилей
+    и расшифровывает их одной пачкой
+    """
+
+    def batch_load_fn(self, owner_ids: List[int]) -> Promise:
+        passwords = defaultdict(list)
+        loaded = list(Password.objects.filter(
+            owner_id__in=owner_ids).order_by('id'))
+        decrypt_secrets(loaded)
+        for password in loaded:
+            passwords[password.owner_id].append(password)
+
+        return Promise.resolve([passwords[pk] for pk in owner_ids])
+
+
+class TagsByPasswordLoader(DataLoader):
+    """ Загружает теги сразу для всех запрошенных паролей """
+
+    def batch_load_fn(self, password_ids: List[int]) -> Promise:
+        tags = defaultdict(list)
+        for tag in Tag.objects.filter(
+                password_id__in=password_ids).order_by('id'):
+            tags[tag.password_id].append(tag)
+
+        return Promise.resolve([tags[pk] for pk in password_ids])
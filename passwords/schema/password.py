@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import graphene
+from graphene import relay
+from django.db.models import QuerySet
+from graphene_django.types import DjangoObjectType
+from promise import Promise
+
+from passwords.models import Password, Tag
+from passwords.services import decrypt_secret
+from utils.dataloaders import get_dataloader
+
+from .loaders import TagsByPasswordLoader
+
+
+class TagNode(DjangoObjectType):
+    class Meta:
+        model = Tag
+        interfaces = (relay.Node,)
+        fields = ('id', 'tag', 'color')
+
+    password_id = graphene.ID(required=True)
+
+    @classmethod
+    def get_queryset(
+        cls, queryset: QuerySet, info: graphene.ResolveInfo,
+    ) -> QuerySet:
+        # Теги доступны только их владельцу
+        return queryset.filter(owner__user_id=info.context.user.pk)
+
+    @staticmethod
+    def resolve_password_id(tag: Tag, info: graphene.ResolveInfo) -> str:
+        """ Глобальный ID пароля тега (без запроса к паролю) """
+        return relay.Node.to_global_id('PasswordNode', tag.password_id)
+
+
+class PasswordNode(DjangoObjectType):
+    class Meta:
+        model = Password
+        interfaces = (relay.Node,)
+        fields = ('id', 'title', 'url', 'login', 'passwords', 'updated_at')
+
+    passwords = graphene.String(required=True)
+    tags = graphene.List(graphene.NonNull(TagNode), required=True)
+
+    @classmethod
+    def get_queryset(
+        cls, queryset: QuerySet, info: graphene.ResolveInfo,
+    ) -> QuerySet:
+        # Пароли доступны только их владельцу
+        return queryset.filter(owner__user_id=info.context.user.pk)
+
+    @staticmethod
+    def resolve_passwords(password: Password, info: graphene.ResolveInfo) -> str:
+        """
+        Расшифрованный пароль. Списки паролей расшифровываются
+        пачкой заранее (passwords.services.decrypt_secrets),
+        здесь берётся уже готовый текст.
+        """
+
+        return decrypt_secret(password)
+
+    @staticmethod
+    def resolve_tags(
+        password: Password, info: graphene.ResolveInfo,
+    ) -> Promise:
+        """ Теги пароля, загружаются пачкой для всех паролей запроса """
+
+        return get_dataloader(info, TagsByPasswordLoader).load(password.pk)
+
+
+class PasswordConnection(relay.Connection):
+    class Meta:
+        node = PasswordNode
+
+
+class PasswordOrder(graphene.Enum):
+    """ Порядок сортировки паролей """
+
+    ID = 'id'
+    TITLE = 'title'
@@ -1,9 +1,156 @@
 # -*- coding: utf-8 -*-
 
+from typing import Any, List
+
+import graphene
+from django.core.exceptions import ValidationError
 from graphene import ObjectType
+from graphql.error import GraphQLError
+from graphql_jwt.decorators import login_required
+
+from passwords.models import Password
+from passwords.services import (GeneratedPasswords, VaultChanges,
+                                VaultHealth, decrypt_secrets,
+                                find_autofill_passwords, generate_passwords,
+                                get_vault_changes, get_vault_health,
+                                search_passwords)
+from users.choices import ActivityChoices
+from users.services import get_user_profile, record_activity
+from utils.passwords import PassphrasePolicy, PasswordPolicy
+
+from .bulk import (BulkDeletePasswordsMutation, BulkDeleteTagsMutation,
+                   BulkUpsertPasswordsMutation)
+from .generator import GeneratedPasswordsType
+from .health import VaultHealthType
+from .password import PasswordNode
+from .sync import VaultChangesType
 
 
 class Query(
     ObjectType,
 ):
-    pass
+    search_passwords = graphene.List(
+        graphene.NonNull(PasswordNode),
+        required=True,
+        query=graphene.String(required=True),
+        first=graphene.Int(),
+    )
+
+    @staticmethod
+    @login_required
+    def resolve_search_passwords(
+        root: Any, info: graphene.ResolveInfo, query: str, first: int = None,
+    ) -> List[Password]:
+        """ Поиск по паролям текущего пользователя, самые похожие первыми """
+
+        profile = get_user_profile(info.context.user)
+        record_activity(profile.pk, ActivityChoices.GET_PASSWORDS)
+        if first is None:
+            passwords = search_passwords(owner_id=profile.pk, query=query)
+        else:
+            passwords = search_passwords(
+                owner_id=profile.pk, query=query, limit=first,
+            )
+        decrypt_secrets(passwords)
+        return passwords
+
+    autofill_passwords = graphene.List(
+        graphene.NonNull(PasswordNode),
+        required=True,
+        url=graphene.String(required=True, description='Адрес страницы'),
+    )
+
+    @staticmethod
+    @login_required
+    def resolve_autofill_passwords(
+        root: Any, info: graphene.ResolveInfo, url: str,
+    ) -> List[Password]:
+        """ Пароли для автозаполнения страницы, самые подходящие первыми """
+
+        profile = get_user_profile(info.context.user)
+        record_activity(profile.pk, ActivityChoices.GET_PASSWORDS)
+        passwords = find_autofill_passwords(owner_id=profile.pk, url=url)
+        decrypt_secrets(passwords)
+        return passwords
+
+    vault_changes = graphene.Field(
+        VaultChangesType,
+        required=True,
+        token=graphene.String(),
+    )
+
+    @staticmethod
+    @login_required
+    def resolve_vault_changes(
+        root: Any, info: graphene.ResolveInfo, token: str = None,
+    ) -> VaultChanges:
+        """
+        Изменения паролей и тегов после токена прошлой синхронизации.
+        Без токена (или с устаревшим токеном) - всё хранилище.
+        """
+
+        profile = get_user_profile(info.context.user)
+        record_activity(profile.pk, ActivityChoices.GET_PASSWORDS)
+        return get_vault_changes(owner_id=profile.pk, token=token)
+
+    vault_health = graphene.Field(VaultHealthType, required=True)
+
+    @staticmethod
+    @login_required
+    def resolve_vault_health(
+        root: Any, info: graphene.ResolveInfo,
+    ) -> VaultHealth:
+        """
+        Повторяющиеся, слабые и давно не менявшиеся пароли. Пароли
+        не расшифровываются, отчёт пересчитывается после изменений
+        хранилища.
+        """
+
+        profile = get_user_profile(info.context.user)
+        record_activity(profile.pk, ActivityChoices.GET_PASSWORDS)
+        return get_vault_health(owner_id=profile.pk)
+
+    generate_passwords = graphene.Field(
+        GeneratedPasswordsType,
+        required=True,
+        count=graphene.Int(default_value=5),
+        length=graphene.Int(default_value=PasswordPolicy().length),
+        lowercase=graphene.Boolean(default_value=True),
+        uppercase=graphene.Boolean(default_value=True),
+        digits=graphene.Boolean(default_value=True),
+        symbols=graphene.Boolean(default_value=True),
+        exclude_ambiguous=graphene.Boolean(default_value=False),
+        passphrase=graphene.Boolean(
+            default_value=False,
+            description='Фраза из произносимых слов вместо символов',
+        ),
+        words=graphene.Int(default_value=PassphrasePolicy().words),
+        separator=graphene.String(default_value=PassphrasePolicy().separator),
+    )
+
+    @staticmethod
+    @login_required
+    def resolve_generate_passwords(
+        root: Any, info: graphene.ResolveInfo, count: int,
+        passphrase: bool, words: int, separator: str, **kwargs: Any
+    ) -> GeneratedPasswords:
+        """ Пачка предложенных паролей для формы пароля """
+
+        if passphrase:
+            policy = PassphrasePolicy(words=words, separator=separator)
+        else:
+            policy = PasswordPolicy(**kwargs)
+        try:
+            generated = generate_passwords(count=count, policy=policy)
+        except ValidationError as error:
+            raise GraphQLError(message='\n'.join(error.messages))
+
+        profile = get_user_profile(info.context.user)
+        record_activity(profile.pk, ActivityChoices.GEN_PASSWORD)
+        return generated
+
+
+class Mutation(ObjectType):
+    bulk_upsert_passwords = BulkUpsertPasswordsMutation.Field()
+    bulk_delete_passwords = BulkDeletePasswordsMutation.Field()
+    bulk_delete_tags = BulkDeleteTagsMutation.Field()
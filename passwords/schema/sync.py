@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from typing import List
+
+import graphene
+from graphene import relay
+
+from passwords.models import Password
+from passwords.services import VaultChanges, decrypt_secrets
+
+from .password import PasswordNode, TagNode
+
+
+class VaultChangesType(graphene.ObjectType):
+    """ Изменения хранилища с момента прошлой синхронизации """
+
+    class Meta:
+        name = 'VaultChanges'
+
+    passwords = graphene.List(graphene.NonNull(PasswordNode), required=True)
+    tags = graphene.List(graphene.NonNull(TagNode), required=True)
+    deleted_password_ids = graphene.List(
+        graphene.NonNull(graphene.ID), required=True,
+    )
+    deleted_tag_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+    token = graphene.String(
+        required=True,
+        description='Токен для следующей синхронизации',
+    )
+    reset = graphene.Boolean(
+        required=True,
+        description='Токен не подошёл: локальные данные нужно заменить целиком',
+    )
+
+    @staticmethod
+    def resolve_passwords(
+        changes: VaultChanges, info: graphene.ResolveInfo,
+    ) -> List[Password]:
+        """ Изменённые пароли, расшифровываются одной пачкой """
+
+        decrypt_secrets(changes.passwords)
+        return changes.passwords
+
+    @staticmethod
+    def resolve_deleted_password_ids(
+        changes: VaultChanges, info: graphene.ResolveInfo,
+    ) -> list:
+        return [
+            relay.Node.to_global_id(PasswordNode._meta.name, pk)
+            for pk in changes.deleted_password_ids
+        ]
+
+    @staticmethod
+    def resolve_deleted_tag_ids(
+        changes: VaultChanges, info: graphene.ResolveInfo,
+    ) -> list:
+        return [
+            relay.Node.to_global_id(TagNode._meta.name, pk)
+            for pk in changes.deleted_tag_ids
+        ]
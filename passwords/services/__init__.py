@@ -1 +1,16 @@
 # -*- coding: utf-8 -*-
+
+from .autofill import find_autofill_passwords, update_url_index
+from .bulk import (BulkItemError, BulkResult, bulk_delete_passwords,
+                   bulk_delete_tags, bulk_upsert_passwords)
+from .crypto import (VaultDecryptionError, decrypt_secret, decrypt_secrets,
+                     encrypt_secret)
+from .generator import GeneratedPasswords, generate_passwords
+from .health import (VaultHealth, get_vault_health, refresh_vault_health,
+                     set_secret)
+from .pagination import (PasswordPage, decode_cursor, encode_cursor,
+                         get_password_page)
+from .search import ensure_search_indexes, search_passwords
+from .sync import (VaultChanges, allocate_revision, decode_sync_token,
+                   encode_sync_token, get_vault_changes, write_tombstones)
+from .transfer import ImportResult, export_passwords, import_passwords
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from passwords.models import Password
+from users.models import Profile
+from utils.urls import registrable_domain, url_host
+
+
+URL_FIELDS = ('host', 'domain')
+
+
+class _OwnerMap(NamedTuple):
+    expires_at: float
+    revision: int
+    # Домен -> (хост, ID пароля) в порядке ID
+    domains: Dict[str, List[Tuple[str, int]]]
+
+
+class AutofillIndex:
+    """
+    Карта доменов хранилищ пользователей в памяти процесса.
+
+    Для каждого владельца хранится ревизия хранилища и загруженные
+    по индексу (owner, domain) домены: повторные запросы той же
+    страницы не ходят в таблицу паролей. Карта владельца сбрасывается,
+    как только ревизия хранилища меняется, так что запись в любом
+    воркере видна всем. Открытых паролей в карте нет - только ID и хосты.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_domains: int) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_domains = max_domains
+        self._lock = threading.Lock()
+        self._data: 'OrderedDict[int, _OwnerMap]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(
+        self, owner_id: int, revision: int, domain: str,
+    ) -> Optional[List[Tuple[str, int]]]:
+        """ Записи домена или None, если их нужно загрузить """
+
+        with self._lock:
+            owner = self._data.get(owner_id)
+            if owner is None:
+                return None
+            if owner.revision != revision or owner.expires_at <= monotonic():
+                del self._data[owner_id]
+                return None
+            self._data.move_to_end(owner_id)
+            return owner.domains.get(domain)
+
+    def set(
+        self, owner_id: int, revision: int, domain: str,
+        entries: List[Tuple[str, int]],
+    ) -> None:
+        with self._lock:
+            owner = self._data.get(owner_id)
+            if owner is None or owner.revision != revision:
+                owner = _OwnerMap(monotonic() + self.ttl, revision, {})
+                self._data[owner_id] = owner
+            if len(owner.domains) >= self.max_domains:
+                owner.domains.clear()
+            owner.domains[domain] = entries
+            self._data.move_to_end(owner_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, owner_id: int) -> None:
+        with self._lock:
+            self._data.pop(owner_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+autofill_index = AutofillIndex(
+    maxsize=settings.AUTOFILL_CACHE_SIZE,
+    ttl=settings.AUTOFILL_CACHE_TTL,
+    max_domains=settings.AUTOFILL_MAX_DOMAINS,
+)
+
+
+def update_url_index(password: Password) -> None:
+    """
+    Заполняет хост и регистрируемый домен пароля по его url.
+    Вызывается при каждой записи url.
+
+    :param password: Объект пароля
+    """
+
+    host = url_host(password.url)
+    password.host = host
+    password.domain = registrable_domain(host) if host else None
+
+
+def _match_rank(entry_host: str, host: str) -> int:
+    # Тот же хост, затем родительский (запись для example.com
+    # на login.example.com), затем остальные хосты домена
+    if entry_host == host:
+        return 0
+    if host.endswith('.' + entry_host):
+        return 1
+    return 2
+
+
+def find_autofill_passwords(owner_id: int, url: str) -> List[Password]:
+    """
+    Сервис автозаполнения: пароли владельца для страницы url.
+
+    Подходят пароли с тем же регистрируемым доменом, сначала точное
+    совпадение хоста, затем родительские домены, затем остальные
+    поддомены. Поиск идёт по индексу (owner, domain), результат
+    для домена кэшируется в autofill_index до следующей ревизии
+    хранилища: на повторных запросах - чтение ревизии и выборка
+    найденных паролей по первичному ключу.
+
+    :param owner_id: ID профиля владельца
+    :param url: Адрес страницы
+
+    :returns: Пароли (не расшифрованные), самые подходящие первыми
+    """
+
+    host = url_host(url)
+    if host is None:
+        return []
+    domain = registrable_domain(host)
+
+    revision = Profile.objects.values_list(
+        'vault_revision', flat=True,
+    ).get(pk=owner_id)
+    entries = autofill_index.get(owner_id, revision, domain)
+    if entries is None:
+        entries = list(
+            Password.objects.filter(owner_id=owner_id, domain=domain)
+            .order_by('id')
+            .values_list('host', 'id')
+        )
+        autofill_index.set(owner_id, revision, domain, entries)
+    if not entries:
+        return []
+
+    ranks = {
+        password_id: _match_rank(entry_host, host)
+        for entry_host, password_id in entries
+    }
+    passwords = Password.objects.filter(owner_id=owner_id, pk__in=list(ranks))
+    return sorted(passwords, key=lambda password: (ranks[password.pk], password.pk))
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any, Dict, Iterable, List, NamedTuple
+
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from passwords.choices import SyncObjectChoices
+from passwords.models import Password, Tag
+
+from .autofill import URL_FIELDS, update_url_index
+from .health import HEALTH_FIELDS, set_secret
+from .sync import allocate_revision, write_tombstones
+
+
+BULK_MAX_ITEMS = 1000
+BULK_BATCH_SIZE = 500
+DEFAULT_TAG_COLOR = 'blue'
+
+PASSWORD_FIELDS = ('title', 'url', 'login', 'passwords')
+# bulk_update не заполняет auto_now поля - updated_at выставляем сами
+UPDATE_FIELDS = (
+    PASSWORD_FIELDS + URL_FIELDS + HEALTH_FIELDS + ('updated_at', 'revision')
+)
+
+
+class BulkItemError(NamedTuple):
+    """ Ошибка одного элемента пакетной операции """
+
+    index: int
+    messages: List[str]
+
+
+class BulkResult(NamedTuple):
+    """
+    Результат пакетной операции: объекты успешно обработанных
+    элементов (в порядке запроса) и ошибки остальных.
+    """
+
+    items: List[Any]
+    errors: List[BulkItemError]
+
+
+def _error_messages(error: ValidationError) -> List[str]:
+    if not hasattr(error, 'error_dict'):
+        return list(error.messages)
+    return [
+        message if field == NON_FIELD_ERRORS else f'{field}: {message}'
+        for field, messages in error.message_dict.items()
+        for message in messages
+    ]
+
+
+def _check_batch(items: List[Any]) -> None:
+    if len(items) > BULK_MAX_ITEMS:
+        raise ValidationError(
+            f'За один запрос можно передать не больше {BULK_MAX_ITEMS} элементов'
+        )
+
+
+def _build_tags(
+    owner_id: int, tags: Iterable[Dict[str, Any]],
+) -> List[Tag]:
+    """
+    Проверяет теги элемента.
+
+    :raises ValidationError: Тег не проходит проверку
+    """
+
+    result = []
+    for tag_data in tags:
+        tag = Tag(
+            owner_id=owner_id,
+            tag=tag_data.get('tag'),
+            color=tag_data.get('color') or DEFAULT_TAG_COLOR,
+        )
+        tag.full_clean(exclude=['owner', 'password'], validate_unique=False)
+        result.append(tag)
+    return result
+
+
+@atomic
+def bulk_upsert_passwords(
+    owner_id: int, items: List[Dict[str, Any]],
+) -> BulkResult:
+    """
+    Сервис пакетного создания и изменения паролей.
+
+    Все элементы проверяются за один проход, существующие пароли
+    владельца выбираются одним запросом. Новые пароли пишутся одним
+    bulk_create, изменённые - одним bulk_update, теги - одним DELETE
+    и одним INSERT, всё в одной транзакции под одной ревизией
+    хранилища. Элементы с ошибками пропускаются и возвращаются
+    с индексом в запросе. Пароли шифруются ключом владельца
+    (passwords.services.crypto).
+
+    :param owner_id: ID профиля владельца
+    :param items: Элементы вида {id, title, url, login, passwords, tags}.
+     Элемент без id создаёт пароль, с id - изменяет его.
+     tags (список {tag, color}) заменяет теги пароля, без tags теги
+     не меняются.
+
+    :raises ValidationError: Слишком много элементов в запросе
+
+    :returns: Результат с паролями в порядке запроса
+    """
+
+    _check_batch(items)
+    if not items:
+        return BulkResult([], [])
+
+    # Ревизия берётся первой: блокировка профиля упорядочивает
+    # все записи хранилища владельца, отдельный FOR UPDATE не нужен
+    revision = allocate_revision(owner_id)
+
+    ids = [item['id'] for item in items if item.get('id') is not None]
+    existing: Dict[int, Password] = {
+        password.pk: password
+        for password in Password.objects.filter(owner_id=owner_id, pk__in=ids)
+    }
+
+    errors: List[BulkItemError] = []
+    valid: Dict[int, Password] = {}
+    tags: Dict[int, List[Tag]] = {}
+    seen_ids = set()
+    for index, item in enumerate(items):
+        password_id = item.get('id')
+        if password_id is not None:
+            if password_id in seen_ids:
+                errors.append(BulkItemError(index, ['Пароль передан дважды']))
+                continue
+            seen_ids.add(password_id)
+            if password_id not in existing:
+                errors.append(BulkItemError(index, ['Пароль не найден']))
+                continue
+
+        password = existing.get(password_id) or Password(owner_id=owner_id)
+        for field in PASSWORD_FIELDS:
+            if field in item:
+                setattr(password, field, item[field])
+        if 'url' in item:
+            update_url_index(password)
+
+        try:
+            # Пустой пароль не шифруем - его отклонит full_clean
+            if item.get('passwords'):
+                set_secret(password, item['passwords'])
+            password.full_clean(exclude=['owner'], validate_unique=False)
+            if item.get('tags') is not None:
+                tags[index] = _build_tags(owner_id, item['tags'])
+        except ValidationError as error:
+            errors.append(BulkItemError(index, _error_messages(error)))
+            continue
+        valid[index] = password
+
+    now = timezone.now()
+    for password in valid.values():
+        password.revision = revision
+        password.updated_at = now
+
+    created = [password for password in valid.values() if password.pk is None]
+    updated = [password for password in valid.values() if password.pk is not None]
+    Password.objects.bulk_create(created, batch_size=BULK_BATCH_SIZE)
+    Password.objects.bulk_update(
+        updated, UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE,
+    )
+
+    if tags:
+        replaced = Tag.objects.filter(
+            password_id__in=[valid[index].pk for index in tags],
+        )
+        write_tombstones(
+            owner_id, SyncObjectChoices.TAG,
+            replaced.values_list('pk', flat=True), revision,
+        )
+        replaced.delete()
+        new_tags = []
+        for index, password_tags in tags.items():
+            for tag in password_tags:
+                tag.password = valid[index]
+                tag.revision = revision
+                new_tags.append(tag)
+        Tag.objects.bulk_create(new_tags, batch_size=BULK_BATCH_SIZE)
+
+    return BulkResult(list(valid.values()), errors)
+
+
+def _bulk_delete_errors(
+    ids: List[int], found: Iterable[int],
+) -> List[BulkItemError]:
+    found = set(found)
+    return [
+        BulkItemError(index, ['Объект не найден'])
+        for index, pk in enumerate(ids) if pk not in found
+    ]
+
+
+@atomic
+def bulk_delete_passwords(owner_id: int, ids: List[int]) -> BulkResult:
+    """
+    Сервис пакетного удаления паролей вместе с их тегами.
+
+    :param owner_id: ID профиля владельца
+    :param ids: ID паролей
+
+    :raises ValidationError: Слишком много элементов в запросе
+
+    :returns: Результат с ID удалённых паролей
+    """
+
+    _check_batch(ids)
+
+    if not ids:
+        return BulkResult([], [])
+
+    revision = allocate_revision(owner_id)
+    passwords = Password.objects.filter(owner_id=owner_id, pk__in=ids)
+    found = list(passwords.values_list('pk', flat=True))
+    if found:
+        # У Tag.password нет каскада на уровне Django - удаляем теги сами
+        tags = Tag.objects.filter(password_id__in=found)
+        write_tombstones(
+            owner_id, SyncObjectChoices.TAG,
+            tags.values_list('pk', flat=True), revision,
+        )
+        write_tombstones(owner_id, SyncObjectChoices.PASSWORD, found, revision)
+        tags.delete()
+        Password.objects.filter(pk__in=found).delete()
+    return BulkResult(found, _bulk_delete_errors(ids, found))
+
+
+@atomic
+def bulk_delete_tags(owner_id: int, ids: List[int]) -> BulkResult:
+    """
+    Сервис пакетного удаления тегов.
+
+    :param owner_id: ID профиля владельца
+    :param ids: ID тегов
+
+    :raises ValidationError: Слишком много элементов в запросе
+
+    :returns: Результат с ID удалённых тегов
+    """
+
+    _check_batch(ids)
+
+    if not ids:
+        return BulkResult([], [])
+
+    revision = allocate_revision(owner_id)
+    tags = Tag.objects.filter(owner_id=owner_id, pk__in=ids)
+    found = list(tags.values_list('pk', flat=True))
+    if found:
+        write_tombstones(owner_id, SyncObjectChoices.TAG, found, revision)
+        Tag.objects.filter(pk__in=found).delete()
+    return BulkResult(found, _bulk_delete_errors(ids, found))
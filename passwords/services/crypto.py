@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import binascii
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from passwords.models import Password
+
+
+# Зашифрованное значение Password.passwords:
+# $v1$ + base64url(nonce | шифротекст | тег GCM)
+CIPHERTEXT_PREFIX = '$v1$'
+KEY_SIZE = 32
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+# Сколько байт пароля (UTF-8) помещается в колонку после шифрования
+MAX_SECRET_BYTES = (
+    (Password._meta.get_field('passwords').max_length - len(CIPHERTEXT_PREFIX))
+    // 4 * 3 - NONCE_SIZE - TAG_SIZE
+)
+
+
+class VaultDecryptionError(ValueError):
+    """ Пароль повреждён или зашифрован другим ключом """
+
+
+class VaultKeyCache:
+    """
+    Кэш шифров с выведенными ключами пользователей в памяти процесса.
+
+    Вывод ключа (scrypt) намеренно дорогой, поэтому шифр живёт
+    ttl секунд, записей не больше maxsize. Ключ передаётся шифру
+    неизменяемыми bytes и не затирается: шифр, полученный до
+    вытеснения, остаётся рабочим до конца запроса.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: 'OrderedDict[int, Tuple[float, AESGCM]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, owner_id: int) -> Optional[AESGCM]:
+        with self._lock:
+            item = self._data.get(owner_id)
+            if item is None:
+                return None
+            expires_at, cipher = item
+            if expires_at > monotonic():
+                self._data.move_to_end(owner_id)
+                return cipher
+            del self._data[owner_id]
+            return None
+
+    def set(self, owner_id: int, key: bytes) -> AESGCM:
+        cipher = AESGCM(bytes(key))
+        with self._lock:
+            self._data[owner_id] = (monotonic() + self.ttl, cipher)
+            self._data.move_to_end(owner_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return cipher
+
+    def delete(self, owner_id: int) -> None:
+        with self._lock:
+            self._data.pop(owner_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+vault_keys = VaultKeyCache(
+    maxsize=settings.VAULT_KEY_CACHE_SIZE,
+    ttl=settings.VAULT_KEY_CACHE_TTL,
+)
+
+
+def derive_vault_key(owner_id: int) -> bytes:
+    """
+    Выводит ключ хранилища пользователя из VAULT_ENCRYPTION_KEY.
+    Соль - ID профиля, поэтому у каждого пользователя свой ключ.
+
+    :param owner_id: ID профиля владельца
+
+    :returns: 256-битный ключ
+    """
+
+    return hashlib.scrypt(
+        settings.VAULT_ENCRYPTION_KEY.encode(),
+        salt=f'passal-vault:{owner_id}'.encode(),
+        n=settings.VAULT_KDF_N,
+        r=settings.VAULT_KDF_R,
+        p=settings.VAULT_KDF_P,
+        # scrypt требует 128 * n * r байт, запас на служебные структуры
+        maxmem=256 * settings.VAULT_KDF_N * settings.VAULT_KDF_R,
+        dklen=KEY_SIZE,
+    )
+
+
+def get_vault_cipher(owner_id: int) -> AESGCM:
+    """
+    Шифр хранилища пользователя, ключ берётся из кэша.
+
+    :param owner_id: ID профиля владельца
+    """
+
+    cipher = vault_keys.get(owner_id)
+    if cipher is None:
+        cipher = vault_keys.set(owner_id, derive_vault_key(owner_id))
+    return cipher
+
+
+def _associated_data(owner_id: int) -> bytes:
+    # Шифротекст привязан к владельцу: чужой пароль не расшифруется
+    return str(owner_id).encode()
+
+
+def is_encrypted(value: Optional[str]) -> bool:
+    """ Зашифровано ли значение (старые записи хранятся как есть) """
+    return bool(value) and value.startswith(CIPHERTEXT_PREFIX)
+
+
+def encrypt_secret(password: Password, plaintext: str) -> None:
+    """
+    Шифрует пароль ключом владельца в password.passwords.
+    Открытый текст остаётся у объекта, повторно расшифровывать
+    его для ответа не нужно.
+
+    :param password: Объект пароля с заполненным owner_id
+    :param plaintext: Пароль
+
+    :raises ValidationError: Пароль не помещается в колонку
+    """
+
+    data = plaintext.encode()
+    if len(data) > MAX_SECRET_BYTES:
+        raise ValidationError({'passwords': [
+            f'Пароль длиннее {MAX_SECRET_BYTES} байт'
+        ]})
+
+    nonce = os.urandom(NONCE_SIZE)
+    ciphertext = get_vault_cipher(password.owner_id).encrypt(
+        nonce, data, _associated_data(password.owner_id),
+    )
+    password.passwords = CIPHERTEXT_PREFIX + base64.urlsafe_b64encode(
+        nonce + ciphertext,
+    ).decode()
+    password._plaintext = plaintext
+
+
+def _decrypt(cipher: AESGCM, owner_id: int, value: str) -> str:
+    try:
+        raw = base64.urlsafe_b64decode(value[len(CIPHERTEXT_PREFIX):])
+        return cipher.decrypt(
+            raw[:NONCE_SIZE], raw[NONCE_SIZE:], _associated_data(owner_id),
+        ).decode()
+    except (binascii.Error, InvalidTag, UnicodeDecodeError, ValueError):
+        raise VaultDecryptionError('Не удалось расшифровать пароль')
+
+
+def decrypt_secrets(passwords: Iterable[Password]) -> List[str]:
+    """
+    Расшифровывает пароли пачкой: ключ каждого владельца берётся
+    один раз на пачку, открытый текст сохраняется у объектов
+    (его возвращает decrypt_secret без повторной расшифровки).
+
+    :param passwords: Пароли, например страница или всё хранилище
+
+    :raises VaultDecryptionError: Пароль повреждён
+
+    :returns: Открытые тексты в порядке паролей
+    """
+
+    ciphers: Dict[int, AESGCM] = {}
+    result = []
+    for password in passwords:
+        plaintext = password.__dict__.get('_plaintext')
+        if plaintext is None:
+            value = password.passwords
+            if not is_encrypted(value):
+                plaintext = value
+            else:
+                owner_id = password.owner_id
+                cipher = ciphers.get(owner_id)
+                if cipher is None:
+                    cipher = ciphers[owner_id] = get_vault_cipher(owner_id)
+                plaintext = _decrypt(cipher, owner_id, value)
+            password._plaintext = plaintext
+        result.append(plaintext)
+    return result
+
+
+def decrypt_secret(password: Password) -> str:
+    """
+    Открытый текст одного пароля.
+
+    :raises VaultDecryptionError: Пароль повреждён
+    """
+
+    return decrypt_secrets([password])[0]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+from typing import List, NamedTuple, Union
+
+from django.core.exceptions import ValidationError
+
+from utils.passwords import (PassphrasePolicy, PasswordPolicy, policy_entropy,
+                             random_passphrases, random_passwords)
+
+
+GENERATOR_MAX_COUNT = 100
+GENERATOR_MIN_LENGTH = 8
+GENERATOR_MAX_LENGTH = 128
+GENERATOR_MIN_WORDS = 3
+GENERATOR_MAX_WORDS = 20
+GENERATOR_MAX_SEPARATOR = 3
+
+
+class GeneratedPasswords(NamedTuple):
+    """ Сгенерированные пароли и энтропия каждого в битах """
+
+    passwords: List[str]
+    entropy: float
+
+
+def generate_passwords(
+    count: int, policy: Union[PasswordPolicy, PassphrasePolicy],
+) -> GeneratedPasswords:
+    """
+    Сервис генерации паролей по политике. Пароли берутся
+    из криптографического генератора (utils.passwords) пачкой
+    за один вызов.
+
+    :param count: Сколько паролей нужно
+    :param policy: Политика пароля или фразы-пароля
+
+    :raises ValidationError: Политика или число паролей вне допустимых
+
+    :returns: Пароли и их энтропия
+    """
+
+    if not 1 <= count <= GENERATOR_MAX_COUNT:
+        raise ValidationError(
+            f'За один запрос можно получить от 1 до {GENERATOR_MAX_COUNT} паролей'
+        )
+
+    if isinstance(policy, PassphrasePolicy):
+        if not GENERATOR_MIN_WORDS <= policy.words <= GENERATOR_MAX_WORDS:
+            raise ValidationError(
+                f'Число слов должно быть от {GENERATOR_MIN_WORDS} '
+                f'до {GENERATOR_MAX_WORDS}'
+            )
+        if len(policy.separator) > GENERATOR_MAX_SEPARATOR:
+            raise ValidationError(
+                f'Разделитель длиннее {GENERATOR_MAX_SEPARATOR} символов'
+            )
+        passwords = random_passphrases(policy, count)
+    else:
+        if not GENERATOR_MIN_LENGTH <= policy.length <= GENERATOR_MAX_LENGTH:
+            raise ValidationError(
+                f'Длина пароля должна быть от {GENERATOR_MIN_LENGTH} '
+                f'до {GENERATOR_MAX_LENGTH}'
+            )
+        try:
+            passwords = random_passwords(policy, count)
+        except ValueError as error:
+            raise ValidationError(str(error))
+
+    return GeneratedPasswords(passwords, round(policy_entropy(policy), 1))
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import hmac
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from passwords.models import Password
+from users.models import Profile
+from utils.breached import get_breach_corpus
+from utils.cache import TTLCache
+from utils.passwords import password_strength
+
+from .crypto import decrypt_secrets, encrypt_secret
+
+
+HEALTH_FIELDS = ('fingerprint', 'strength', 'password_changed_at')
+
+
+class VaultHealth(NamedTuple):
+    """ Отчёт о здоровье хранилища на ревизию revision """
+
+    revision: int
+    total: int
+    # Группы ID паролей с одинаковым открытым текстом
+    reused: List[List[int]]
+    weak: List[int]
+    stale: List[int]
+    # Пароли без отпечатка (записаны до появления отчёта)
+    unchecked: int
+
+
+vault_health_reports = TTLCache(
+    maxsize=settings.VAULT_HEALTH_CACHE_SIZE,
+    ttl=settings.VAULT_HEALTH_CACHE_TTL,
+    prefix='vault-health',
+    backend=settings.VAULT_HEALTH_CACHE_BACKEND,
+)
+
+
+@lru_cache(maxsize=4)
+def _fingerprint_key(master_key: str) -> bytes:
+    # Отдельный ключ, а не сам VAULT_ENCRYPTION_KEY
+    return hmac.new(
+        master_key.encode(), b'passal-fingerprint', hashlib.sha256,
+    ).digest()
+
+
+def secret_fingerprint(owner_id: int, plaintext: str) -> str:
+    """
+    Отпечаток пароля: HMAC-SHA256 с ключом сервера. Одинаковые пароли
+    одного владельца дают одинаковый отпечаток, у разных владельцев
+    отпечатки разные, без ключа по отпечатку пароль не подобрать.
+    """
+
+    return hmac.new(
+        _fingerprint_key(settings.VAULT_ENCRYPTION_KEY),
+        f'{owner_id}:{plaintext}'.encode(),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def secret_strength(plaintext: str) -> int:
+    """ Стойкость 0-4, пароль из базы утечек - 0 """
+
+    path = settings.BREACHED_PASSWORDS_CORPUS
+    if path and plaintext in get_breach_corpus(path):
+        return 0
+    return password_strength(plaintext)
+
+
+def update_secret_health(
+    password: Password, plaintext: str,
+    changed_at: Optional[datetime] = None,
+) -> None:
+    """
+    Заполняет отпечаток и стойкость пароля. Время смены пароля
+    обновляется, только если изменился сам пароль.
+
+    :param password: Объект пароля
+    :param plaintext: Открытый текст пароля
+    :param changed_at: Время смены, по умолчанию - сейчас
+    """
+
+    fingerprint = secret_fingerprint(password.owner_id, plaintext)
+    if fingerprint != password.fingerprint:
+        password.password_changed_at = changed_at or timezone.now()
+    password.fingerprint = fingerprint
+    password.strength = secret_strength(plaintext)
+
+
+def set_secret(password: Password, plaintext: str) -> None:
+    """
+    Записывает пароль: шифрует его (passwords.services.crypto)
+    и заполняет поля здоровья хранилища.
+
+    :raises ValidationError: Пароль не помещается в колонку
+    """
+
+    encrypt_secret(password, plaintext)
+    update_secret_health(password, plaintext)
+
+
+def get_vault_health(owner_id: int) -> VaultHealth:
+    """
+    Сервис отчёта о здоровье хранилища: повторяющиеся, слабые
+    (стойкость ниже VAULT_WEAK_STRENGTH) и давно не менявшиеся
+    (дольше VAULT_STALE_DAYS дней) пароли.
+
+    Пароли не расшифровываются: повторы - GROUP BY по индексу
+    (owner, fingerprint), остальное - по полям, заполненным
+    при записи. Отчёт кэшируется до следующей ревизии хранилища.
+
+    :param owner_id: ID профиля владельца
+
+    :returns: Отчёт
+    """
+
+    revision = Profile.objects.values_list(
+        'vault_revision', flat=True,
+    ).get(pk=owner_id)
+    key = f'{owner_id}:{revision}'
+    report = vault_health_reports.get(key)
+    if report is not None:
+        return VaultHealth(*report)
+
+    passwords = Password.objects.filter(owner_id=owner_id)
+    reused = list(
+        passwords.exclude(fingerprint=None)
+        .values('fingerprint')
+        .annotate(count=Count('id'), ids=ArrayAgg('id', ordering='id'))
+        .filter(count__gt=1)
+        .order_by('-count', 'ids')
+        .values_list('ids', flat=True)
+    )
+    weak = list(passwords.filter(
+        strength__lt=settings.VAULT_WEAK_STRENGTH,
+    ).order_by('id').values_list('id', flat=True))
+    stale = list(passwords.filter(
+        password_changed_at__lt=timezone.now() - timedelta(days=settings.VAULT_STALE_DAYS),
+    ).order_by('id').values_list('id', flat=True))
+    counts = passwords.aggregate(
+        total=Count('id'), unchecked=Count('id', filter=Q(fingerprint=None)),
+    )
+
+    report = VaultHealth(
+        revision, counts['total'], reused, weak, stale, counts['unchecked'],
+    )
+    # В кэше кортеж: общий кэш не должен зависеть от класса отчёта
+    vault_health_reports.set(key, tuple(report))
+    return report
+
+
+def refresh_vault_health(passwords: Iterable[Password]) -> int:
+    """
+    Пересчитывает поля здоровья для пачки паролей (например, записанных
+    до появления отчёта или после обновления базы утечек). Для паролей
+    без отпечатка временем смены считается время последнего изменения.
+
+    :param passwords: Пароли с полями updated_at и полями здоровья
+
+    :returns: Число обновлённых паролей
+    """
+
+    passwords = list(passwords)
+    for password, plaintext in zip(passwords, decrypt_secrets(passwords)):
+        update_secret_health(password, plaintext, changed_at=password.updated_at)
+    Password.objects.bulk_update(passwords, HEALTH_FIELDS)
+
+    revisions = Profile.objects.filter(
+        pk__in={password.owner_id for password in passwords},
+    ).values_list('pk', 'vault_revision')
+    vault_health_reports.delete(*(f'{pk}:{revision}' for pk, revision in revisions))
+    return len(passwords)
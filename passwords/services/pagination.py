@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import json
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from django.db.models import QuerySet
+
+from passwords.models import Password
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Порядок сортировки -> поля ключа (последнее поле всегда уникальный id)
+ORDER_FIELDS = {
+    'id': ('id',),
+    'title': ('title', 'id'),
+}
+# Тип значения каждого поля ключа в курсоре
+KEY_TYPES = {
+    'id': int,
+    'title': str,
+}
+
+
+class PasswordPage(NamedTuple):
+    """ Страница паролей при постраничной выборке по ключу """
+
+    items: List[Password]
+    has_next_page: bool
+    has_previous_page: bool
+
+
+def encode_cursor(order: str, password: Password) -> str:
+    """
+    Кодирует курсор страницы: порядок сортировки и ключ записи.
+
+    :param order: Порядок сортировки
+    :param password: Запись, на которой стоит курсор
+
+    :returns: Непрозрачная строка курсора
+    """
+
+    key = [getattr(password, field) for field in ORDER_FIELDS[order]]
+    raw = json.dumps([order, *key], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _is_key_value(field: str, value: Any) -> bool:
+    if value is None:
+        return Password._meta.get_field(field).null
+    # bool в JSON (true/false) - тоже int для isinstance
+    return not isinstance(value, bool) and isinstance(value, KEY_TYPES[field])
+
+
+def decode_cursor(order: str, cursor: str) -> Tuple[Any, ...]:
+    """
+    Раскодирует курсор страницы.
+
+    :param order: Ожидаемый порядок сортировки
+    :param cursor: Строка курсора
+
+    :raises ValueError: Курсор повреждён или выдан для другой сортировки
+
+    :returns: Ключ записи
+    """
+
+    try:
+        cursor_order, *key = json.loads(base64.urlsafe_b64decode(cursor))
+    except (ValueError, TypeError):
+        raise ValueError('Некорректный курсор')
+
+    if cursor_order != order or len(key) != len(ORDER_FIELDS[order]):
+        raise ValueError('Курсор выдан для другой сортировки')
+    if not all(
+            _is_key_value(field, value)
+            for field, value in zip(ORDER_FIELDS[order], key)):
+        raise ValueError('Некорректный курсор')
+    return tuple(key)
+
+
+def _compare_key(
+    queryset: QuerySet, fields: Tuple[str, ...], key: Tuple[Any, ...],
+    forward: bool,
+) -> QuerySet:
+    """
+    Условие "строка после ключа" в виде сравнения кортежей
+    (title, id) > (%s, %s), которое PostgreSQL выполняет
+    как диапазон по составному индексу (owner_id, title, id).
+    """
+
+    table = Password._meta.db_table
+    columns = ', '.join(f'"{table}"."{field}"' for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    operator = '>' if forward else '<'
+    return queryset.extra(
+        where=[f'({columns}) {operator} ({placeholders})'], params=list(key),
+    )
+
+
+def _ordered(queryset: QuerySet, fields: Tuple[str, ...], forward: bool) -> QuerySet:
+    prefix = '' if forward else '-'
+    return queryset.order_by(*(prefix + field for field in fields))
+
+
+def _seek(
+    queryset: QuerySet, order: str, key: Optional[Tuple[Any, ...]],
+    forward: bool, limit: int,
+) -> List[Password]:
+    """
+    Выбирает limit записей после (или до) ключа.
+
+    Пустые названия идут в конце сортировки по title и выбираются
+    отдельным запросом, чтобы каждый запрос был диапазоном по индексу.
+    """
+
+    if order == 'id':
+        if key is not None:
+            queryset = _compare_key(queryset, ('id',), key, forward)
+        return list(_ordered(queryset, ('id',), forward)[:limit])
+
+    titled = queryset.filter(title__isnull=False)
+    untitled = queryset.filter(title__isnull=True)
+
+    if key is not None and key[0] is None:
+        # Курсор стоит на записи без названия
+        untitled = _compare_key(untitled, ('id',), key[1:], forward)
+        if forward:
+            titled = None
+    elif key is not None:
+        titled = _compare_key(titled, ('title', 'id'), key, forward)
+        if not forward:
+            untitled = None
+
+    segments = [
+        (titled, ('title', 'id')),
+        (untitled, ('id',)),
+    ]
+    if not forward:
+        segments.reverse()
+
+    items = []
+    for segment, fields in segments:
+        if segment is None or len(items) >= limit:
+            continue
+        items.extend(_ordered(segment, fields, forward)[:limit - len(items)])
+    return items
+
+
+def get_password_page(
+    owner_id: int,
+    order: str = 'id',
+    first: Optional[int] = None,
+    after: Optional[str] = None,
+    last: Optional[int] = None,
+    before: Optional[str] = None,
+) -> PasswordPage:
+    """
+    Сервис постраничной выборки паролей по ключу (keyset pagination).
+    Страница берётся условием "после ключа курсора" вместо OFFSET,
+    поэтому далёкие страницы стоят столько же, сколько первая.
+
+    :param owner_id: ID профиля владельца
+    :param order: Порядок сортировки ('id' или 'title')
+    :param first: Размер страницы при движении вперёд
+    :param after: Курсор, после которого начинается страница
+    :param last: Размер страницы при движении назад
+    :param before: Курсор, перед которым заканчивается страница
+
+    :raises ValueError: Некорректный курсор или порядок сортировки
+
+    :returns: Страница паролей
+    """
+
+    if order not in ORDER_FIELDS:
+        raise ValueError(f'Неизвестный порядок сортировки: {order}')
+
+    forward = last is None and before is None
+    size = (first if forward else last) or DEFAULT_PAGE_SIZE
+    size = max(1, min(size, MAX_PAGE_SIZE))
+
+    cursor = after if forward else before
+    key = decode_cursor(order, cursor) if cursor else None
+
+    queryset = Password.objects.filter(owner_id=owner_id)
+    items = _seek(queryset, order, key, forward, size + 1)
+    has_more = len(items) > size
+    items = items[:size]
+
+    if forward:
+        return PasswordPage(items, has_more, cursor is not None)
+
+    items.reverse()
+    return PasswordPage(items, cursor is not None, has_more)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from typing import List, Optional
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import DatabaseError, connection
+from django.db.models import (Case, Exists, F, FloatField, OuterRef, Q, Value,
+                              When)
+from django.db.models.functions import Greatest
+from django.db.transaction import atomic
+
+from passwords.models import Password, Tag
+
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ('title', 'url', 'login')
+MAX_SEARCH_RESULTS = 100
+
+# (имя индекса, таблица, колонка) - GIN индексы с gin_trgm_ops для ILIKE
+TRIGRAM_INDEXES = (
+    ('passwords_password_title_trgm', Password._meta.db_table, 'title'),
+    ('passwords_password_url_trgm', Password._meta.db_table, 'url'),
+    ('passwords_password_login_trgm', Password._meta.db_table, 'login'),
+    ('passwords_tag_tag_trgm', Tag._meta.db_table, 'tag'),
+    # Поиск профилей в админке (ProfileAdmin.search_fields)
+    ('auth_user_username_trgm', 'auth_user', 'username'),
+)
+
+_has_trigram_extension: Optional[bool] = None
+
+
+def has_trigram_extension() -> bool:
+    """ Установлено ли в базе расширение pg_trgm (проверяется один раз) """
+
+    global _has_trigram_extension
+
+    if _has_trigram_extension is None:
+        _has_trigram_extension = False
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT EXISTS (SELECT 1 FROM pg_extension "
+                    "WHERE extname = 'pg_trgm')"
+                )
+                _has_trigram_extension = cursor.fetchone()[0]
+    return _has_trigram_extension
+
+
+def ensure_search_indexes() -> List[str]:
+    """
+    Сервис создания триграммных индексов для поиска.
+    Без расширения pg_trgm поиск работает, но полным перебором строк.
+
+    :returns: Имена индексов, которые есть в базе
+    """
+
+    global _has_trigram_extension
+
+    if connection.vendor != 'postgresql':
+        return []
+
+    try:
+        with atomic(), connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        logger.warning(
+            'Расширение pg_trgm недоступно, поиск паролей будет без индексов'
+        )
+        _has_trigram_extension = False
+        return []
+    _has_trigram_extension = True
+
+    with atomic(), connection.cursor() as cursor:
+        for name, table, column in TRIGRAM_INDEXES:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} '
+                f'ON {table} USING gin ({column} gin_trgm_ops)'
+            )
+    return [name for name, _, _ in TRIGRAM_INDEXES]
+
+
+def search_passwords(
+    owner_id: int, query: str, limit: int = MAX_SEARCH_RESULTS,
+) -> List[Password]:
+    """
+    Сервис поиска паролей владельца по названию, url, логину и тегам.
+
+    Отбор идёт через ILIKE по триграммным индексам, сортировка -
+    по триграммной похожести на запрос (или, без pg_trgm,
+    сначала совпадения с начала названия).
+
+    :param owner_id: ID профиля владельца
+    :param query: Строка поиска
+    :param limit: Максимум результатов
+
+    :returns: Список найденных паролей, самые похожие первыми
+    """
+
+    query = query.strip()
+    if not query:
+        return []
+
+    condition = Q(tag_match=True)
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__trgm_icontains': query})
+
+    if has_trigram_extension():
+        rank = Greatest(*(
+            TrigramSimilarity(field, query) for field in SEARCH_FIELDS
+        ))
+    else:
+        rank = Case(
+            When(title__istartswith=query, then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+
+    passwords = Password.objects.filter(owner_id=owner_id).annotate(
+        tag_match=Exists(Tag.objects.filter(
+            password_id=OuterRef('pk'), tag__trgm_icontains=query,
+        )),
+        rank=rank,
+    ).filter(condition).order_by(F('rank').desc(nulls_last=True), 'title', 'id')
+
+    return list(passwords[:max(1, min(limit, MAX_SEARCH_RESULTS))])
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import json
+from typing import Iterable, List, NamedTuple, Optional
+
+from django.db import connection
+
+from passwords.choices import SyncObjectChoices
+from passwords.models import Password, Tag, Tombstone
+from users.models import Profile
+
+
+class VaultChanges(NamedTuple):
+    """ Изменения хранилища паролей с момента прошлой синхронизации """
+
+    passwords: List[Password]
+    tags: List[Tag]
+    deleted_password_ids: List[int]
+    deleted_tag_ids: List[int]
+    token: str
+    # Токен устарел или не подходит: клиент должен заменить
+    # локальные данные полным списком passwords и tags
+    reset: bool
+
+
+def encode_sync_token(owner_id: int, revision: int) -> str:
+    """
+    Кодирует токен синхронизации: владелец и ревизия хранилища.
+
+    :param owner_id: ID профиля владельца
+    :param revision: Ревизия, до которой клиент получил изменения
+
+    :returns: Непрозрачная строка токена
+    """
+
+    raw = json.dumps([owner_id, revision], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_sync_token(owner_id: int, token: str) -> Optional[int]:
+    """
+    Раскодирует токен синхронизации.
+
+    :param owner_id: ID профиля владельца
+    :param token: Строка токена
+
+    :returns: Ревизия из токена или None, если токен повреждён
+     или выдан другому пользователю
+    """
+
+    try:
+        token_owner_id, revision = json.loads(base64.urlsafe_b64decode(token))
+    except (ValueError, TypeError):
+        return None
+
+    if token_owner_id != owner_id or not isinstance(revision, int):
+        return None
+    return revision
+
+
+def allocate_revision(owner_id: int) -> int:
+    """
+    Сервис получения следующей ревизии хранилища владельца.
+    Вызывается внутри транзакции, которая пишет пароли или теги.
+
+    Строка профиля остаётся заблокированной до конца транзакции,
+    поэтому записи одного владельца фиксируются строго в порядке
+    ревизий и клиент не пропустит изменение, зафиксированное позже
+    выданного ему токена.
+
+    :param owner_id: ID профиля владельца
+
+    :returns: Новая ревизия
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {Profile._meta.db_table} '
+            f'SET vault_revision = vault_revision + 1 '
+            f'WHERE id = %s RETURNING vault_revision',
+            [owner_id],
+        )
+        row = cursor.fetchone()
+
+    if row is None:
+        raise Profile.DoesNotExist
+    return row[0]
+
+
+def write_tombstones(
+    owner_id: int, kind: SyncObjectChoices, ids: Iterable[int], revision: int,
+) -> None:
+    """
+    Сервис записи удалений для синхронизации (одним INSERT).
+
+    :param owner_id: ID профиля владельца
+    :param kind: Тип удалённых объектов
+    :param ids: ID удалённых объектов
+    :param revision: Ревизия удаления
+    """
+
+    Tombstone.objects.bulk_create([
+        Tombstone(owner_id=owner_id, kind=kind, object_id=pk, revision=revision)
+        for pk in ids
+    ])
+
+
+def get_vault_changes(owner_id: int, token: Optional[str] = None) -> VaultChanges:
+    """
+    Сервис выборки изменений хранилища для синхронизации клиента.
+
+    Пароли, теги и удаления выбираются по индексу (owner_id, revision)
+    в диапазоне ревизий после токена, поэтому объём ответа зависит
+    от числа изменений, а не от размера хранилища.
+
+    :param owner_id: ID профиля владельца
+    :param token: Токен прошлой синхронизации, без него - всё хранилище
+
+    :returns: Изменения и новый токен
+    """
+
+    current = Profile.objects.filter(pk=owner_id).values_list(
+        'vault_revision', flat=True,
+    ).get()
+
+    since = decode_sync_token(owner_id, token) if token else None
+    reset = since is None or since > current
+    revisions = {'revision__lte': current}
+    if not reset:
+        revisions['revision__gt'] = since
+
+    passwords = list(Password.objects.filter(
+        owner_id=owner_id, **revisions,
+    ).order_by('id'))
+    tags = list(Tag.objects.filter(owner_id=owner_id, **revisions).order_by('id'))
+
+    deleted = {kind: [] for kind in SyncObjectChoices.values}
+    if not reset:
+        for kind, object_id in Tombstone.objects.filter(
+                owner_id=owner_id, **revisions,
+        ).order_by('id').values_list('kind', 'object_id'):
+            deleted[kind].append(object_id)
+
+    return VaultChanges(
+        passwords=passwords,
+        tags=tags,
+        deleted_password_ids=deleted[SyncObjectChoices.PASSWORD.value],
+        deleted_tag_ids=deleted[SyncObjectChoices.TAG.value],
+        token=encode_sync_token(owner_id, current),
+        reset=reset,
+    )
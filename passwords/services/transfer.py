@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+import csv
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.db.transaction import atomic
+
+from passwords.models import Password, Tag
+
+from .autofill import update_url_index
+from .crypto import MAX_SECRET_BYTES, decrypt_secrets
+from .health import set_secret
+from .sync import allocate_revision
+
+
+IMPORT_CHUNK_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+MAX_IMPORT_ERRORS = 100
+DEFAULT_TAG_COLOR = 'blue'
+TAGS_SEPARATOR = ';'
+
+EXPORT_COLUMNS = ('title', 'url', 'login', 'password', 'tags')
+
+# Формат -> {поле Password: колонка CSV}. Форматы проверяются по порядку,
+# подходит первый, все колонки которого есть в заголовке файла.
+IMPORT_FORMATS: Dict[str, Dict[str, str]] = {
+    'passal': {
+        'title': 'title', 'url': 'url', 'login': 'login',
+        'password': 'password', 'tags': 'tags',
+    },
+    'bitwarden': {
+        'title': 'name', 'url': 'login_uri', 'login': 'login_username',
+        'password': 'login_password', 'tags': 'folder',
+    },
+    'chrome': {
+        'title': 'name', 'url': 'url', 'login': 'username',
+        'password': 'password',
+    },
+    'firefox': {
+        'url': 'url', 'login': 'username', 'password': 'password',
+    },
+}
+
+
+class ImportResult(NamedTuple):
+    """ Результат импорта паролей """
+
+    format: str
+    created: int
+    skipped: int
+    errors: List[Tuple[int, str]]
+
+
+class _Row(NamedTuple):
+    title: Optional[str]
+    url: Optional[str]
+    login: Optional[str]
+    password: str
+    tags: List[str]
+
+
+def detect_format(header: Iterable[str]) -> Optional[str]:
+    """
+    Определяет формат CSV файла по заголовку.
+
+    :param header: Названия колонок
+
+    :returns: Название формата или None, если формат неизвестен
+    """
+
+    columns = {column.strip().lower() for column in header}
+    for name, mapping in IMPORT_FORMATS.items():
+        if set(mapping.values()) <= columns:
+            return name
+    return None
+
+
+def _max_length(field: str) -> int:
+    return Password._meta.get_field(field).max_length
+
+
+def _parse_row(mapping: Dict[str, str], row: Dict[str, str]) -> _Row:
+    """
+    Проверяет строку CSV и приводит её к полям Password.
+
+    :raises ValueError: Строка не проходит проверку
+    """
+
+    def value(field: str) -> Optional[str]:
+        if field not in mapping:
+            return None
+        return (row.get(mapping[field]) or '').strip() or None
+
+    password = row.get(mapping['password']) or ''
+    if not password:
+        raise ValueError('Пустой пароль')
+
+    title, url, login = value('title'), value('url'), value('login')
+    if title is None and url:
+        title = urlsplit(url).hostname or url
+
+    for field, field_value in (
+            ('title', title), ('url', url), ('login', login)):
+        if field_value and len(field_value) > _max_length(field):
+            raise ValueError(f'Слишком длинное поле {field}')
+    if len(password.encode()) > MAX_SECRET_BYTES:
+        raise ValueError('Слишком длинное поле passwords')
+
+    tags = [
+        tag.strip()[:Tag._meta.get_field('tag').max_length]
+        for tag in (value('tags') or '').split(TAGS_SEPARATOR)
+        if tag.strip()
+    ]
+    return _Row(title, url, login, password, tags)
+
+
+@atomic
+def _save_chunk(owner_id: int, rows: List[_Row]) -> int:
+    """ Сохраняет пачку строк одной транзакцией: два INSERT на пачку """
+
+    revision = allocate_revision(owner_id)
+    passwords = []
+    for row in rows:
+        password = Password(
+            owner_id=owner_id,
+            title=row.title,
+            url=row.url,
+            login=row.login,
+            revision=revision,
+        )
+        set_secret(password, row.password)
+        update_url_index(password)
+        passwords.append(password)
+    Password.objects.bulk_create(passwords)
+    Tag.objects.bulk_create([
+        Tag(
+            owner_id=owner_id, password=password, tag=tag,
+            color=DEFAULT_TAG_COLOR, revision=revision,
+        )
+        for password, row in zip(passwords, rows)
+        for tag in row.tags
+    ])
+    return len(passwords)
+
+
+def import_passwords(
+    owner_id: int, lines: Iterable[str], chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ImportResult:
+    """
+    Сервис потокового импорта паролей из CSV
+    (собственный формат, Chrome, Firefox, Bitwarden).
+
+    Файл читается построчно, в памяти держится не больше одной пачки строк.
+    Каждая пачка пишется своей транзакцией через bulk_create,
+    поэтому ошибка в конце файла не откатывает уже загруженные пачки.
+
+    :param owner_id: ID профиля владельца
+    :param lines: Строки CSV файла (например, открытый текстовый файл)
+    :param chunk_size: Размер пачки
+
+    :raises ValueError: Неизвестный формат файла
+
+    :returns: Результат импорта
+    """
+
+    reader = csv.DictReader(lines)
+    import_format = detect_format(reader.fieldnames or [])
+    if import_format is None:
+        raise ValueError('Неизвестный формат файла')
+
+    reader.fieldnames = [column.strip().lower() for column in reader.fieldnames]
+    mapping = IMPORT_FORMATS[import_format]
+
+    created, skipped, errors = 0, 0, []
+    chunk: List[_Row] = []
+    for row in reader:
+        # Bitwarden выгружает в один файл и заметки, и карты
+        if row.get('type') not in (None, '', 'login'):
+            skipped += 1
+            continue
+        try:
+            chunk.append(_parse_row(mapping, row))
+        except ValueError as error:
+            skipped += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append((reader.line_num, str(error)))
+            continue
+
+        if len(chunk) >= chunk_size:
+            created += _save_chunk(owner_id, chunk)
+            chunk = []
+
+    if chunk:
+        created += _save_chunk(owner_id, chunk)
+
+    return ImportResult(import_format, created, skipped, errors)
+
+
+class _Echo:
+    """ Псевдо-файл для csv.writer: отдаёт строку вместо записи """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _export_rows(passwords: List[Password]) -> Iterator[List[str]]:
+    tags: Dict[int, List[str]] = {}
+    for password_id, tag in Tag.objects.filter(
+            password_id__in=[password.pk for password in passwords],
+    ).order_by('id').values_list('password_id', 'tag'):
+        tags.setdefault(password_id, []).append(tag)
+
+    secrets = decrypt_secrets(passwords)
+    for password, secret in zip(passwords, secrets):
+        yield [
+            password.title or '',
+            password.url or '',
+            password.login or '',
+            secret,
+            TAGS_SEPARATOR.join(tags.get(password.pk, [])),
+        ]
+
+
+def export_passwords(
+    owner_id: int, chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Сервис потокового экспорта паролей в CSV (собственный формат).
+
+    Пароли читаются курсором пачками по chunk_size, теги - одним
+    запросом на пачку, расшифровываются тоже пачкой. Подходит для StreamingHttpResponse.
+
+    :param owner_id: ID профиля владельца
+    :param chunk_size: Размер пачки
+
+    :returns: Итератор строк CSV файла
+    """
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+
+    passwords = Password.objects.filter(owner_id=owner_id).order_by('id').only(
+        'id', 'owner_id', 'title', 'url', 'login', 'passwords',
+    ).iterator(chunk_size=chunk_size)
+
+    chunk: List[Password] = []
+    for password in passwords:
+        chunk.append(password)
+        if len(chunk) >= chunk_size:
+            yield ''.join(writer.writerow(row) for row in _export_rows(chunk))
+            chunk = []
+    if chunk:
+        yield ''.join(writer.writerow(row) for row in _export_rows(chunk))
@@ -1 +1,3 @@
 # -*- coding: utf-8 -*-
+
+from .search import ensure_search_indexes_on_migrate
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any
+
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from passwords.services import ensure_search_indexes
+
+
+@receiver(post_migrate, dispatch_uid='passwords_ensure_search_indexes')
+def ensure_search_indexes_on_migrate(
+    sender: AppConfig, using: str, **kwargs: Any,
+) -> None:
+    """ После миграций приложения passwords создаём индексы поиска """
+
+    if sender.label != 'passwords' or using != 'default':
+        return
+    ensure_search_indexes()
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+from .tests import (PasswordAPITestCase, PasswordASGITestCase,
+                    PasswordAutofillTestCase, PasswordBulkTestCase,
+                    PasswordCryptoTestCase, PasswordGeneratorTestCase,
+                    PasswordHealthTestCase, PasswordPaginationTestCase,
+                    PasswordReplicaRoutingTestCase, PasswordSearchTestCase,
+                    PasswordSyncTestCase, PasswordTransferTestCase)
@@ -1 +1,1416 @@
 # -*- coding: utf-8 -*-
+
+import asyncio
+import base64
+import io
+import json
+import string
+import threading
+from datetime import timedelta
+from typing import Tuple
+from unittest import mock
+
+import graphql
+from graphene import relay
+from graphene_django.utils.testing import GraphQLTestCase
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+
+from config.asgi import application
+from config.schema import schema
+
+from passwords.models import Password, Tag
+from passwords.services import (bulk_delete_passwords, bulk_delete_tags,
+                                bulk_upsert_passwords, encode_cursor,
+                                encode_sync_token, export_passwords,
+                                decrypt_secret, decrypt_secrets,
+                                encrypt_secret, find_autofill_passwords,
+                                get_password_page,
+                                get_vault_changes, get_vault_health,
+                                import_passwords, search_passwords)
+from passwords.services import crypto
+from passwords.services.autofill import autofill_index
+from passwords.services.crypto import (CIPHERTEXT_PREFIX, MAX_SECRET_BYTES,
+                                       VaultDecryptionError, VaultKeyCache,
+                                       vault_keys)
+from passwords.services.health import secret_fingerprint, vault_health_reports
+from users.choices import ActivityChoices
+from users.models import Profile
+from users.services import create_profile, gen_jwt_token
+from users.services.activity import activity_buffer
+from utils.async_pool import pooled_view
+from utils.complexity import QueryCost, analyze_query
+from utils.graphql import graphql_backend, persisted_queries, query_hash
+from utils.passwords import (AMBIGUOUS, PassphrasePolicy, PasswordPolicy,
+                             policy_classes, random_passphrases,
+                             random_passwords)
+from utils.routers import (REPLICA_DB_ALIAS, ReplicaRouter, database_routing,
+                           replica_pins)
+from utils.tracing import trace_request
+from utils.urls import registrable_domain, url_host
+
+
+class PasswordAPITestCase(GraphQLTestCase):
+    """ TestCase для тестирования чтения паролей через API """
+
+    VAULT_QUERY = '''
+    query {
+        me {
+            username
+            email
+            passwords {
+                title
+                tags {
+                    tag
+                }
+            }
+        }
+    }
+    '''
+
+    GRAPHQL_URL = '/api/'
+
+    def setUp(self) -> None:
+        # Буфер общий на процесс - не тащим события из других тестов
+        activity_buffer.drain()
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'JWT {gen_jwt_token(profile=self.profile)}',
+        }
+
+    def create_passwords(self, count: int) -> None:
+        passwords = Password.objects.bulk_create(
+            Password(owner=self.profile, title=f'title{i}', passwords='secret')
+            for i in range(count)
+        )
+        Tag.objects.bulk_create(
+            Tag(owner=self.profile, password=password, tag=tag, color='red')
+            for password in passwords
+            for tag in ('work', 'mail')
+        )
+
+    def test_vault_query(self) -> None:
+        """ Тест на чтение паролей с тегами постоянным числом запросов """
+
+        self.create_passwords(200)
+
+        # Пользователь по токену вместе с профилем, пароли, теги
+        with self.assertNumQueries(3):
+            response = self.query(self.VAULT_QUERY, headers=self.headers)
+        # Повторно пользователь с профилем берутся из кэша JWT
+        with self.assertNumQueries(2):
+            self.query(self.VAULT_QUERY, headers=self.headers)
+
+        self.assertResponseNoErrors(response)
+        me = response.json()['data']['me']
+        self.assertEqual(me['username'], 'test')
+        self.assertEqual(me['email'], 'test@foo.ru')
+        self.assertEqual(len(me['passwords']), 200)
+        self.assertEqual(
+            me['passwords'][0],
+            {'title': 'title0', 'tags': [{'tag': 'work'}, {'tag': 'mail'}]},
+        )
+
+    def post_persisted(self, sha256: str, query: str = None) -> HttpResponse:
+        body = {'extensions': {
+            'persistedQuery': {'version': 1, 'sha256Hash': sha256},
+        }}
+        if query is not None:
+            body['query'] = query
+        return self.client.post(
+            self.GRAPHQL_URL, json.dumps(body),
+            content_type='application/json', **self.headers,
+        )
+
+    def test_persisted_query(self) -> None:
+        """ Тест на выполнение запроса по хэшу (Automatic Persisted Queries) """
+
+        persisted_queries.clear()
+        graphql_backend.clear()
+        sha256 = query_hash(self.VAULT_QUERY)
+
+        response = self.post_persisted(sha256)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['errors'][0]['extensions'],
+            {'code': 'PERSISTED_QUERY_NOT_FOUND'},
+        )
+
+        response = self.post_persisted(sha256[::-1], self.VAULT_QUERY)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.post_persisted(sha256, self.VAULT_QUERY)
+        self.assertResponseNoErrors(response)
+
+        # Текст берётся из реестра, даже если документа нет в кэше процесса
+        graphql_backend.clear()
+        response = self.post_persisted(sha256)
+        self.assertResponseNoErrors(response)
+        self.assertEqual(response.json()['data']['me']['username'], 'test')
+
+    def test_document_cache(self) -> None:
+        """ Тест на разбор и проверку запроса один раз """
+
+        graphql_backend.clear()
+        with mock.patch('utils.graphql.parse', wraps=graphql.parse) as parse:
+            for _ in range(3):
+                self.assertResponseNoErrors(
+                    self.query(self.VAULT_QUERY, headers=self.headers),
+                )
+        self.assertEqual(parse.call_count, 1)
+
+        response = self.query('query { me { unknown } }', headers=self.headers)
+        self.assertResponseHasErrors(response)
+        self.assertEqual(len(graphql_backend), 1)
+
+    def test_query_cost(self) -> None:
+        """ Тест на оценку стоимости и ограничение сложности запроса """
+
+        response = self.query(self.VAULT_QUERY, headers=self.headers)
+        self.assertResponseNoErrors(response)
+        # me + 50 паролей по умолчанию, у каждого 50 тегов
+        self.assertEqual(response.json()['extensions']['cost'], {
+            'requested': 1 + 50 * (1 + 50),
+            'maximum': 10000,
+            'depth': 3,
+            'maxDepth': 10,
+        })
+
+        response = self.query(
+            'query($first: Int) { me { passwordConnection(first: $first) '
+            '{ edges { node { tags { tag } } } } } }',
+            variables={'first': 10}, headers=self.headers,
+        )
+        self.assertResponseNoErrors(response)
+        self.assertEqual(
+            response.json()['extensions']['cost']['requested'],
+            1 + 1 + 10 * (1 + 1 + 50),
+        )
+
+        aliases = ' '.join(
+            f'me{i}: me {{ passwords {{ tags {{ tag }} }} }}' for i in range(4)
+        )
+        response = self.query(f'query {{ {aliases} }}', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Стоимость запроса', response.json()['errors'][0]['message'])
+
+        with self.settings(GRAPHQL_MAX_DEPTH=2):
+            response = self.query(self.VAULT_QUERY, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Глубина запроса', response.json()['errors'][0]['message'])
+
+    def test_query_cost_fragment_cycle(self) -> None:
+        """ Тест на цикл фрагментов: ошибка проверки, а не переполнение стека """
+
+        query = (
+            'query { ...A } '
+            'fragment A on Query { me { id } ...B } '
+            'fragment B on Query { ...A }'
+        )
+        response = self.query(query, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Cannot spread fragment', response.json()['errors'][0]['message'])
+
+        # Сама оценка тоже не уходит в бесконечную рекурсию
+        self.assertEqual(
+            analyze_query(schema, graphql.parse(query)),
+            QueryCost(1, 1),
+        )
+
+    def test_tracing(self) -> None:
+        """ Тест на трассировку резолверов и SQL запросов """
+
+        self.create_passwords(3)
+        tracing_headers = {**self.headers, 'HTTP_X_GRAPHQL_TRACING': '1'}
+
+        # Обычному пользователю трассировка не отдаётся
+        response = self.query(self.VAULT_QUERY, headers=tracing_headers)
+        self.assertNotIn('tracing', response.json()['extensions'])
+
+        self.profile.user.is_staff = True
+        self.profile.user.save()
+        response = self.query(self.VAULT_QUERY, headers=tracing_headers)
+        self.assertResponseNoErrors(response)
+        tracing = response.json()['extensions']['tracing']
+        self.assertEqual(tracing['sql']['count'], 3)
+        self.assertEqual(tracing['nPlusOne'], [])
+        fields = {resolver['field'] for resolver in tracing['resolvers']}
+        self.assertIn('Query.me', fields)
+        self.assertIn('ProfileNode.passwords', fields)
+        self.assertNotIn('PasswordNode.title', fields)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'graphql_resolver_seconds_count{field="Query.me"}', response.content)
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+
+    def test_n_plus_one_warning(self) -> None:
+        """ Тест на предупреждение о повторяющемся SQL """
+
+        request = RequestFactory().post('/api/')
+        self.create_passwords(12)
+        with self.assertLogs('utils.tracing', 'WARNING') as logs:
+            with trace_request(request, 'Vault') as trace:
+                stats = trace.enter('PasswordNode.tags')
+                for password in Password.objects.filter(owner=self.profile):
+                    list(password.password_tag.all())
+                trace.leave('PasswordNode.tags', [], stats, 0.0)
+        self.assertEqual(stats.sql_count, 13)
+        self.assertIn('PasswordNode.tags', logs.output[0])
+
+    def test_password_connection(self) -> None:
+        """ Тест на постраничное чтение паролей через API """
+
+        self.create_passwords(5)
+        query = '''
+        query Page($after: String) {
+            me {
+                passwordConnection(first: 3, after: $after, orderBy: TITLE) {
+                    edges { node { title tags { tag } } }
+                    pageInfo { hasNextPage endCursor }
+                }
+            }
+        }
+        '''
+
+        response = self.query(query, headers=self.headers)
+        self.assertResponseNoErrors(response)
+        page = response.json()['data']['me']['passwordConnection']
+        self.assertEqual(
+            [edge['node']['title'] for edge in page['edges']],
+            ['title0', 'title1', 'title2'],
+        )
+        self.assertTrue(page['pageInfo']['hasNextPage'])
+
+        response = self.query(
+            query, headers=self.headers,
+            variables={'after': page['pageInfo']['endCursor']},
+        )
+        self.assertResponseNoErrors(response)
+        page = response.json()['data']['me']['passwordConnection']
+        self.assertEqual(
+            [edge['node']['title'] for edge in page['edges']],
+            ['title3', 'title4'],
+        )
+        self.assertFalse(page['pageInfo']['hasNextPage'])
+
+    def test_vault_query_anonymous(self) -> None:
+        """ Тест на то, что без токена пароли недоступны """
+
+        self.create_passwords(1)
+        response = self.query(self.VAULT_QUERY)
+        self.assertResponseHasErrors(response)
+
+
+class PasswordPaginationTestCase(TestCase):
+    """ TestCase для тестирования постраничной выборки паролей по ключу """
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        # Часть паролей без названия, часть с одинаковыми названиями
+        Password.objects.bulk_create(
+            Password(
+                owner=self.profile,
+                title=None if i % 7 == 0 else f'title{i % 10}',
+                passwords='secret',
+            )
+            for i in range(60)
+        )
+
+    def walk(self, order: str, forward: bool):
+        """ Проходит все страницы по 8 записей и возвращает id по порядку """
+
+        ids, cursor, has_more = [], None, True
+        while has_more:
+            with CaptureQueriesContext(connection) as queries:
+                if forward:
+                    page = get_password_page(
+                        self.profile.pk, order=order, first=8, after=cursor,
+                    )
+                    has_more = page.has_next_page
+                    ids.extend(password.pk for password in page.items)
+                else:
+                    page = get_password_page(
+                        self.profile.pk, order=order, last=8, before=cursor,
+                    )
+                    has_more = page.has_previous_page
+                    ids[:0] = [password.pk for password in page.items]
+            # Каждая страница - не больше двух диапазонов по индексу
+            self.assertLessEqual(len(queries), 1 if order == 'id' else 2)
+            if page.items:
+                item = page.items[-1] if forward else page.items[0]
+                cursor = encode_cursor(order, item)
+        return ids
+
+    def test_keyset_pagination(self) -> None:
+        """ Тест на обход всех страниц вперёд и назад """
+
+        passwords = Password.objects.filter(owner=self.profile)
+        by_id = list(passwords.order_by('id').values_list('id', flat=True))
+        by_title = sorted(
+            passwords.values_list('title', 'id'),
+            key=lambda row: (row[0] is None, row[0] or '', row[1]),
+        )
+        by_title = [pk for _, pk in by_title]
+
+        self.assertEqual(self.walk('id', forward=True), by_id)
+        self.assertEqual(self.walk('id', forward=False), by_id)
+        self.assertEqual(self.walk('title', forward=True), by_title)
+        self.assertEqual(self.walk('title', forward=False), by_title)
+
+        # Курсор другой сортировки не принимается
+        cursor = encode_cursor('id', passwords.first())
+        with self.assertRaises(ValueError):
+            get_password_page(self.profile.pk, order='title', after=cursor)
+
+        # Значения ключа другого типа не доходят до SQL
+        for order, key in (
+                ('title', [5, 3]), ('title', ['a', True]), ('title', ['a', '3']),
+                ('id', [None]), ('id', [1.5]), ('id', [False])):
+            raw = json.dumps([order, *key]).encode()
+            cursor = base64.urlsafe_b64encode(raw).decode()
+            with self.assertRaisesMessage(ValueError, 'Некорректный курсор'):
+                get_password_page(self.profile.pk, order=order, after=cursor)
+
+
+class PasswordSearchTestCase(TestCase):
+    """ TestCase для тестирования поиска по паролям """
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        self.profile, other = [
+            create_profile(
+                username=username,
+                email=f'{username}@foo.ru',
+                password='Passw0rd33',
+                repeat_password='Passw0rd33',
+            )
+            for username in ('test', 'other')
+        ]
+        self.mail, self.work, self.bank, _ = Password.objects.bulk_create([
+            Password(owner=self.profile, title='Mail', url='https://mail.ru',
+                     passwords='secret'),
+            Password(owner=self.profile, title='Работа', login='boss@mail.ru',
+                     passwords='secret'),
+            Password(owner=self.profile, title='Bank', passwords='secret'),
+            Password(owner=other, title='Mail', passwords='secret'),
+        ])
+        Tag.objects.create(
+            owner=self.profile, password=self.bank, tag='email', color='red',
+        )
+
+    def test_search_passwords(self) -> None:
+        """ Тест на поиск по названию, url, логину и тегам владельца """
+
+        found = search_passwords(owner_id=self.profile.pk, query='MAIL')
+        self.assertEqual(found[0], self.mail)
+        self.assertEqual(set(found), {self.mail, self.work, self.bank})
+
+        self.assertEqual(
+            search_passwords(owner_id=self.profile.pk, query='абот'),
+            [self.work],
+        )
+        # Спецсимволы LIKE ищутся как обычные символы
+        self.assertEqual(
+            search_passwords(owner_id=self.profile.pk, query='%'), [],
+        )
+        self.assertEqual(
+            search_passwords(owner_id=self.profile.pk, query='  '), [],
+        )
+
+
+class PasswordTransferTestCase(TestCase):
+    """ TestCase для тестирования импорта и экспорта паролей в CSV """
+
+    CHROME_CSV = (
+        'name,url,username,password\n'
+        'Mail,https://mail.ru,boss,secret1\n'
+        ',https://bank.ru/login,boss,secret2\n'
+        'Empty,https://empty.ru,boss,\n'
+    )
+
+    BITWARDEN_CSV = (
+        'folder,favorite,type,name,notes,fields,reprompt,login_uri,'
+        'login_username,login_password,login_totp\n'
+        'Work,,login,Jira,,,,https://jira.ru,boss,secret3,\n'
+        ',,note,Note,text,,,,,,\n'
+    )
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'JWT {gen_jwt_token(profile=self.profile)}',
+        }
+
+    def test_import_passwords(self) -> None:
+        """ Тест на импорт паролей пачками с пропуском плохих строк """
+
+        result = import_passwords(
+            owner_id=self.profile.pk,
+            lines=self.CHROME_CSV.splitlines(keepends=True),
+            chunk_size=1,
+        )
+        self.assertEqual(result.format, 'chrome')
+        self.assertEqual((result.created, result.skipped), (2, 1))
+        self.assertEqual(result.errors, [(4, 'Пустой пароль')])
+        passwords = list(Password.objects.filter(owner=self.profile).order_by('id'))
+        self.assertEqual(
+            [password.title for password in passwords], ['Mail', 'bank.ru'],
+        )
+        # В базе пароли хранятся зашифрованными
+        self.assertNotIn('secret', passwords[0].passwords)
+        self.assertEqual(decrypt_secrets(passwords), ['secret1', 'secret2'])
+
+        result = import_passwords(
+            owner_id=self.profile.pk,
+            lines=self.BITWARDEN_CSV.splitlines(keepends=True),
+        )
+        self.assertEqual(result.format, 'bitwarden')
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.assertTrue(Tag.objects.filter(
+            owner=self.profile, password__title='Jira', tag='Work',
+        ).exists())
+
+        with self.assertRaises(ValueError):
+            import_passwords(owner_id=self.profile.pk, lines=['foo,bar\n'])
+
+    def test_export_import_round_trip(self) -> None:
+        """ Тест на то, что выгрузка загружается обратно без потерь """
+
+        password = Password.objects.create(
+            owner=self.profile, title='Mail, "main"', url='https://mail.ru',
+            login='boss', passwords='se,cr"et',
+        )
+        Tag.objects.create(
+            owner=self.profile, password=password, tag='work', color='red',
+        )
+        Tag.objects.create(
+            owner=self.profile, password=password, tag='mail', color='red',
+        )
+
+        exported = ''.join(export_passwords(owner_id=self.profile.pk, chunk_size=1))
+        Tag.objects.all().delete()
+        Password.objects.all().delete()
+
+        result = import_passwords(
+            owner_id=self.profile.pk, lines=exported.splitlines(keepends=True),
+        )
+        self.assertEqual((result.format, result.created), ('passal', 1))
+        password = Password.objects.get(owner=self.profile)
+        self.assertEqual(
+            (password.title, password.url, password.login, decrypt_secret(password)),
+            ('Mail, "main"', 'https://mail.ru', 'boss', 'se,cr"et'),
+        )
+        self.assertEqual(
+            list(password.password_tag.order_by('id').values_list('tag', flat=True)),
+            ['work', 'mail'],
+        )
+
+    def test_transfer_views(self) -> None:
+        """ Тест на загрузку и выгрузку файла через HTTP """
+
+        upload = SimpleUploadedFile(
+            'passwords.csv', ('\ufeff' + self.CHROME_CSV).encode(),
+        )
+        response = self.client.post(
+            '/api/passwords/import/', {'file': upload}, **self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 2)
+
+        response = self.client.get('/api/passwords/export/', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'title,url,login,password,tags')
+        self.assertEqual(len(lines), 3)
+
+        response = self.client.get('/api/passwords/export/')
+        self.assertEqual(response.status_code, 401)
+
+        # Повреждённый токен - тоже 401, а не ошибка сервера
+        bad_token = {'HTTP_AUTHORIZATION': 'JWT garbage'}
+        response = self.client.get('/api/passwords/export/', **bad_token)
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(
+            '/api/passwords/import/',
+            {'file': SimpleUploadedFile('passwords.csv', self.CHROME_CSV.encode())},
+            **bad_token,
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class PasswordCryptoTestCase(TestCase):
+    """ TestCase для тестирования шифрования паролей хранилища """
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        vault_keys.clear()
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        self.other = create_profile(
+            username='other',
+            email='other@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+
+    def _password(self, profile: Profile, secret: str) -> Password:
+        password = Password(owner=profile, title='Mail')
+        encrypt_secret(password, secret)
+        password.save()
+        # Объект из базы без сохранённого открытого текста
+        return Password.objects.get(pk=password.pk)
+
+    def test_round_trip(self) -> None:
+        """ Тест на шифрование, привязку к владельцу и старые записи """
+
+        password = self._password(self.profile, 'пароль')
+        self.assertTrue(password.passwords.startswith(CIPHERTEXT_PREFIX))
+        self.assertEqual(decrypt_secret(password), 'пароль')
+
+        # Одинаковые пароли шифруются по-разному
+        copy = Password(owner=self.profile)
+        encrypt_secret(copy, 'пароль')
+        self.assertNotEqual(copy.passwords, password.passwords)
+
+        # Чужим ключом и после изменения шифротекст не расшифровывается
+        stolen = Password(owner=self.other, passwords=password.passwords)
+        with self.assertRaises(VaultDecryptionError):
+            decrypt_secret(stolen)
+        tampered = Password(
+            owner=self.profile, passwords=password.passwords[:-4] + 'AAAA',
+        )
+        with self.assertRaises(VaultDecryptionError):
+            decrypt_secret(tampered)
+
+        # Записи, сохранённые до шифрования, отдаются как есть
+        legacy = Password(owner=self.profile, passwords='plain')
+        self.assertEqual(decrypt_secret(legacy), 'plain')
+
+        with self.assertRaises(ValidationError):
+            encrypt_secret(Password(owner=self.profile), 'x' * (MAX_SECRET_BYTES + 1))
+        encrypt_secret(copy, 'x' * MAX_SECRET_BYTES)
+        copy.full_clean(exclude=['owner'])
+
+    def test_batch_uses_cached_key(self) -> None:
+        """ Тест на один вывод ключа на владельца для пачки паролей """
+
+        passwords = [self._password(self.profile, f'secret{i}') for i in range(20)]
+        passwords.append(self._password(self.other, 'other'))
+        vault_keys.clear()
+
+        with mock.patch(
+            'passwords.services.crypto.derive_vault_key',
+            wraps=crypto.derive_vault_key,
+        ) as derive:
+            secrets = decrypt_secrets(
+                Password.objects.filter(pk__in=[p.pk for p in passwords]).order_by('id'),
+            )
+            decrypt_secrets([Password.objects.get(pk=passwords[0].pk)])
+        self.assertEqual(secrets, [f'secret{i}' for i in range(20)] + ['other'])
+        self.assertEqual(derive.call_count, 2)
+
+    def test_key_cache_eviction(self) -> None:
+        """ Тест на вытеснение ключей: выданный шифр остаётся рабочим """
+
+        cache = VaultKeyCache(maxsize=1, ttl=60)
+        key = bytearray(crypto.derive_vault_key(self.profile.pk))
+        cipher = cache.set(1, key)
+        # Изменение буфера после set не трогает ключ шифра
+        key[:] = bytes(len(key))
+        cache.set(2, crypto.derive_vault_key(self.other.pk))
+        self.assertIsNone(cache.get(1))
+        self.assertIsNotNone(cache.get(2))
+
+        with mock.patch('passwords.services.crypto.monotonic', return_value=10 ** 9):
+            self.assertIsNone(cache.get(2))
+        self.assertEqual(len(cache), 0)
+
+        # Пароль, зашифрованный уже вытесненным шифром, расшифровывается
+        vault_keys.clear()
+        password = Password(owner_id=self.profile.pk)
+        with mock.patch.object(crypto, 'get_vault_cipher', return_value=cipher):
+            encrypt_secret(password, 'секрет')
+        vault_keys.clear()
+        self.assertEqual(
+            decrypt_secret(Password(owner_id=self.profile.pk, passwords=password.passwords)),
+            'секрет',
+        )
+
+
+class PasswordBulkTestCase(GraphQLTestCase):
+    """ TestCase для тестирования пакетных мутаций паролей и тегов """
+
+    GRAPHQL_URL = '/api/'
+
+    UPSERT_MUTATION = '''
+    mutation($passwords: [PasswordInput!]!) {
+        bulkUpsertPasswords(input: {passwords: $passwords}) {
+            passwords {
+                id
+                title
+                tags {
+                    tag
+                }
+            }
+            errors {
+                index
+                messages
+            }
+        }
+    }
+    '''
+
+    DELETE_TAGS_MUTATION = '''
+    mutation($ids: [ID!]!) {
+        bulkDeleteTags(input: {ids: $ids}) {
+            deletedIds
+            errors {
+                index
+                messages
+            }
+        }
+    }
+    '''
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        self.profile, self.other = [
+            create_profile(
+                username=username,
+                email=f'{username}@foo.ru',
+                password='Passw0rd33',
+                repeat_password='Passw0rd33',
+            )
+            for username in ('test', 'other')
+        ]
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'JWT {gen_jwt_token(profile=self.profile)}',
+        }
+
+    def test_bulk_upsert_passwords(self) -> None:
+        """ Тест на пакетную запись с ошибками отдельных элементов """
+
+        existing = Password.objects.create(
+            owner=self.profile, title='old', passwords='secret',
+        )
+        Tag.objects.create(
+            owner=self.profile, password=existing, tag='old', color='red',
+        )
+        foreign = Password.objects.create(
+            owner=self.other, title='foreign', passwords='secret',
+        )
+
+        items = [
+            {'title': f'new{i}', 'passwords': 'secret', 'tags': [{'tag': 'mail'}]}
+            for i in range(100)
+        ] + [
+            {'id': existing.pk, 'title': 'renamed', 'tags': []},
+            {'id': foreign.pk, 'title': 'stolen'},
+            {'title': 'bad url', 'url': 'not a url', 'passwords': 'secret'},
+            {'title': 'bad color', 'passwords': 'secret',
+             'tags': [{'tag': 'x', 'color': 'pink'}]},
+        ]
+        # Ревизия, выборка существующих, INSERT и UPDATE паролей,
+        # удаления для синхронизации, DELETE и INSERT тегов
+        # плюс SAVEPOINT/RELEASE - не зависит от числа элементов
+        with self.assertNumQueries(10):
+            result = bulk_upsert_passwords(owner_id=self.profile.pk, items=items)
+
+        self.assertEqual(len(result.items), 101)
+        self.assertEqual([error.index for error in result.errors], [101, 102, 103])
+        self.assertEqual(result.errors[0].messages, ['Пароль не найден'])
+
+        existing.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual((existing.title, existing.passwords), ('renamed', 'secret'))
+        self.assertEqual(foreign.title, 'foreign')
+        self.assertFalse(existing.password_tag.exists())
+        self.assertEqual(
+            Tag.objects.filter(owner=self.profile, tag='mail').count(), 100,
+        )
+
+    def test_bulk_mutations(self) -> None:
+        """ Тест на пакетные мутации через API """
+
+        replica_pins.clear()
+        response = self.query(
+            self.UPSERT_MUTATION,
+            variables={'passwords': [
+                {'title': 'Mail', 'passwords': 'secret',
+                 'tags': [{'tag': 'work'}, {'tag': 'mail', 'color': 'red'}]},
+                {'id': 'broken', 'title': 'Bank'},
+            ]},
+            headers=self.headers,
+        )
+        self.assertResponseNoErrors(response)
+        payload = response.json()['data']['bulkUpsertPasswords']
+        self.assertEqual(
+            payload['errors'], [{'index': 1, 'messages': ['Некорректный ID']}],
+        )
+        self.assertEqual(payload['passwords'][0]['tags'], [
+            {'tag': 'work'}, {'tag': 'mail'},
+        ])
+        # После мутации пользователь читает с основной базы
+        self.assertEqual(len(replica_pins), 1)
+
+        tags = list(Tag.objects.filter(owner=self.profile).order_by('id'))
+        foreign = Tag.objects.create(
+            owner=self.other, password=Password.objects.create(
+                owner=self.other, passwords='secret',
+            ),
+            tag='foreign', color='red',
+        )
+        ids = [
+            relay.Node.to_global_id('TagNode', tag.pk)
+            for tag in [*tags, foreign]
+        ]
+        response = self.query(
+            self.DELETE_TAGS_MUTATION, variables={'ids': ids},
+            headers=self.headers,
+        )
+        self.assertResponseNoErrors(response)
+        payload = response.json()['data']['bulkDeleteTags']
+        self.assertEqual(payload['deletedIds'], ids[:2])
+        self.assertEqual(
+            payload['errors'], [{'index': 2, 'messages': ['Объект не найден']}],
+        )
+        self.assertTrue(Tag.objects.filter(pk=foreign.pk).exists())
+
+    def test_bulk_delete_tags_limit(self) -> None:
+        """ Тест на ограничение размера пакета """
+
+        with self.assertRaises(ValidationError):
+            bulk_delete_tags(owner_id=self.profile.pk, ids=list(range(1001)))
+
+
+class PasswordGeneratorTestCase(GraphQLTestCase):
+    """ TestCase для тестирования генератора паролей """
+
+    GRAPHQL_URL = '/api/'
+
+    GENERATE_QUERY = '''
+    query($count: Int, $length: Int, $symbols: Boolean, $passphrase: Boolean) {
+        generatePasswords(
+            count: $count, length: $length, symbols: $symbols,
+            excludeAmbiguous: true, passphrase: $passphrase,
+        ) {
+            passwords
+            entropy
+        }
+    }
+    '''
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'JWT {gen_jwt_token(profile=self.profile)}',
+        }
+
+    def test_random_passwords(self) -> None:
+        """ Тест на обязательные наборы символов и исключения """
+
+        policy = PasswordPolicy(length=4, exclude_ambiguous=True)
+        passwords = random_passwords(policy, 500)
+        self.assertEqual(len(passwords), 500)
+        # Коротких паролей всего ~3 млн - совпадения возможны, уникальность
+        # проверяем на длинных
+        long_passwords = random_passwords(PasswordPolicy(length=16), 500)
+        self.assertEqual(len(set(long_passwords)), 500)
+        for password in passwords:
+            self.assertEqual(len(password), 4)
+            for chars in policy_classes(policy):
+                self.assertTrue(set(password) & set(chars))
+            self.assertFalse(set(password) & set(AMBIGUOUS))
+
+        digits = random_passwords(PasswordPolicy(
+            length=10, lowercase=False, uppercase=False, symbols=False,
+        ), 100)
+        self.assertTrue(all(password.isdigit() for password in digits))
+        # Все 10 цифр встречаются, без перекоса к первым значениям
+        self.assertEqual(set(''.join(digits)), set(string.digits))
+
+        with self.assertRaises(ValueError):
+            random_passwords(PasswordPolicy(
+                lowercase=False, uppercase=False, digits=False, symbols=False,
+            ), 1)
+
+        phrases = random_passphrases(PassphrasePolicy(words=4, separator='.'), 3)
+        for phrase in phrases:
+            words = phrase.split('.')
+            self.assertEqual(len(words), 4)
+            self.assertTrue(all(len(word) == 6 and word.istitle() for word in words))
+
+    def test_generate_query(self) -> None:
+        """ Тест на генерацию пачки паролей через API """
+
+        response = self.query(
+            self.GENERATE_QUERY, variables={'count': 10, 'length': 20},
+            headers=self.headers,
+        )
+        self.assertResponseNoErrors(response)
+        generated = response.json()['data']['generatePasswords']
+        self.assertEqual(len(generated['passwords']), 10)
+        self.assertTrue(all(len(password) == 20 for password in generated['passwords']))
+        self.assertGreater(generated['entropy'], 100)
+        self.assertEqual(
+            [event.activity for event in activity_buffer.drain()],
+            [ActivityChoices.GEN_PASSWORD],
+        )
+
+        response = self.query(
+            self.GENERATE_QUERY, variables={'passphrase': True},
+            headers=self.headers,
+        )
+        self.assertResponseNoErrors(response)
+        self.assertEqual(
+            len(response.json()['data']['generatePasswords']['passwords'][0].split('-')),
+            5,
+        )
+
+        for variables in ({'count': 101}, {'length': 7}):
+            response = self.query(
+                self.GENERATE_QUERY, variables=variables, headers=self.headers,
+            )
+            self.assertResponseHasErrors(response)
+
+        response = self.query(self.GENERATE_QUERY)
+        self.assertResponseHasErrors(response)
+
+
+class PasswordHealthTestCase(GraphQLTestCase):
+    """ TestCase для тестирования отчёта о здоровье хранилища """
+
+    GRAPHQL_URL = '/api/'
+
+    HEALTH_QUERY = '''
+    {
+        vaultHealth {
+            total
+            reusedPasswordIds
+            weakPasswordIds
+            stalePasswordIds
+            unchecked
+        }
+    }
+    '''
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        vault_health_reports.clear()
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'JWT {gen_jwt_token(profile=self.profile)}',
+        }
+
+    def _upsert(self, *items: dict) -> list:
+        result = bulk_upsert_passwords(owner_id=self.profile.pk, items=list(items))
+        self.assertEqual(result.errors, [])
+        return result.items
+
+    def test_report(self) -> None:
+        """ Тест на повторы, слабые и устаревшие пароли """
+
+        strong = 'Tq7#vLm2$xPz9!Wd'
+        first, second, weak, unique = self._upsert(
+            {'title': 'mail', 'passwords': strong},
+            {'title': 'bank', 'passwords': strong},
+            {'title': 'forum', 'passwords': '123456'},
+            {'title': 'shop', 'passwords': 'Hn4&kR8@cY1^mB6*'},
+        )
+        Password.objects.filter(pk=unique.pk).update(
+            password_changed_at=timezone.now() - timedelta(days=400),
+        )
+
+        health = get_vault_health(self.profile.pk)
+        self.assertEqual(health.total, 4)
+        self.assertEqual(health.reused, [[first.pk, second.pk]])
+        self.assertEqual(health.weak, [weak.pk])
+        self.assertEqual(health.stale, [unique.pk])
+        self.assertEqual(health.unchecked, 0)
+
+        # До следующей ревизии хранилища - только чтение ревизии
+        with self.assertNumQueries(1):
+            self.assertEqual(get_vault_health(self.profile.pk), health)
+
+        # Смена заголовка не меняет время смены пароля
+        changed_at = Password.objects.get(pk=first.pk).password_changed_at
+        self._upsert({'id': first.pk, 'title': 'new mail'})
+        self.assertEqual(
+            Password.objects.get(pk=first.pk).password_changed_at, changed_at,
+        )
+        self._upsert({'id': second.pk, 'passwords': 'Ge5%wJ3!fN7&sQ2#'})
+        self.assertGreater(
+            Password.objects.get(pk=second.pk).password_changed_at, changed_at,
+        )
+        self.assertEqual(get_vault_health(self.profile.pk).reused, [])
+
+    def test_fingerprint(self) -> None:
+        """ Тест на отпечатки: у разных владельцев разные, открытого текста нет """
+
+        password, = self._upsert({'title': 'mail', 'passwords': 'секрет'})
+        self.assertEqual(
+            password.fingerprint, secret_fingerprint(self.profile.pk, 'секрет'),
+        )
+        self.assertNotEqual(
+            password.fingerprint, secret_fingerprint(self.profile.pk + 1, 'секрет'),
+        )
+        self.assertNotIn('секрет', password.fingerprint)
+
+    def test_refresh_command(self) -> None:
+        """ Тест на заполнение отчёта для старых записей """
+
+        legacy = [
+            Password.objects.create(owner=self.profile, title=title, passwords='qwerty')
+            for title in ('a', 'b')
+        ]
+        self.assertEqual(get_vault_health(self.profile.pk).unchecked, 2)
+
+        call_command('refresh_vault_health', chunk_size=1, stdout=io.StringIO())
+        health = get_vault_health(self.profile.pk)
+        self.assertEqual(health.unchecked, 0)
+        self.assertEqual(health.reused, [[password.pk for password in legacy]])
+        self.assertEqual(health.weak, [password.pk for password in legacy])
+        self.assertEqual(
+            Password.objects.get(pk=legacy[0].pk).password_changed_at,
+            legacy[0].updated_at,
+        )
+
+    def test_health_query(self) -> None:
+        """ Тест на отчёт через API """
+
+        first, second = self._upsert(
+            {'title': 'mail', 'passwords': '111111'},
+            {'title': 'bank', 'passwords': '111111'},
+        )
+        response = self.query(self.HEALTH_QUERY, headers=self.headers)
+        self.assertResponseNoErrors(response)
+        ids = [
+            relay.Node.to_global_id('PasswordNode', password.pk)
+            for password in (first, second)
+        ]
+        self.assertEqual(response.json()['data']['vaultHealth'], {
+            'total': 2,
+            'reusedPasswordIds': [ids],
+            'weakPasswordIds': ids,
+            'stalePasswordIds': [],
+            'unchecked': 0,
+        })
+
+        response = self.query(self.HEALTH_QUERY)
+        self.assertResponseHasErrors(response)
+
+
+class PasswordAutofillTestCase(GraphQLTestCase):
+    """ TestCase для тестирования автозаполнения по адресу страницы """
+
+    GRAPHQL_URL = '/api/'
+
+    AUTOFILL_QUERY = '''
+    query($url: String!) {
+        autofillPasswords(url: $url) {
+            title
+            login
+            passwords
+        }
+    }
+    '''
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        autofill_index.clear()
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'JWT {gen_jwt_token(profile=self.profile)}',
+        }
+
+    def _upsert(self, *items: dict) -> list:
+        result = bulk_upsert_passwords(owner_id=self.profile.pk, items=list(items))
+        self.assertEqual(result.errors, [])
+        return result.items
+
+    def test_normalize(self) -> None:
+        """ Тест на выделение хоста и регистрируемого домена """
+
+        self.assertEqual(url_host('HTTPS://User:pw@WWW.Example.com.:8080/a?b'), 'example.com')
+        self.assertEqual(url_host('example.com/login'), 'example.com')
+        self.assertEqual(url_host('https://пример.рф/'), 'xn--e1afmkfd.xn--p1ai')
+        self.assertEqual(url_host('http://[::1]:8000/'), '::1')
+        for url in (None, '', '   ', 'https://', 'http://a b.com/'):
+            self.assertIsNone(url_host(url))
+
+        self.assertEqual(registrable_domain('login.accounts.example.com'), 'example.com')
+        self.assertEqual(registrable_domain('shop.example.co.uk'), 'example.co.uk')
+        self.assertEqual(registrable_domain('user.github.io'), 'user.github.io')
+        self.assertEqual(registrable_domain('localhost'), 'localhost')
+        self.assertEqual(registrable_domain('192.168.0.1'), '192.168.0.1')
+
+    def test_lookup(self) -> None:
+        """ Тест на порядок совпадений и сброс карты при изменениях """
+
+        exact, parent, sibling, _, _ = self._upsert(
+            {'title': 'exact', 'url': 'https://accounts.example.co.uk/login',
+             'passwords': 'a'},
+            {'title': 'parent', 'url': 'http://example.co.uk', 'passwords': 'b'},
+            {'title': 'sibling', 'url': 'https://shop.example.co.uk', 'passwords': 'c'},
+            {'title': 'other', 'url': 'https://other.co.uk', 'passwords': 'd'},
+            {'title': 'empty', 'passwords': 'e'},
+        )
+        self.assertEqual(
+            (exact.host, exact.domain), ('accounts.example.co.uk', 'example.co.uk'),
+        )
+
+        url = 'https://accounts.example.co.uk/settings'
+        self.assertEqual(
+            find_autofill_passwords(self.profile.pk, url), [exact, parent, sibling],
+        )
+        # Домен уже в карте: ревизия и пароли по первичному ключу
+        with self.assertNumQueries(2):
+            find_autofill_passwords(self.profile.pk, url)
+        # Пустой результат тоже кэшируется
+        self.assertEqual(find_autofill_passwords(self.profile.pk, 'nothing.com'), [])
+        with self.assertNumQueries(1):
+            self.assertEqual(find_autofill_passwords(self.profile.pk, 'nothing.com'), [])
+
+        self._upsert({'id': sibling.pk, 'url': 'https://sibling.com'})
+        self.assertEqual(
+            find_autofill_passwords(self.profile.pk, url), [exact, parent],
+        )
+        self.assertEqual(
+            find_autofill_passwords(self.profile.pk, 'http://www.sibling.com'), [sibling],
+        )
+
+        other = create_profile(
+            username='other',
+            email='other@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        self.assertEqual(find_autofill_passwords(other.pk, url), [])
+
+    def test_refresh_command(self) -> None:
+        """ Тест на заполнение хостов для старых записей """
+
+        legacy = Password.objects.create(
+            owner=self.profile, url='https://www.example.com', passwords='x',
+        )
+        self.assertEqual(find_autofill_passwords(self.profile.pk, 'example.com'), [])
+
+        call_command('refresh_autofill_index', stdout=io.StringIO())
+        autofill_index.clear()
+        self.assertEqual(
+            find_autofill_passwords(self.profile.pk, 'example.com'), [legacy],
+        )
+
+    def test_admin_change(self) -> None:
+        """ Тест на пересчёт хоста при смене url в админке """
+
+        password, = self._upsert(
+            {'title': 'mail', 'url': 'https://old.example.com', 'passwords': 'x'},
+        )
+        self.assertEqual(
+            find_autofill_passwords(self.profile.pk, 'old.example.com'), [password],
+        )
+
+        admin = User.objects.create_superuser('admin', 'admin@foo.ru', 'Passw0rd33')
+        self.client.force_login(admin)
+        response = self.client.post(
+            f'/admin/passwords/password/{password.pk}/change/',
+            {'title': 'mail', 'url': 'https://new.example.org', 'login': ''},
+        )
+        self.assertEqual(response.status_code, 302)
+
+        password.refresh_from_db()
+        self.assertEqual(
+            (password.host, password.domain), ('new.example.org', 'example.org'),
+        )
+        self.assertEqual(find_autofill_passwords(self.profile.pk, 'old.example.com'), [])
+        self.assertEqual(
+            find_autofill_passwords(self.profile.pk, 'https://new.example.org/'),
+            [password],
+        )
+
+    def test_autofill_query(self) -> None:
+        """ Тест на автозаполнение через API """
+
+        self._upsert(
+            {'title': 'mail', 'url': 'https://mail.example.com', 'login': 'me',
+             'passwords': 'секрет'},
+        )
+        response = self.query(
+            self.AUTOFILL_QUERY, variables={'url': 'https://mail.example.com/inbox'},
+            headers=self.headers,
+        )
+        self.assertResponseNoErrors(response)
+        self.assertEqual(response.json()['data']['autofillPasswords'], [
+            {'title': 'mail', 'login': 'me', 'passwords': 'секрет'},
+        ])
+
+        response = self.query(
+            self.AUTOFILL_QUERY, variables={'url': 'https://mail.example.com'},
+        )
+        self.assertResponseHasErrors(response)
+
+
+class PasswordSyncTestCase(GraphQLTestCase):
+    """ TestCase для тестирования синхронизации хранилища по ревизиям """
+
+    GRAPHQL_URL = '/api/'
+
+    SYNC_QUERY = '''
+    query($token: String) {
+        vaultChanges(token: $token) {
+            passwords {
+                title
+            }
+            tags {
+                tag
+                passwordId
+            }
+            deletedPasswordIds
+            deletedTagIds
+            token
+            reset
+        }
+    }
+    '''
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'JWT {gen_jwt_token(profile=self.profile)}',
+        }
+
+    def upsert(self, *items) -> list:
+        return bulk_upsert_passwords(owner_id=self.profile.pk, items=list(items)).items
+
+    def test_vault_changes(self) -> None:
+        """ Тест на выборку только изменений после токена """
+
+        mail, bank, work = self.upsert(
+            {'title': 'Mail', 'passwords': 'secret', 'tags': [{'tag': 'mail'}]},
+            {'title': 'Bank', 'passwords': 'secret'},
+            {'title': 'Work', 'passwords': 'secret'},
+        )
+        changes = get_vault_changes(owner_id=self.profile.pk)
+        self.assertTrue(changes.reset)
+        self.assertEqual(len(changes.passwords), 3)
+        self.assertEqual(len(changes.tags), 1)
+
+        self.upsert({'id': mail.pk, 'title': 'Mail.ru', 'tags': []})
+        bulk_delete_passwords(owner_id=self.profile.pk, ids=[bank.pk])
+
+        delta = get_vault_changes(owner_id=self.profile.pk, token=changes.token)
+        self.assertFalse(delta.reset)
+        self.assertEqual([password.title for password in delta.passwords], ['Mail.ru'])
+        self.assertEqual(delta.tags, [])
+        self.assertEqual(delta.deleted_password_ids, [bank.pk])
+        self.assertEqual(delta.deleted_tag_ids, [changes.tags[0].pk])
+
+        empty = get_vault_changes(owner_id=self.profile.pk, token=delta.token)
+        self.assertEqual(
+            (empty.passwords, empty.deleted_password_ids, empty.token),
+            ([], [], delta.token),
+        )
+
+        # Чужой или повреждённый токен - полная синхронизация
+        for token in ('broken', encode_sync_token(self.profile.pk + 1, 0)):
+            changes = get_vault_changes(owner_id=self.profile.pk, token=token)
+            self.assertTrue(changes.reset)
+            self.assertEqual(
+                {password.title for password in changes.passwords},
+                {'Mail.ru', 'Work'},
+            )
+
+    def test_vault_changes_query(self) -> None:
+        """ Тест на синхронизацию через API """
+
+        self.upsert({'title': 'Mail', 'passwords': 'secret', 'tags': [{'tag': 'mail'}]})
+        response = self.query(self.SYNC_QUERY, headers=self.headers)
+        self.assertResponseNoErrors(response)
+        changes = response.json()['data']['vaultChanges']
+        self.assertTrue(changes['reset'])
+        self.assertEqual(changes['passwords'], [{'title': 'Mail'}])
+
+        self.upsert({'title': 'Bank', 'passwords': 'secret'})
+        # Пользователь с профилем из кэша JWT: ревизия, пароли, теги, удаления
+        with self.assertNumQueries(4):
+            response = self.query(
+                self.SYNC_QUERY, variables={'token': changes['token']},
+                headers=self.headers,
+            )
+        self.assertResponseNoErrors(response)
+        changes = response.json()['data']['vaultChanges']
+        self.assertFalse(changes['reset'])
+        self.assertEqual(changes['passwords'], [{'title': 'Bank'}])
+        self.assertEqual(changes['tags'], [])
+
+
+class PasswordASGITestCase(TransactionTestCase):
+    """ TestCase для тестирования API в ASGI режиме """
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        # Постоянные соединения остались бы в потоках ASGI
+        # и помешали удалить тестовую базу
+        self.conn_max_age = connection.settings_dict['CONN_MAX_AGE']
+        connection.settings_dict['CONN_MAX_AGE'] = 0
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        self.token = gen_jwt_token(profile=self.profile)
+
+    def tearDown(self) -> None:
+        connection.settings_dict['CONN_MAX_AGE'] = self.conn_max_age
+
+    async def request(self, path: str) -> Tuple[int, bytes]:
+        messages = []
+
+        async def receive() -> dict:
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message: dict) -> None:
+            messages.append(message)
+
+        await application({
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': b'',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'JWT {self.token}'.encode()),
+            ],
+        }, receive, send)
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        return messages[0]['status'], body
+
+    def test_streaming_export(self) -> None:
+        """ Тест на потоковую выгрузку через ASGI обработчик """
+
+        Password.objects.bulk_create(
+            Password(owner=self.profile, title=f'title{i}', passwords='secret')
+            for i in range(5)
+        )
+        status, body = asyncio.run(self.request('/api/passwords/export/'))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body.decode().splitlines()), 6)
+
+    def test_pooled_view(self) -> None:
+        """ Тест на выполнение view в пуле потоков """
+
+        def view(request):
+            return HttpResponse(threading.current_thread().name)
+
+        async_view = pooled_view(csrf_exempt(view))
+        self.assertTrue(asyncio.iscoroutinefunction(async_view))
+        self.assertTrue(async_view.csrf_exempt)
+
+        response = asyncio.run(async_view(None))
+        self.assertTrue(response.content.startswith(b'asgi-sync'))
+
+
+class PasswordReplicaRoutingTestCase(SimpleTestCase):
+    """ TestCase для тестирования чтения с реплики """
+
+    def setUp(self) -> None:
+        replica_pins.clear()
+        # Реплика только для решений роутера: запросов к ней тест не делает
+        connections.databases[REPLICA_DB_ALIAS] = connections.databases['default']
+        self.router = ReplicaRouter()
+        self.headers = {'HTTP_AUTHORIZATION': 'JWT test'}
+
+    def tearDown(self) -> None:
+        del connections.databases[REPLICA_DB_ALIAS]
+        replica_pins.clear()
+
+    def test_read_only_routing(self) -> None:
+        """ Тест на чтение с реплики и возврат к основной базе """
+
+        request = RequestFactory().get('/api/', **self.headers)
+        self.assertEqual(self.router.db_for_read(Password), 'default')
+
+        with database_routing(request, read_only=True):
+            self.assertEqual(self.router.db_for_read(Password), REPLICA_DB_ALIAS)
+            connection.in_atomic_block = True
+            try:
+                self.assertEqual(self.router.db_for_read(Password), 'default')
+            finally:
+                connection.in_atomic_block = False
+
+        with database_routing(request, read_only=False):
+            self.assertEqual(self.router.db_for_read(Password), 'default')
+
+    def test_read_your_writes(self) -> None:
+        """ Тест на закрепление за основной базой после записи """
+
+        request = RequestFactory().get('/api/', **self.headers)
+        other = RequestFactory().get('/api/', HTTP_AUTHORIZATION='JWT other')
+
+        with database_routing(request, read_only=True):
+            self.router.db_for_write(Password)
+            self.assertEqual(self.router.db_for_read(Password), 'default')
+
+        with database_routing(request, read_only=True):
+            self.assertEqual(self.router.db_for_read(Password), 'default')
+        with database_routing(other, read_only=True):
+            self.assertEqual(self.router.db_for_read(Password), REPLICA_DB_ALIAS)
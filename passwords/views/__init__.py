@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+from .transfer import export_passwords_view, import_passwords_view
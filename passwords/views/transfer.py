@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+from typing import Optional
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.http import (HttpRequest, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
+from django.views.decorators.http import require_GET, require_POST
+from graphql_jwt.exceptions import JSONWebTokenError
+
+from passwords.services import export_passwords, import_passwords
+from users.services import get_user_profile
+from utils.routers import database_routing
+
+
+def _unauthorized() -> JsonResponse:
+    return JsonResponse({'error': 'Требуется авторизация'}, status=401)
+
+
+def _authenticate(request: HttpRequest) -> Optional[User]:
+    # Повреждённый или истёкший токен - тот же 401, что и без токена
+    try:
+        return authenticate(request=request)
+    except JSONWebTokenError:
+        return None
+
+
+@require_POST
+def import_passwords_view(request: HttpRequest) -> HttpResponse:
+    """
+    Импорт паролей из CSV файла (multipart поле file).
+    Авторизация - заголовок Authorization: JWT <token>.
+    """
+
+    user = _authenticate(request)
+    if user is None:
+        return _unauthorized()
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'Не передан файл'}, status=400)
+
+    profile = get_user_profile(user)
+    lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        # После импорта пользователь читает свои пароли с основной базы
+        with database_routing(request, read_only=False):
+            result = import_passwords(owner_id=profile.pk, lines=lines)
+    except (ValueError, UnicodeDecodeError, csv.Error) as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    return JsonResponse({
+        'format': result.format,
+        'created': result.created,
+        'skipped': result.skipped,
+        'errors': [
+            {'line': line, 'message': message}
+            for line, message in result.errors
+        ],
+    })
+
+
+@require_GET
+def export_passwords_view(request: HttpRequest) -> HttpResponse:
+    """
+    Потоковая выгрузка паролей в CSV.
+    Авторизация - заголовок Authorization: JWT <token>.
+    """
+
+    user = _authenticate(request)
+    if user is None:
+        return _unauthorized()
+
+    profile = get_user_profile(user)
+    response = StreamingHttpResponse(
+        export_passwords(owner_id=profile.pk),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'attachment; filename="passwords.csv"'
+    return response
@@ -8,6 +8,7 @@ from django.contrib import admin
 from django.db.models import QuerySet
 
 from django.http import HttpRequest
+from django.utils.timezone import localtime
 
 from users.models import Profile
 
@@ -26,9 +27,9 @@ class IsActiveFilter(admin.SimpleListFilter):
     def queryset(self, request: HttpRequest, queryset: QuerySet) -> QuerySet:
         value = self.value()
         if value == 'yes':
-            return Profile.objects.active()
+            return queryset.active()
         if value == 'no':
-            return Profile.objects.not_active()
+            return queryset.not_active()
         return queryset
 
 
@@ -52,8 +53,14 @@ class ProfileAdmin(admin.ModelAdmin):
         'get_last_activity',
     )
 
+    list_select_related = (
+        'user',
+    )
+
+    # ILIKE по триграммному индексу auth_user.username
+    # (passwords.services.search.TRIGRAM_INDEXES)
     search_fields = (
-        'user__username',
+        'user__username__trgm_icontains',
     )
 
     list_filter = (
@@ -65,6 +72,9 @@ class ProfileAdmin(admin.ModelAdmin):
         'get_is_active',
     )
 
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        # Активность считается в SQL, без запроса на каждую строку
+        return super().get_queryset(request).with_is_active()
 
     def get_username(self, obj: Profile) -> str:
         return obj.username
@@ -74,17 +84,18 @@ class ProfileAdmin(admin.ModelAdmin):
         return obj.email
     get_email.short_description = 'Email'
 
-    # TODO: нужна оптимизация (скорее всего через annotate)
     def get_is_active(self, obj: Profile) -> str:
         return obj.is_active
     get_is_active.short_description = 'Активность'
     get_is_active.boolean = True
+    get_is_active.admin_order_field = 'last_activity_at'
 
     def get_last_activity(self, obj: Profile) -> Union[datetime, str]:
-        if last_activity := obj.last_activity:
-            return last_activity.strftime('%d.%M.%Y %H:%m')
+        if last_activity := obj.last_activity_at:
+            return localtime(last_activity).strftime('%d.%m.%Y %H:%M')
         return '-'
     get_last_activity.short_description = 'Время последней активности'
+    get_last_activity.admin_order_field = 'last_activity_at'
 
     def has_delete_permission(
         self, request: HttpRequest, obj: Profile = None,
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+import json
+import random
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client, override_settings
+
+from passwords.models import Password
+from passwords.services import (decrypt_secrets, encrypt_secret,
+                                find_autofill_passwords, generate_passwords)
+from passwords.services.crypto import get_vault_cipher, vault_keys
+from users.models import Profile
+from users.services import create_profile, gen_jwt_token, update_profile
+from utils.benchmark import (BenchmarkResult, compare_results, dump_results,
+                             load_results, run_benchmark)
+from utils.passwords import PasswordPolicy
+
+
+VAULT_QUERY = (
+    'query BenchVault { me { username passwords { title tags { tag } } } }'
+)
+PAGE_QUERY = (
+    'query BenchPage { me { passwordConnection(first: 20) '
+    '{ edges { cursor node { title login } } } } }'
+)
+# Паролей в одной операции vault_decrypt_1000
+VAULT_BATCH_SIZE = 1000
+
+
+class Benchmarks:
+    """
+    Сценарии замеров на данных seed_benchmark_data.
+    Каждый сценарий - функция от номера итерации.
+    """
+
+    def __init__(self, prefix: str, sample: int, seed: int) -> None:
+        self.prefix = prefix
+        self.run_prefix = f'{prefix}-run-{uuid.uuid4().hex[:8]}'
+        self.profiles = self._sample_profiles(sample, random.Random(seed))
+        # Сессия админки не должна подменять пользователя из JWT
+        self.client = Client()
+        self.admin_client = Client()
+        self.tokens: Dict[int, str] = {}
+        self.ciphertexts: List[str] = []
+
+    def _sample_profiles(self, sample: int, rng: random.Random) -> List[Profile]:
+        """ Случайные профили по всему диапазону id, а не первые в таблице """
+
+        queryset = Profile.objects.filter(
+            user__username__startswith=f'{self.prefix}-',
+        ).select_related('user')
+        bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            raise CommandError(
+                f'Нет пользователей {self.prefix}-*, '
+                f'сначала выполните seed_benchmark_data'
+            )
+        population = range(bounds['low'], bounds['high'] + 1)
+        candidates = rng.sample(population, min(sample * 2, len(population)))
+        profiles = list(queryset.filter(pk__in=candidates)[:sample])
+        rng.shuffle(profiles)
+        return profiles
+
+    def profile(self, index: int) -> Profile:
+        return self.profiles[index % len(self.profiles)]
+
+    def create_profile(self, index: int) -> None:
+        create_profile(
+            username=f'{self.run_prefix}-{index}',
+            email=f'{self.run_prefix}-{index}@example.com',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+
+    def update_profile(self, index: int) -> None:
+        update_profile(
+            user_id=self.profile(index).user_id,
+            new_first_name=f'Bench {index}',
+        )
+
+    def gen_jwt_token(self, index: int) -> None:
+        gen_jwt_token(profile=self.profile(index))
+
+    def active_profiles(self, index: int) -> None:
+        Profile.objects.active().count()
+
+    def inactive_profiles(self, index: int) -> None:
+        Profile.objects.not_active().count()
+
+    def _get(self, path: str) -> None:
+        response = self.admin_client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path}: статус {response.status_code}')
+
+    def admin_changelist(self, index: int) -> None:
+        self._get('/admin/users/profile/')
+
+    def admin_changelist_active(self, index: int) -> None:
+        self._get('/admin/users/profile/?get_is_active=yes')
+
+    def _graphql(self, index: int, query: str) -> None:
+        profile = self.profile(index)
+        token = self.tokens.get(profile.pk)
+        if token is None:
+            token = self.tokens[profile.pk] = gen_jwt_token(profile=profile)
+        response = self.client.post(
+            '/api/', json.dumps({'query': query}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'JWT {token}',
+        )
+        content = response.json()
+        if response.status_code != 200 or content.get('errors'):
+            raise CommandError(f'GraphQL: {content.get("errors")}')
+
+    def graphql_vault(self, index: int) -> None:
+        self._graphql(index, VAULT_QUERY)
+
+    def graphql_password_page(self, index: int) -> None:
+        self._graphql(index, PAGE_QUERY)
+
+    def vault_decrypt(self, index: int) -> None:
+        owner_id = self.profiles[0].pk
+        if not self.ciphertexts:
+            for number in range(VAULT_BATCH_SIZE):
+                password = Password(owner_id=owner_id)
+                encrypt_secret(password, f'secret {number}')
+                self.ciphertexts.append(password.passwords)
+        decrypt_secrets([
+            Password(owner_id=owner_id, passwords=value)
+            for value in self.ciphertexts
+        ])
+
+    def vault_key_derivation(self, index: int) -> None:
+        owner_id = self.profile(index).pk
+        vault_keys.delete(owner_id)
+        get_vault_cipher(owner_id)
+
+    def generate_passwords(self, index: int) -> None:
+        generate_passwords(count=20, policy=PasswordPolicy())
+
+    def autofill_lookup(self, index: int) -> None:
+        # Поддомен сайта первого пароля из seed_benchmark_data
+        find_autofill_passwords(self.profile(index).pk, 'https://login.site1.test/')
+
+    def cases(self) -> List[Tuple[str, Callable[[int], Any]]]:
+        return [
+            ('create_profile', self.create_profile),
+            ('update_profile', self.update_profile),
+            ('gen_jwt_token', self.gen_jwt_token),
+            ('profiles_active', self.active_profiles),
+            ('profiles_inactive', self.inactive_profiles),
+            ('admin_changelist', self.admin_changelist),
+            ('admin_changelist_active', self.admin_changelist_active),
+            ('graphql_vault', self.graphql_vault),
+            ('graphql_password_page', self.graphql_password_page),
+            ('vault_decrypt_1000', self.vault_decrypt),
+            ('vault_key_derivation', self.vault_key_derivation),
+            ('generate_passwords_20', self.generate_passwords),
+            ('autofill_lookup', self.autofill_lookup),
+        ]
+
+    def setup_admin(self) -> None:
+        """ Суперпользователь для страниц админки """
+
+        admin, _ = User.objects.get_or_create(
+            username=f'{self.prefix}-admin',
+            defaults={'is_staff': True, 'is_superuser': True},
+        )
+        self.admin_client.force_login(admin)
+
+    def cleanup(self) -> None:
+        """ Удаляет пользователей, созданных сценарием create_profile """
+
+        User.objects.filter(username__startswith=f'{self.run_prefix}-').delete()
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку (p50, p99), пропускную способность и число '
+        'SQL запросов горячих путей: сервисы профиля, выборки активных '
+        'пользователей, админка, чтение через GraphQL и расшифровка '
+        'паролей (vault_decrypt_1000 - пачка из 1000 паролей). Данные готовит '
+        'seed_benchmark_data. Результаты сохраняются в JSON и сравниваются '
+        'с базовым замером.'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс пользователей из seed_benchmark_data',
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=200,
+            help='Замеров на сценарий',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=20,
+            help='Прогревочных вызовов на сценарий',
+        )
+        parser.add_argument(
+            '--sample', type=int, default=1000,
+            help='Сколько случайных профилей использовать',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed выбора профилей, одинаковый для сравниваемых замеров',
+        )
+        parser.add_argument(
+            '--only', nargs='+', metavar='NAME',
+            help='Выполнить только эти сценарии',
+        )
+        parser.add_argument(
+            '--output', type=Path,
+            help='Файл для результатов в JSON',
+        )
+        parser.add_argument(
+            '--compare', type=Path, metavar='BASELINE',
+            help='JSON базового замера: при ухудшении команда завершится с ошибкой',
+        )
+        parser.add_argument(
+            '--max-slowdown', type=float, default=0.2,
+            help='Допустимое замедление p50/p99 относительно базового (0.2 = 20%%)',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['iterations'] <= 0 or options['sample'] <= 0:
+            raise CommandError('--iterations и --sample должны быть больше нуля')
+        if options['warmup'] < 0:
+            raise CommandError('--warmup не может быть отрицательным')
+
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = load_results(options['compare'].read_text())
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Не удалось прочитать базовый замер: {error}')
+
+        benchmarks = Benchmarks(options['prefix'], options['sample'], options['seed'])
+        cases = benchmarks.cases()
+        if options['only']:
+            unknown = set(options['only']) - {name for name, _ in cases}
+            if unknown:
+                raise CommandError(f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+            cases = [case for case in cases if case[0] in options['only']]
+
+        results: List[BenchmarkResult] = []
+        # Тестовый клиент обращается к серверу testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            benchmarks.setup_admin()
+            try:
+                for name, operation in cases:
+                    result = run_benchmark(
+                        name, operation, options['iterations'], options['warmup'],
+                    )
+                    results.append(result)
+                    self.stdout.write(
+                        f'{name:<26} p50 {result.p50:9.2f} мс  '
+                        f'p99 {result.p99:9.2f} мс  '
+                        f'{result.throughput:9.1f} оп/с  '
+                        f'{result.queries:6.1f} SQL/оп'
+                    )
+            finally:
+                benchmarks.cleanup()
+
+        content = dump_results(results, metadata={
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'password_hasher': settings.PASSWORD_HASHER,
+            'profiles': Profile.objects.count(),
+            'iterations': options['iterations'],
+            'seed': options['seed'],
+        })
+        if options['output']:
+            options['output'].write_text(content)
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+        if baseline is None:
+            return
+        regressions = compare_results(
+            baseline, load_results(content), options['max_slowdown'],
+        )
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(
+                f'{regression.name}: {regression.metric} '
+                f'{regression.baseline} -> {regression.current}'
+            ))
+        if regressions:
+            raise CommandError(f'Ухудшений относительно базового замера: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Ухудшений нет'))
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from time import perf_counter
+from typing import Any, Optional
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+
+def _simulate_requests(alias: str, count: int) -> None:
+    """
+    count запросов подряд в текущем потоке: как обработчик Django,
+    закрываем устаревшие соединения до и после каждого запроса
+    """
+
+    try:
+        for _ in range(count):
+            close_old_connections()
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            close_old_connections()
+    finally:
+        connections.close_all()
+
+
+def measure(alias: str, conn_max_age: Optional[int], requests: int, threads: int) -> float:
+    """
+    Пропускная способность (запросов в секунду) при заданном CONN_MAX_AGE.
+
+    :param alias: Имя базы из settings.DATABASES
+    :param conn_max_age: Значение CONN_MAX_AGE на время замера
+    :param requests: Число запросов на каждый поток
+    :param threads: Число потоков (воркеров)
+
+    :returns: Запросов в секунду
+    """
+
+    settings_dict = connections.databases[alias]
+    previous = settings_dict['CONN_MAX_AGE']
+    # Соединения потоков создаются из этого же словаря настроек
+    settings_dict['CONN_MAX_AGE'] = conn_max_age
+    try:
+        workers = [
+            threading.Thread(target=_simulate_requests, args=(alias, requests))
+            for _ in range(threads)
+        ]
+        started = perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = perf_counter() - started
+    finally:
+        settings_dict['CONN_MAX_AGE'] = previous
+    return requests * threads / elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность простых запросов к базе '
+        'с новым соединением на каждый запрос (CONN_MAX_AGE=0) '
+        'и с постоянными соединениями из настроек.'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Имя базы из settings.DATABASES',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Число запросов на поток',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Число потоков, имитирующих воркеры',
+        )
+        parser.add_argument(
+            '--conn-max-age', type=int, default=None,
+            help='CONN_MAX_AGE для постоянных соединений '
+                 '(по умолчанию из настроек, 0 в настройках заменяется на 60)',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['requests'] <= 0 or options['threads'] <= 0:
+            raise CommandError('--requests и --threads должны быть больше нуля')
+        alias = options['database']
+        if alias not in connections.databases:
+            raise CommandError(f'База {alias} не настроена')
+
+        persistent = options['conn_max_age']
+        if persistent is None:
+            persistent = connections.databases[alias]['CONN_MAX_AGE'] or 60
+        if persistent == 0:
+            raise CommandError('--conn-max-age должен быть больше нуля')
+
+        direct = measure(alias, 0, options['requests'], options['threads'])
+        pooled = measure(alias, persistent, options['requests'], options['threads'])
+
+        self.stdout.write(f'CONN_MAX_AGE=0: {direct:.0f} запросов/с')
+        self.stdout.write(f'CONN_MAX_AGE={persistent}: {pooled:.0f} запросов/с')
+        self.stdout.write(self.style.SUCCESS(
+            f'Постоянные соединения быстрее в {pooled / direct:.1f} раза'
+        ))
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from utils.breached import DEFAULT_PREFIX_SIZE, build_corpus
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает файл базы утёкших паролей (BREACHED_PASSWORDS_CORPUS) '
+        'из текстового дампа: строки SHA1[:COUNT], как в выгрузке '
+        'Have I Been Pwned, или сами пароли (--plain).'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('source', help='Текстовый дамп')
+        parser.add_argument('output', help='Файл базы')
+        parser.add_argument(
+            '--plain', action='store_true',
+            help='В дампе пароли, а не SHA-1',
+        )
+        parser.add_argument(
+            '--prefix-size', type=int, default=DEFAULT_PREFIX_SIZE,
+            help='Сколько байт SHA-1 хранить на пароль',
+        )
+        parser.add_argument(
+            '--min-count', type=int, default=1,
+            help='Пропускать хэши, встреченные в утечках реже',
+        )
+        parser.add_argument(
+            '--temp-dir',
+            help='Каталог для временных файлов (нужно место размером с базу)',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        try:
+            with open(options['source'], encoding='utf-8', errors='replace') as lines:
+                count = build_corpus(
+                    lines, options['output'],
+                    prefix_size=options['prefix_size'],
+                    hashed=not options['plain'],
+                    min_count=options['min_count'],
+                    temp_dir=options['temp_dir'],
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'В базе {options["output"]} паролей: {count}'
+        ))
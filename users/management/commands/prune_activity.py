@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from users.services import (ensure_activity_partitions, get_retention_cutoff,
+                            prune_activity_partitions)
+from users.services.partitions import is_partitioning_supported
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт партиции таблицы активности на ближайшие месяцы и удаляет '
+        '(или архивирует) партиции старше INACTIVE_USER_DAYS + запас. '
+        'Запускать раз в сутки.'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--grace-days', type=int,
+            default=settings.ACTIVITY_RETENTION_GRACE_DAYS,
+            help='Сколько дней хранить события сверх окна активности',
+        )
+        parser.add_argument(
+            '--archive', action='store_true',
+            help=(
+                'Отсоединять партиции в схему '
+                f'{settings.ACTIVITY_ARCHIVE_SCHEMA} вместо удаления'
+            ),
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать партиции, которые будут удалены',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if not is_partitioning_supported():
+            raise CommandError('Партиционирование доступно только в PostgreSQL')
+
+        if not options['dry_run']:
+            for name in ensure_activity_partitions():
+                self.stdout.write(f'Создана партиция {name}')
+
+        cutoff = get_retention_cutoff(options['grace_days'])
+        pruned = prune_activity_partitions(
+            cutoff, archive=options['archive'], dry_run=options['dry_run'],
+        )
+
+        action = 'архивирована' if options['archive'] else 'удалена'
+        if options['dry_run']:
+            action = 'будет ' + action
+        for name in pruned:
+            self.stdout.write(f'Партиция {name} {action}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Граница хранения событий: {cutoff:%d.%m.%Y}'
+        ))
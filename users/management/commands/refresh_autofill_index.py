@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from passwords.models import Password
+from passwords.services import update_url_index
+from passwords.services.autofill import URL_FIELDS
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет хосты и домены паролей для автозаполнения: у записей, '
+        'сохранённых до появления индекса, или у всех (--all, например '
+        'после изменения списка публичных суффиксов). Ревизии хранилищ '
+        'не меняются - карты воркеров обновятся через AUTOFILL_CACHE_TTL.'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать все пароли, а не только без хоста',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько паролей обновлять за раз',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        passwords = Password.objects.only('url', *URL_FIELDS).order_by('pk')
+        if not options['all']:
+            passwords = passwords.filter(host=None).exclude(url=None).exclude(url='')
+
+        # Пачки по pk, а не по OFFSET (см. refresh_vault_health)
+        total = 0
+        last_pk = 0
+        while True:
+            chunk = list(
+                passwords.filter(pk__gt=last_pk)[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            for password in chunk:
+                update_url_index(password)
+            Password.objects.bulk_update(chunk, URL_FIELDS)
+            total += len(chunk)
+            last_pk = chunk[-1].pk
+            self.stdout.write(f'Обработано паролей: {total}')
+
+        self.stdout.write(self.style.SUCCESS(f'Готово, паролей: {total}'))
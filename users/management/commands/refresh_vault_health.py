@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from passwords.models import Password
+from passwords.services import refresh_vault_health
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет отпечатки и стойкость паролей для отчёта о здоровье '
+        'хранилища: у записей, сохранённых до появления отчёта, или у всех '
+        '(--all, например после обновления базы утечек).'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать все пароли, а не только без отпечатка',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько паролей расшифровывать и обновлять за раз',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        passwords = Password.objects.only(
+            'owner_id', 'passwords', 'updated_at',
+            'fingerprint', 'strength', 'password_changed_at',
+        ).order_by('pk')
+        if not options['all']:
+            passwords = passwords.filter(fingerprint=None)
+
+        # Пачки по pk, а не по OFFSET: обновлённые без --all строки
+        # выпадают из выборки, и смещение пропускало бы пароли
+        total = 0
+        last_pk = 0
+        while True:
+            chunk = list(
+                passwords.filter(pk__gt=last_pk)[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            total += refresh_vault_health(chunk)
+            last_pk = chunk[-1].pk
+            self.stdout.write(f'Обработано паролей: {total}')
+
+        self.stdout.write(self.style.SUCCESS(f'Готово, паролей: {total}'))
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any, List
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+from django.db.backends.utils import CursorWrapper
+from django.db.transaction import atomic
+
+from passwords.models import Password, Tag, Tombstone
+from users.choices import ActivityChoices
+from users.models import Activity, Profile
+from users.services import ensure_activity_partitions
+
+
+# Пароль всех сгенерированных пользователей
+BENCHMARK_PASSWORD = 'BenchPassw0rd33'
+
+
+def delete_benchmark_data(prefix: str) -> int:
+    """
+    Удаляет пользователей с именами <prefix>-* и все их данные.
+
+    :returns: Число удалённых пользователей
+    """
+
+    owners = Profile.objects.filter(user__username__startswith=f'{prefix}-')
+    with atomic():
+        # У тегов внешний ключ на пароль без каскада - удаляем их первыми
+        Tag.objects.filter(owner__in=owners).delete()
+        Password.objects.filter(owner__in=owners).delete()
+        Tombstone.objects.filter(owner__in=owners).delete()
+        Activity.objects.filter(profile__in=owners).delete()
+        owners.delete()
+        deleted, _ = User.objects.filter(
+            username__startswith=f'{prefix}-',
+        ).delete()
+    return deleted
+
+
+def _insert_profiles(
+    cursor: CursorWrapper, prefix: str, first: int, last: int,
+    password_hash: str, revision: int,
+) -> List[int]:
+    """ Пользователи с номерами first..last и их профили """
+
+    cursor.execute(
+        f'WITH users AS ('
+        f'  INSERT INTO {User._meta.db_table} (password, is_superuser, '
+        f'  username, first_name, last_name, email, is_staff, is_active, '
+        f'  date_joined) '
+        f"  SELECT %s, false, %s || n, '', '', %s || n || '@example.com', "
+        f'  false, true, now() FROM generate_series(%s, %s) AS n '
+        f'  RETURNING id'
+        f') '
+        f'INSERT INTO {Profile._meta.db_table} '
+        f'(user_id, created_at, last_activity_at, vault_revision) '
+        # Последняя активность равномерно за год - примерно половина
+        # профилей активна (INACTIVE_USER_DAYS)
+        f"SELECT id, current_date, now() - random() * interval '365 days', %s "
+        f'FROM users RETURNING id',
+        [password_hash, f'{prefix}-', f'{prefix}-', first, last, revision],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _insert_vaults(
+    cursor: CursorWrapper, profile_ids: List[int],
+    passwords: int, tags: int,
+) -> None:
+    """ passwords паролей на профиль, у каждого tags тегов """
+
+    # Свой домен у каждого пароля, как на реальных сайтах
+    # (host и domain - как заполняет passwords.services.autofill)
+    cursor.execute(
+        f'INSERT INTO {Password._meta.db_table} '
+        f'(owner_id, title, url, host, domain, login, passwords, updated_at, revision) '
+        f"SELECT p, 'site ' || n, 'https://site' || n || '.test/login', "
+        f"'site' || n || '.test', 'site' || n || '.test', "
+        f"'login' || n, md5(p || ':' || n), now(), n "
+        f'FROM unnest(%s) AS p, generate_series(1, %s) AS n',
+        [profile_ids, passwords],
+    )
+    if not tags:
+        return
+    colors = [color for color, _ in Tag.COLOR_PICKER]
+    cursor.execute(
+        f'INSERT INTO {Tag._meta.db_table} '
+        f'(owner_id, password_id, tag, color, updated_at, revision) '
+        f"SELECT owner_id, id, 'tag ' || n, "
+        f'(%s::text[])[1 + (id + n) %% %s], updated_at, revision '
+        f'FROM {Password._meta.db_table}, generate_series(1, %s) AS n '
+        f'WHERE owner_id = ANY(%s)',
+        [colors, len(colors), tags, profile_ids],
+    )
+
+
+def _insert_activities(
+    cursor: CursorWrapper, profile_ids: List[int], activities: int,
+) -> None:
+    """ activities событий на профиль за последний год """
+
+    cursor.execute(
+        f'INSERT INTO {Activity._meta.db_table} (profile_id, activity, date) '
+        f'SELECT p, (%s::text[])[1 + n %% %s], '
+        f"now() - random() * interval '365 days' "
+        f'FROM unnest(%s) AS p, generate_series(1, %s) AS n',
+        [ActivityChoices.values, len(ActivityChoices.values), profile_ids, activities],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу данными для нагрузочного тестирования (bench_api): '
+        'пользователи <prefix>-N с паролями, тегами и историей активности. '
+        'Данные вставляются пачками на стороне PostgreSQL, миллион '
+        'профилей создаётся за минуты.'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--profiles', type=int, default=10000,
+            help='Число пользователей',
+        )
+        parser.add_argument(
+            '--passwords', type=int, default=10,
+            help='Паролей на пользователя',
+        )
+        parser.add_argument(
+            '--tags', type=int, default=1,
+            help='Тегов на пароль',
+        )
+        parser.add_argument(
+            '--activities', type=int, default=20,
+            help='Событий активности на пользователя',
+        )
+        parser.add_argument(
+            '--batch', type=int, default=10000,
+            help='Пользователей в одной транзакции',
+        )
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс имён пользователей',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее сгенерированные данные с этим префиксом',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if connection.vendor != 'postgresql':
+            raise CommandError('Генерация данных доступна только в PostgreSQL')
+        if options['profiles'] <= 0 or options['batch'] <= 0:
+            raise CommandError('--profiles и --batch должны быть больше нуля')
+        if min(options['passwords'], options['tags'], options['activities']) < 0:
+            raise CommandError('Число паролей, тегов и событий не может быть отрицательным')
+
+        prefix = options['prefix']
+        if options['clear']:
+            deleted = delete_benchmark_data(prefix)
+            self.stdout.write(f'Удалено пользователей: {deleted}')
+        elif User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(
+                f'Пользователи {prefix}-* уже есть, используйте --clear'
+            )
+
+        # События старше созданных партиций попадут в партицию по умолчанию
+        ensure_activity_partitions()
+        # Хэш считается один раз: его проверка не входит в замеры генерации
+        password_hash = make_password(BENCHMARK_PASSWORD)
+
+        total = options['profiles']
+        for first in range(1, total + 1, options['batch']):
+            last = min(first + options['batch'] - 1, total)
+            with atomic(), connection.cursor() as cursor:
+                profile_ids = _insert_profiles(
+                    cursor, prefix, first, last,
+                    password_hash, options['passwords'],
+                )
+                if options['passwords']:
+                    _insert_vaults(
+                        cursor, profile_ids, options['passwords'], options['tags'],
+                    )
+                if options['activities']:
+                    _insert_activities(cursor, profile_ids, options['activities'])
+            self.stdout.write(f'Создано пользователей: {last} из {total}')
+
+        with connection.cursor() as cursor:
+            for model in (User, Profile, Password, Tag, Activity):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Пароль пользователей {prefix}-N: {BENCHMARK_PASSWORD}'
+        ))
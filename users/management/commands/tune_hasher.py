@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import BasePasswordHasher
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from utils.hashers import (TunableArgon2PasswordHasher,
+                           TunableBCryptSHA256PasswordHasher,
+                           TunablePBKDF2PasswordHasher)
+
+
+SAMPLE_PASSWORD = 'correct horse battery staple'
+PBKDF2_PROBE_ITERATIONS = 100000
+BCRYPT_ROUNDS_RANGE = range(10, 21)
+
+
+def _trial(hasher_class: type, **params: Any) -> BasePasswordHasher:
+    """ Хэшер с заданными параметрами вместо значений из settings """
+    return type('TrialHasher', (hasher_class,), params)()
+
+
+def measure(hasher: BasePasswordHasher, repeat: int) -> float:
+    """ Лучшее из repeat время хэширования одного пароля, в мс """
+
+    timings = []
+    for _ in range(repeat):
+        started = perf_counter()
+        hasher.encode(SAMPLE_PASSWORD, hasher.salt())
+        timings.append(perf_counter() - started)
+    return min(timings) * 1000
+
+
+def tune_pbkdf2(target_ms: float, repeat: int) -> Tuple[Dict[str, int], float]:
+    # Время PBKDF2 линейно по числу итераций - хватает одного замера
+    probe = measure(
+        _trial(TunablePBKDF2PasswordHasher, iterations=PBKDF2_PROBE_ITERATIONS),
+        repeat,
+    )
+    iterations = max(
+        10000, int(round(PBKDF2_PROBE_ITERATIONS * target_ms / probe, -3)),
+    )
+    elapsed = measure(
+        _trial(TunablePBKDF2PasswordHasher, iterations=iterations), repeat,
+    )
+    return {'PBKDF2_ITERATIONS': iterations}, elapsed
+
+
+def _largest_within(
+    target_ms: float, candidates: List[Any],
+    make: Callable[[Any], BasePasswordHasher], repeat: int,
+) -> Tuple[Any, float]:
+    """ Самый дорогой параметр, укладывающийся в target_ms """
+
+    best = candidates[0], measure(make(candidates[0]), repeat)
+    for value in candidates[1:]:
+        elapsed = measure(make(value), repeat)
+        if elapsed > target_ms:
+            break
+        best = value, elapsed
+    return best
+
+
+def tune_argon2(target_ms: float, repeat: int) -> Tuple[Dict[str, int], float]:
+    # Память и параллельность задаются заранее, подбирается число проходов:
+    # удваиваем, пока укладываемся в target_ms, затем делим отрезок пополам
+    def make(value: int) -> BasePasswordHasher:
+        return _trial(TunableArgon2PasswordHasher, time_cost=value)
+
+    low, elapsed = 1, measure(make(1), repeat)
+    high = None
+    while high is None:
+        value = low * 2
+        value_elapsed = measure(make(value), repeat)
+        if value_elapsed > target_ms:
+            high = value
+        else:
+            low, elapsed = value, value_elapsed
+    while high - low > 1:
+        value = (low + high) // 2
+        value_elapsed = measure(make(value), repeat)
+        if value_elapsed > target_ms:
+            high = value
+        else:
+            low, elapsed = value, value_elapsed
+
+    return {
+        'ARGON2_TIME_COST': low,
+        'ARGON2_MEMORY_COST': settings.ARGON2_MEMORY_COST,
+        'ARGON2_PARALLELISM': settings.ARGON2_PARALLELISM,
+    }, elapsed
+
+
+def tune_bcrypt(target_ms: float, repeat: int) -> Tuple[Dict[str, int], float]:
+    rounds, elapsed = _largest_within(
+        target_ms, list(BCRYPT_ROUNDS_RANGE),
+        lambda value: _trial(TunableBCryptSHA256PasswordHasher, rounds=value),
+        repeat,
+    )
+    return {'BCRYPT_ROUNDS': rounds}, elapsed
+
+
+TUNERS = {
+    'pbkdf2': tune_pbkdf2,
+    'argon2': tune_argon2,
+    'bcrypt': tune_bcrypt,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Подбирает стоимость хэширования паролей под целевое время '
+        'на этом сервере и печатает переменные окружения для неё.'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--hasher', choices=sorted(TUNERS), default=settings.PASSWORD_HASHER,
+            help='Хэшер (по умолчанию PASSWORD_HASHER)',
+        )
+        parser.add_argument(
+            '--target-ms', type=float, default=250,
+            help='Целевое время хэширования одного пароля, мс',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Сколько замеров делать для каждого значения',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['target_ms'] <= 0 or options['repeat'] <= 0:
+            raise CommandError('--target-ms и --repeat должны быть больше нуля')
+
+        try:
+            params, elapsed = TUNERS[options['hasher']](
+                options['target_ms'], options['repeat'],
+            )
+        except ValueError as error:
+            # Не установлена библиотека argon2-cffi или bcrypt
+            raise CommandError(str(error))
+
+        for name, value in params.items():
+            self.stdout.write(f'{name}={value}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["hasher"]}: {elapsed:.0f} мс на пароль, '
+            f'~{1000 / elapsed:.1f} хэшей в секунду на поток хэширования'
+        ))
@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
 
-from .profile import ProfileManager
+from .activity import ActivityManager, ActivityQuerySet
+from .profile import ProfileManager, ProfileQuerySet
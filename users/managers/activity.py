@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+from django.db import models
+from django.db.models import QuerySet
+
+from utils import get_activity_window_start
+
+
+class ActivityQuerySet(models.QuerySet):
+    """ QuerySet для модели Activity """
+
+    def in_window(self) -> QuerySet:
+        """
+        Возвращает события внутри окна активности пользователей.
+        Граница окна передаётся константой, поэтому PostgreSQL
+        читает только партиции, попадающие в окно.
+        """
+
+        return self.filter(date__gte=get_activity_window_start())
+
+
+class ActivityManager(models.Manager.from_queryset(ActivityQuerySet)):
+    """ Менеджер для модели Activity """
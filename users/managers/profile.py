@@ -1,28 +1,44 @@
 # -*- coding: utf-8 -*-
 
-from datetime import timedelta
-
 from django.db import models
-from django.db.models import QuerySet
-from config import settings
+from django.db.models import BooleanField, Case, Q, QuerySet, Value, When
 
-from utils import get_current_date
+from utils import get_activity_window_start
 
-class ProfileManager(models.Manager):
-    """ Менеджер для модели Profile """
 
-    END_DATE = get_current_date()
-    START_DATE = END_DATE- timedelta(days=settings.INACTIVE_USER_DAYS)
+class ProfileQuerySet(models.QuerySet):
+    """ QuerySet для модели Profile """
+
+    def _activity_range(self) -> Q:
+        """
+        Условие попадания последней активности в окно активности.
+        Окно считается на момент построения запроса, а не импорта модуля.
+        """
+
+        return Q(last_activity_at__gte=get_activity_window_start())
+
+    def with_is_active(self) -> QuerySet:
+        """
+        Аннотирует queryset признаком активности is_active,
+        который считается в SQL по колонке last_activity_at.
+        """
+
+        return self.annotate(is_active=Case(
+            When(self._activity_range(), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
 
     def active(self) -> QuerySet:
         """ Возвращает queryset активных пользоватлей """
 
-        qs =self.get_queryset()
-        return qs.filter(last_activity__range=[self.START_DATE, self.END_DATE])
-
+        return self.filter(self._activity_range())
 
     def not_active(self) -> QuerySet:
         """ Возвращает queryset из не активных пользователей """
 
-        qs = self.get_queryset()
-        return qs.exclude(last_activity__range=[self.START_DATE, self.END_DATE])
+        return self.exclude(self._activity_range())
+
+
+class ProfileManager(models.Manager.from_queryset(ProfileQuerySet)):
+    """ Менеджер для модели Profile """
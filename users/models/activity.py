@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+from django.db import models
+from django.utils import timezone
+
+from users.choices import ActivityChoices
+from users.managers import ActivityManager
+
+
+class Activity(models.Model):
+    """
+    Модель события активности пользователя.
+    Таблица только пополняется, записи пишутся пачками
+    через users.services.record_activity. В PostgreSQL таблица
+    партиционирована по месяцам (users.services.partitions).
+    """
+
+    profile = models.ForeignKey(
+        'users.Profile',
+        on_delete=models.CASCADE,
+        related_name='activities',
+        verbose_name='Профиль'
+    )
+
+    activity = models.CharField(
+        max_length=32,
+        choices=ActivityChoices.choices,
+        verbose_name='Тип активности'
+    )
+
+    date = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Время активности'
+    )
+
+    objects = ActivityManager()
+
+    class Meta:
+        verbose_name = 'активность'
+        verbose_name_plural = 'активности'
+        indexes = [
+            models.Index(fields=['profile', 'date']),
+        ]
@@ -4,11 +4,9 @@ from typing import Optional
 from datetime import datetime
 
 from django.db import models
-from config import settings
-from django.utils.timezone import get_current_timezone
 
 from users.managers import ProfileManager
-from utils import get_current_date
+from utils import get_activity_window_start
 
 
 class Profile(models.Model):
@@ -34,6 +32,21 @@ class Profile(models.Model):
         verbose_name='Фамилия'
     )
 
+    # Денормализованное время последней активности, обновляется
+    # сервисом записи активности (users.services.update_last_activity)
+    last_activity_at = models.DateTimeField(
+        null=True, blank=True,
+        db_index=True,
+        verbose_name='Время последней активности'
+    )
+
+    # Счётчик изменений хранилища паролей, каждая запись паролей
+    # и тегов получает следующее значение (passwords.services.sync)
+    vault_revision = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Ревизия хранилища'
+    )
+
     objects = ProfileManager()
 
     class Meta:
@@ -47,27 +60,29 @@ class Profile(models.Model):
         Проверка активности пользователей.
         Если последняя активность была больше чем 182 дня назад -
         пользователь не активен.
+
+        Если профиль получен через Profile.objects.with_is_active(),
+        используется посчитанное в SQL значение.
         """
 
+        if '_is_active' in self.__dict__:
+            return self._is_active
+
         if not self.last_activity:
             return False
 
-        now = get_current_date()
-        delta_in_days = (now - self.last_activity.date()).days
+        return self.last_activity >= get_activity_window_start()
 
-        if delta_in_days >= settings.INACTIVE_USER_DAYS:
-            return False
-        return True
+    @is_active.setter
+    def is_active(self, value: bool) -> None:
+        """ Сохраняем значение аннотации is_active из queryset """
+        self._is_active = value
 
 
     @property
     def last_activity(self) -> Optional[datetime]:
         """ Время последней активности пользователя """
-
-        if hasattr(self, 'activities'):
-            if last_activity := self.activities.last():
-                return last_activity.date.replace(tzinfo=get_current_timezone())
-        return None
+        return self.last_activity_at
 
 
     @property
@@ -1,3 +1,3 @@
 # -*- coding: utf-8 -*-
 
-from .schema import Mutation
+from .schema import Mutation, Query
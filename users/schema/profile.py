@@ -1,29 +1,118 @@
 # -*- coding: utf-8 -*-
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from django.core.exceptions import ValidationError
 from graphql.error import GraphQLError
+from graphql_jwt.decorators import login_required
+from promise import Promise
 
 import graphene
 from graphene import relay, ObjectType
 from graphene_django.types import DjangoObjectType
 
+from passwords.schema import PasswordConnection, PasswordNode, PasswordOrder
+from passwords.schema.loaders import PasswordsByOwnerLoader
+from passwords.services import (decrypt_secrets, encode_cursor,
+                                get_password_page)
+from users.choices import ActivityChoices
 from users.models import Profile
-from users.services import (create_profile, gen_jwt_token,
-                            update_profile, update_password)
+from users.services import (create_profile, gen_jwt_token, get_user_profile,
+                            record_activity, update_profile, update_password)
+from utils.dataloaders import get_dataloader
 
 
+def _is_viewer(profile: Profile, info: graphene.ResolveInfo) -> bool:
+    """
+    Профиль принадлежит пользователю запроса. Хранилище отдаётся
+    только владельцу, даже если профиль попал в ответ иначе, чем
+    через me (например, в результате мутации).
+    """
+
+    user = info.context.user
+    return user.is_authenticated and profile.user_id == user.pk
+
+
+def _viewer_user_id(
+    info: graphene.ResolveInfo, user_id: Optional[int],
+) -> int:
+    """
+    ID пользователя запроса для мутаций профиля. user_id из запроса
+    оставлен для совместимости и должен совпадать с пользователем токена.
+
+    :raises GraphQLError: user_id чужого пользователя
+    """
+
+    if user_id is not None and user_id != info.context.user.pk:
+        raise GraphQLError(message='Недостаточно прав')
+    return info.context.user.pk
+
 
 class ProfileNode(DjangoObjectType):
     class Meta:
         model = Profile
         interfaces = (relay.Node,)
-        # exclude_fields = ('password',)
+        fields = ('id', 'created_at', 'first_name', 'last_name')
 
     user_id = graphene.Int()
     username = graphene.String()
     email = graphene.String()
+    passwords = graphene.List(graphene.NonNull(PasswordNode), required=True)
+    password_connection = graphene.Field(
+        PasswordConnection,
+        required=True,
+        first=graphene.Int(),
+        after=graphene.String(),
+        last=graphene.Int(),
+        before=graphene.String(),
+        order_by=PasswordOrder(default_value=PasswordOrder.ID.value),
+    )
+
+    @staticmethod
+    def resolve_passwords(
+        profile: Profile, info: graphene.ResolveInfo,
+    ) -> Promise:
+        """ Пароли профиля, загружаются пачкой вместе с их тегами """
+
+        if not _is_viewer(profile, info):
+            return []
+        record_activity(profile.pk, ActivityChoices.GET_PASSWORDS)
+        return get_dataloader(info, PasswordsByOwnerLoader).load(profile.pk)
+
+    @staticmethod
+    def resolve_password_connection(
+        profile: Profile, info: graphene.ResolveInfo,
+        order_by: str, **kwargs: Any
+    ) -> PasswordConnection:
+        """
+        Пароли профиля постранично. Курсор хранит ключ сортировки,
+        страница выбирается по индексу без OFFSET.
+        """
+
+        if not _is_viewer(profile, info):
+            raise GraphQLError(message='Недостаточно прав')
+        try:
+            page = get_password_page(owner_id=profile.pk, order=order_by, **kwargs)
+        except ValueError as error:
+            raise GraphQLError(message=str(error))
+
+        record_activity(profile.pk, ActivityChoices.GET_PASSWORDS)
+        decrypt_secrets(page.items)
+        edges = [
+            PasswordConnection.Edge(
+                node=password, cursor=encode_cursor(order_by, password),
+            )
+            for password in page.items
+        ]
+        return PasswordConnection(
+            edges=edges,
+            page_info=relay.PageInfo(
+                has_next_page=page.has_next_page,
+                has_previous_page=page.has_previous_page,
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+            ),
+        )
 
 
 class RegisterUserMutation(relay.ClientIDMutation):
@@ -84,20 +173,23 @@ class UpdateProfileMutation(relay.ClientIDMutation):
     profile = graphene.Field(ProfileNode)
 
     class Input:
-        user_id = graphene.Int(required=True)
+        user_id = graphene.Int(
+            deprecation_reason='Профиль берётся из токена',
+        )
         username = graphene.String(required=False)
         email = graphene.String(required=False)
         first_name = graphene.String(required=False)
         last_name = graphene.String(required=False)
 
     @staticmethod
+    @login_required
     def mutate_and_get_payload(
         root: Any,
         info: graphene.ResolveInfo,
         **input: Dict[str, Any]
     ):
         """
-        Редактирование профиля.
+        Редактирование профиля текущего пользователя.
 
         :param root: Корневой объект, который передаётся в мутацию.
          Обычно не используется.
@@ -110,7 +202,7 @@ class UpdateProfileMutation(relay.ClientIDMutation):
 
         try:
             profile = update_profile(
-                user_id=input['user_id'],
+                user_id=_viewer_user_id(info, input.get('user_id')),
                 new_username=input['username'],
                 new_email=input['email'],
                 new_first_name=input['first_name'],
@@ -133,19 +225,22 @@ class UpdatePasswordMutation(relay.ClientIDMutation):
     token = graphene.String()
 
     class Input:
-        user_id = graphene.Int(required=True)
+        user_id = graphene.Int(
+            deprecation_reason='Профиль берётся из токена',
+        )
         old_password = graphene.String(required=True)
         new_password = graphene.String(required=True)
         repeat_password = graphene.String(required=True)
 
     @staticmethod
+    @login_required
     def mutate_and_get_payload(
         root: Any,
         info: graphene.ResolveInfo,
         **input: Dict[str, Any]
                         ):
         """
-        Обновляет пароль пользователя и отдает токен для аутентификации
+        Обновляет пароль текущего пользователя и отдает токен для аутентификации
 
         :param root: Корневой объект, который передаётся в мутацию.
          Обычно не используется.
@@ -160,7 +255,7 @@ class UpdatePasswordMutation(relay.ClientIDMutation):
 
         try:
             profile = update_password(
-                user_id=input['user_id'],
+                user_id=_viewer_user_id(info, input.get('user_id')),
                 old_password=input['old_password'],
                 new_password=input['new_password'],
                 repeat_password=input['repeat_password']
@@ -177,6 +272,16 @@ class UpdatePasswordMutation(relay.ClientIDMutation):
 
 
 
+class Query(ObjectType):
+    me = graphene.Field(ProfileNode)
+
+    @staticmethod
+    @login_required
+    def resolve_me(root: Any, info: graphene.ResolveInfo) -> Profile:
+        """ Профиль текущего пользователя """
+        return get_user_profile(info.context.user)
+
+
 class Mutation(ObjectType):
     register_user = RegisterUserMutation.Field()
     update_profile = UpdateProfileMutation.Field()
@@ -3,7 +3,14 @@
 from graphene import ObjectType
 from graphene_django.types import DjangoObjectType
 
-from .profile import Mutation as ProfileMutation
+from .profile import Mutation as ProfileMutation, Query as ProfileQuery
+
+
+class Query(
+    ProfileQuery,
+    ObjectType,
+):
+    pass
 
 
 class Mutation(
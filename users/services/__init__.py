@@ -1,4 +1,9 @@
 # -*- coding: utf-8 -*-
 
-from .profile import (create_profile, gen_jwt_token, update_profile,
-                      update_password)
+from .activity import flush_activities, record_activity, update_last_activity
+from .auth import (get_user_by_natural_key, get_user_profile,
+                   invalidate_user_cache, jwt_decode, jwt_encode)
+from .partitions import (create_activity_partition, ensure_activity_partitions,
+                         get_retention_cutoff, prune_activity_partitions)
+from .profile import (create_profile, gen_jwt_token, get_profile_by_user,
+                      update_profile, update_password)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+from datetime import datetime
+from time import monotonic
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from users.choices import ActivityChoices
+from users.models import Activity, Profile
+
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer:
+    """
+    Буфер событий активности в памяти воркера.
+    События копятся между запросами и пишутся в базу пачкой.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._events: List[Activity] = []
+        self._first_event_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(self, event: Activity) -> int:
+        """ Добавляет событие и возвращает размер буфера """
+
+        with self._lock:
+            if not self._events:
+                self._first_event_at = monotonic()
+            self._events.append(event)
+            return len(self._events)
+
+    def is_ready(self) -> bool:
+        """ Пора ли сбрасывать буфер (по размеру или по возрасту) """
+
+        with self._lock:
+            if not self._events:
+                return False
+            if len(self._events) >= settings.ACTIVITY_FLUSH_SIZE:
+                return True
+            age = monotonic() - self._first_event_at
+            return age >= settings.ACTIVITY_FLUSH_INTERVAL
+
+    def drain(self) -> List[Activity]:
+        """ Забирает все накопленные события, очищая буфер """
+
+        with self._lock:
+            events, self._events = self._events, []
+            self._first_event_at = None
+            return events
+
+
+activity_buffer = ActivityBuffer()
+
+
+def record_activity(
+    profile_id: int,
+    activity: ActivityChoices,
+    date: Optional[datetime] = None,
+) -> None:
+    """
+    Сервис записи активности пользователя.
+
+    Событие только кладётся в буфер воркера, запись в базу происходит
+    пачкой по окончании запроса (см. users.signals.activity).
+    Если за один запрос буфер переполнился - сбрасываем сразу.
+
+    :param profile_id: ID профиля
+    :param activity: Тип активности
+    :param date: Время активности, по умолчанию текущее
+    """
+
+    size = activity_buffer.add(Activity(
+        profile_id=profile_id,
+        activity=activity,
+        date=date or timezone.now(),
+    ))
+
+    if size >= settings.ACTIVITY_BUFFER_LIMIT:
+        flush_activities()
+
+
+def flush_activities(force: bool = True) -> int:
+    """
+    Сервис сброса буфера активности в базу.
+
+    События пишутся одним bulk_create, время последней активности
+    профилей обновляется одним UPDATE.
+
+    :param force: Сбрасывать ли буфер, если порог ещё не достигнут
+
+    :returns: Количество записанных событий
+    """
+
+    if not force and not activity_buffer.is_ready():
+        return 0
+
+    events = activity_buffer.drain()
+    if not events:
+        return 0
+
+    try:
+        return _write_activities(events)
+    except IntegrityError:
+        # Профиль мог быть удалён, пока событие лежало в буфере
+        existing = set(Profile.objects.filter(
+            pk__in={event.profile_id for event in events},
+        ).values_list('pk', flat=True))
+        return _write_activities([
+            event for event in events if event.profile_id in existing
+        ])
+    except Exception:
+        logger.exception('Не удалось записать %d событий активности', len(events))
+        return 0
+
+
+@atomic
+def _write_activities(events: List[Activity]) -> int:
+    """ Записывает пачку событий и обновляет last_activity_at """
+
+    if not events:
+        return 0
+
+    Activity.objects.bulk_create(events, batch_size=settings.ACTIVITY_FLUSH_SIZE)
+
+    timestamps: Dict[int, datetime] = {}
+    for event in events:
+        last = timestamps.get(event.profile_id)
+        if last is None or event.date > last:
+            timestamps[event.profile_id] = event.date
+    update_last_activity(timestamps)
+
+    return len(events)
+
+
+def update_last_activity(timestamps: Dict[int, datetime]) -> int:
+    """
+    Сервис обновления денормализованного времени последней активности.
+
+    Все профили обновляются одним UPDATE, время активности
+    только увеличивается (устаревшие события не откатывают его назад).
+
+    :param timestamps: Словарь {id профиля: время активности}
+
+    :returns: Количество обновлённых профилей
+    """
+
+    if not timestamps:
+        return 0
+
+    new_value = Case(
+        *(
+            When(pk=profile_id, then=Value(date))
+            for profile_id, date in timestamps.items()
+        ),
+        output_field=DateTimeField(),
+    )
+
+    return Profile.objects.filter(pk__in=timestamps.keys()).update(
+        last_activity_at=Greatest(
+            Coalesce(F('last_activity_at'), new_value), new_value,
+        ),
+    )
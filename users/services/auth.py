@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from graphql_jwt import utils as jwt_utils
+
+from users.models import Profile
+from utils.cache import TTLCache
+from utils.metrics import jwt_tokens
+
+
+# Пользователи по username из JWT вместе с профилем
+jwt_user_cache = TTLCache(
+    maxsize=settings.JWT_USER_CACHE_SIZE,
+    ttl=settings.JWT_USER_CACHE_TTL,
+    prefix='jwt-user',
+    backend=settings.JWT_USER_CACHE_BACKEND,
+)
+
+
+def get_user_by_natural_key(username: str) -> Optional[User]:
+    """
+    Сервис получения пользователя по username из JWT
+    (JWT_GET_USER_BY_NATURAL_KEY_HANDLER).
+
+    Пользователь загружается одним запросом вместе с профилем
+    и кэшируется на JWT_USER_CACHE_TTL секунд, так что повторные
+    запросы с тем же токеном не ходят в базу ни за пользователем,
+    ни за профилем.
+
+    :param username: Имя пользователя
+
+    :returns: Объект auth.User или None, если пользователя нет
+    """
+
+    user = jwt_user_cache.get(username)
+    if user is not None:
+        return user
+
+    user = User.objects.select_related('profile').filter(
+        username=username,
+    ).first()
+    if user is not None:
+        jwt_user_cache.set(username, user)
+    return user
+
+
+def invalidate_user_cache(*usernames: str) -> None:
+    """
+    Сервис сброса кэша пользователей JWT.
+
+    Сбрасывает кэш текущего процесса и общий кэш. Кэши других
+    воркеров (без JWT_USER_CACHE_BACKEND) устаревают не дольше
+    чем через JWT_USER_CACHE_TTL секунд.
+
+    :param usernames: Имена пользователей
+    """
+
+    jwt_user_cache.delete(*usernames)
+
+
+def get_user_profile(user: User) -> Profile:
+    """
+    Сервис получения профиля авторизованного пользователя.
+    У пользователя из get_user_by_natural_key профиль уже загружен,
+    иначе он выбирается одним запросом.
+
+    :param user: Пользователь запроса
+
+    :returns: Объект users.Profile
+    """
+
+    return user.profile
+
+
+def jwt_encode(payload: Dict[str, Any], context: Any = None) -> str:
+    """
+    Сервис выпуска JWT токена (JWT_ENCODE_HANDLER).
+    Выпущенные токены считаются в метрике jwt_tokens.
+
+    :param payload: Данные токена
+    :param context: Контекст запроса GraphQL
+
+    :returns: Токен
+    """
+
+    token = jwt_utils.jwt_encode(payload, context)
+    jwt_tokens.labels('issue', 'success').inc()
+    return token
+
+
+def jwt_decode(token: str, context: Any = None) -> Dict[str, Any]:
+    """
+    Сервис проверки JWT токена (JWT_DECODE_HANDLER).
+    Проверки считаются в метрике jwt_tokens по результату.
+
+    :param token: Токен
+    :param context: Контекст запроса GraphQL
+
+    :raises jwt.InvalidTokenError: Токен просрочен или подпись неверна
+
+    :returns: Данные токена
+    """
+
+    try:
+        payload = jwt_utils.jwt_decode(token, context)
+    except Exception:
+        jwt_tokens.labels('verify', 'failure').inc()
+        raise
+    jwt_tokens.labels('verify', 'success').inc()
+    return payload
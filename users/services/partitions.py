@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+
+import re
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.utils import CursorWrapper
+from django.db.transaction import atomic
+from django.utils.timezone import get_default_timezone, make_aware
+
+from users.models import Activity
+from utils import get_current_date
+
+
+ACTIVITY_TABLE = Activity._meta.db_table
+LEGACY_TABLE = f'{ACTIVITY_TABLE}_unpartitioned'
+DEFAULT_PARTITION = f'{ACTIVITY_TABLE}_default'
+PARTITION_RE = re.compile(rf'^{ACTIVITY_TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+def is_partitioning_supported() -> bool:
+    """ Партиционирование есть только у PostgreSQL """
+    return connection.vendor == 'postgresql'
+
+
+def month_start(day: date) -> date:
+    """ Первое число месяца для даты day """
+    return day.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    """ Сдвигает первое число месяца на count месяцев """
+
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """ Имя партиции таблицы активности для месяца month """
+    return f'{ACTIVITY_TABLE}_p{month.year:04d}_{month.month:02d}'
+
+
+def _month_bounds(month: date) -> Tuple[datetime, datetime]:
+    """ Границы партиции месяца в часовом поясе проекта """
+
+    tz = get_default_timezone()
+    return (
+        make_aware(datetime.combine(month, time.min), tz, is_dst=False),
+        make_aware(
+            datetime.combine(add_months(month, 1), time.min), tz, is_dst=False,
+        ),
+    )
+
+
+def _table_exists(cursor: CursorWrapper, name: str) -> bool:
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+    return cursor.fetchone()[0]
+
+
+def _is_partitioned(cursor: CursorWrapper) -> bool:
+    cursor.execute(
+        'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table '
+        'WHERE partrelid = to_regclass(%s))',
+        [ACTIVITY_TABLE],
+    )
+    return cursor.fetchone()[0]
+
+
+def _create_partition(cursor: CursorWrapper, month: date) -> Optional[str]:
+    """
+    Создаёт партицию месяца, если её ещё нет.
+    События этого месяца, попавшие в партицию по умолчанию,
+    переносятся в новую партицию.
+    """
+
+    name = partition_name(month)
+    if _table_exists(cursor, name):
+        return None
+
+    start, end = _month_bounds(month)
+    cursor.execute(
+        f'CREATE TABLE {name} (LIKE {ACTIVITY_TABLE} INCLUDING DEFAULTS)'
+    )
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+        f'WHERE date >= %s AND date < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved',
+        [start, end],
+    )
+    cursor.execute(
+        f'ALTER TABLE {ACTIVITY_TABLE} ATTACH PARTITION {name} '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [start, end],
+    )
+    return name
+
+
+def _partition_table(cursor: CursorWrapper) -> None:
+    """
+    Превращает обычную таблицу активности в партиционированную по месяцам.
+    Индексы и внешние ключи пересоздаются с прежними именами,
+    чтобы дальнейшие миграции Django находили их.
+    """
+
+    cursor.execute(f'LOCK TABLE {ACTIVITY_TABLE} IN ACCESS EXCLUSIVE MODE')
+    cursor.execute(f'ALTER TABLE {ACTIVITY_TABLE} RENAME TO {LEGACY_TABLE}')
+
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s "
+        "AND indexname NOT IN (SELECT conname FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'p')",
+        [LEGACY_TABLE, LEGACY_TABLE],
+    )
+    indexes = [
+        re.sub(rf' ON (ONLY )?\S*{LEGACY_TABLE} ', f' ON {ACTIVITY_TABLE} ', row[0])
+        for row in cursor.fetchall()
+    ]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [LEGACY_TABLE],
+    )
+    foreign_keys = cursor.fetchall()
+
+    # Первичный ключ партиционированной таблицы обязан включать ключ партиции
+    cursor.execute(
+        f'CREATE TABLE {ACTIVITY_TABLE} '
+        f'(LIKE {LEGACY_TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (date)'
+    )
+    cursor.execute(
+        f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {ACTIVITY_TABLE} DEFAULT'
+    )
+
+    cursor.execute(f'SELECT min(date) FROM {LEGACY_TABLE}')
+    first_date = cursor.fetchone()[0]
+    if first_date is not None:
+        month = month_start(first_date.astimezone(get_default_timezone()).date())
+        current = month_start(get_current_date())
+        while month <= current:
+            _create_partition(cursor, month)
+            month = add_months(month, 1)
+
+    cursor.execute(f'INSERT INTO {ACTIVITY_TABLE} SELECT * FROM {LEGACY_TABLE}')
+    cursor.execute(
+        f"ALTER SEQUENCE {ACTIVITY_TABLE}_id_seq OWNED BY {ACTIVITY_TABLE}.id"
+    )
+    cursor.execute(f'DROP TABLE {LEGACY_TABLE}')
+
+    cursor.execute(
+        f'ALTER TABLE {ACTIVITY_TABLE} '
+        f'ADD CONSTRAINT {ACTIVITY_TABLE}_pkey PRIMARY KEY (id, date)'
+    )
+    for indexdef in indexes:
+        cursor.execute(indexdef)
+    for name, definition in foreign_keys:
+        cursor.execute(
+            f'ALTER TABLE {ACTIVITY_TABLE} ADD CONSTRAINT {name} {definition}'
+        )
+
+
+@atomic
+def create_activity_partition(month: date) -> Optional[str]:
+    """
+    Сервис создания партиции активности за месяц.
+
+    :param month: Любая дата нужного месяца
+
+    :returns: Имя созданной партиции или None, если она уже есть
+    """
+
+    if not is_partitioning_supported():
+        return None
+
+    with connection.cursor() as cursor:
+        return _create_partition(cursor, month_start(month))
+
+
+@atomic
+def ensure_activity_partitions(months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Сервис подготовки партиций таблицы активности.
+    При первом запуске переводит таблицу на партиционирование по месяцам,
+    затем создаёт партиции текущего и следующих месяцев.
+
+    :param months_ahead: Сколько месяцев вперёд создавать партиции
+
+    :returns: Имена созданных партиций
+    """
+
+    if not is_partitioning_supported():
+        return []
+
+    if months_ahead is None:
+        months_ahead = settings.ACTIVITY_PARTITIONS_AHEAD
+
+    with connection.cursor() as cursor:
+        if not _table_exists(cursor, ACTIVITY_TABLE):
+            return []
+        if not _is_partitioned(cursor):
+            _partition_table(cursor)
+
+        current = month_start(get_current_date())
+        created = [
+            _create_partition(cursor, add_months(current, offset))
+            for offset in range(months_ahead + 1)
+        ]
+    return [name for name in created if name]
+
+
+def get_activity_partitions() -> List[Tuple[str, date]]:
+    """
+    Возвращает помесячные партиции таблицы активности.
+
+    :returns: Список пар (имя партиции, первое число месяца)
+    """
+
+    if not is_partitioning_supported():
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(%s) '
+            'ORDER BY child.relname',
+            [ACTIVITY_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        if match := PARTITION_RE.match(name):
+            year, month = map(int, match.groups())
+            partitions.append((name, date(year, month, 1)))
+    return partitions
+
+
+def get_retention_cutoff(grace_days: Optional[int] = None) -> date:
+    """
+    Дата, раньше которой события активности больше не нужны:
+    окно активности пользователей плюс запас grace_days.
+    """
+
+    if grace_days is None:
+        grace_days = settings.ACTIVITY_RETENTION_GRACE_DAYS
+    return get_current_date() - timedelta(
+        days=settings.INACTIVE_USER_DAYS + grace_days
+    )
+
+
+@atomic
+def prune_activity_partitions(
+    cutoff: date, archive: bool = False, dry_run: bool = False,
+) -> List[str]:
+    """
+    Сервис удаления старых партиций активности.
+    Удаляются (или отсоединяются в архивную схему) только партиции,
+    целиком лежащие раньше cutoff - это DDL, а не DELETE по таблице.
+
+    :param cutoff: Дата, раньше которой данные больше не нужны
+    :param archive: Отсоединить партиции в схему ACTIVITY_ARCHIVE_SCHEMA
+     вместо удаления
+    :param dry_run: Только вернуть список партиций, ничего не меняя
+
+    :returns: Имена удалённых (архивированных) партиций
+    """
+
+    expired = [
+        name for name, month in get_activity_partitions()
+        if add_months(month, 1) <= cutoff
+    ]
+    if dry_run or not expired:
+        return expired
+
+    schema = settings.ACTIVITY_ARCHIVE_SCHEMA
+    with connection.cursor() as cursor:
+        if archive:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {schema}')
+        for name in expired:
+            if archive:
+                cursor.execute(
+                    f'ALTER TABLE {ACTIVITY_TABLE} DETACH PARTITION {name}'
+                )
+                cursor.execute(f'ALTER TABLE {name} SET SCHEMA {schema}')
+            else:
+                cursor.execute(f'DROP TABLE {name}')
+    return expired
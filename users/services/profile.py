@@ -2,12 +2,10 @@
 # -*- coding: utf-8 -*-
 
 from datetime import date
-import jwt
 from typing import Optional
 
 from graphql_jwt.utils import jwt_payload
 
-from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.auth.validators import ASCIIUsernameValidator
 from django.contrib.auth.password_validation import validate_password
@@ -19,11 +17,15 @@ from users.models import Profile
 
 from users.choices import ActivityChoices
 from utils.date_helper import get_current_date
+from utils.metrics import count_outcomes
+
+from .auth import invalidate_user_cache, jwt_encode
 
 
 validate_username = ASCIIUsernameValidator()
 
 
+@count_outcomes('create_profile')
 @atomic
 def create_profile(
     username: str, email: str, password: str, repeat_password: str,
@@ -59,6 +61,19 @@ def create_profile(
     return Profile.objects.create(user=user)
 
 
+def get_profile_by_user(user_id: int) -> Profile:
+    """
+    Сервис получения профиля пользователя вместе с auth.User
+    (username и email профиля не делают дополнительных запросов).
+
+    :param user_id: ID пользователя
+
+    :returns: Объект users.Profile
+    """
+
+    return Profile.objects.select_related('user').get(user_id=user_id)
+
+
 @atomic
 def gen_jwt_token(profile: Profile) -> str:
     """
@@ -70,7 +85,7 @@ def gen_jwt_token(profile: Profile) -> str:
     """
 
     payload = jwt_payload(profile.user)
-    token = jwt.encode(payload, settings.SECRET_KEY)
+    token = jwt_encode(payload)
     return token
 
 
@@ -92,7 +107,7 @@ def update_profile(user_id: int,
     :return: Обновленный профиль пользователя.
     """
 
-    profile = Profile.objects.get(user_id=user_id)
+    profile = get_profile_by_user(user_id=user_id)
 
     if new_email:
         validate_email(new_email)
@@ -113,6 +128,8 @@ def update_profile(user_id: int,
     # FIXME: переписать на более правильную логику
     # Обновляем поля профиля, если они были переданы
     if new_username:
+        # Старые токены выданы на прежний username - убираем его из кэша JWT
+        invalidate_user_cache(profile.user.username)
         profile.user.username = new_username
         profile.user.save()
     if new_email:
@@ -129,6 +146,7 @@ def update_profile(user_id: int,
     return profile
 
 
+@count_outcomes('update_password')
 @atomic
 def update_password(
         user_id: int,
@@ -148,11 +166,11 @@ def update_password(
     """
 
     try:
-        profile = Profile.objects.get(user_id=user_id)
+        profile = get_profile_by_user(user_id=user_id)
     except Profile.DoesNotExist:
         raise ValueError('Пользователь не найден.')
 
-    if profile.user.check_password(old_password):
+    if not profile.user.check_password(old_password):
         raise ValueError('Старый пароль неверен.')
 
     if new_password != repeat_password:
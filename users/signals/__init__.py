@@ -1 +1,6 @@
 # -*- coding: utf-8 -*-
+
+from .activity import flush_activities_on_request_finished
+from .auth import (invalidate_user_cache_on_profile_change,
+                   invalidate_user_cache_on_user_change)
+from .partitions import ensure_activity_partitions_on_migrate
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+import atexit
+from typing import Any
+
+from django.core.signals import request_finished
+from django.dispatch import receiver
+
+from users.services import flush_activities
+
+
+@receiver(request_finished, dispatch_uid='users_flush_activities')
+def flush_activities_on_request_finished(sender: Any, **kwargs: Any) -> None:
+    """
+    Сбрасывает буфер активности после отдачи ответа,
+    если достигнут порог по размеру или времени.
+    """
+
+    flush_activities(force=False)
+
+
+# Не теряем накопленные события при штатной остановке воркера
+atexit.register(flush_activities)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import Profile
+from users.services.auth import invalidate_user_cache
+
+
+@receiver(post_save, sender=User, dispatch_uid='users_user_saved_cache')
+@receiver(post_delete, sender=User, dispatch_uid='users_user_deleted_cache')
+def invalidate_user_cache_on_user_change(
+    sender: Any, instance: User, **kwargs: Any
+) -> None:
+    """ Изменение пользователя (в том числе из админки) сбрасывает кэш JWT """
+    invalidate_user_cache(instance.username)
+
+
+@receiver(post_save, sender=Profile, dispatch_uid='users_profile_saved_cache')
+@receiver(post_delete, sender=Profile, dispatch_uid='users_profile_deleted_cache')
+def invalidate_user_cache_on_profile_change(
+    sender: Any, instance: Profile, **kwargs: Any
+) -> None:
+    """ В кэше JWT пользователь лежит вместе с профилем """
+    invalidate_user_cache(instance.user.username)
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any
+
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from users.services import ensure_activity_partitions
+
+
+@receiver(post_migrate, dispatch_uid='users_ensure_activity_partitions')
+def ensure_activity_partitions_on_migrate(
+    sender: AppConfig, using: str, **kwargs: Any,
+) -> None:
+    """
+    После миграций приложения users переводим таблицу активности
+    на партиционирование и создаём партиции на ближайшие месяцы.
+    """
+
+    if sender.label != 'users' or using != 'default':
+        return
+    ensure_activity_partitions()
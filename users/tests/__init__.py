@@ -1,3 +1,11 @@
 # -*- coding: utf-8 -*-
 
+from .activity import ActivityTestCase
+from .auth import JWTUserCacheTestCase
+from .benchmark import BenchmarkTestCase
+from .breached import BreachedPasswordTestCase
+from .connections import DatabaseConnectionsTestCase
+from .hashers import PasswordHashingTestCase
+from .metrics import MetricsTestCase
+from .partitions import ActivityPartitionsTestCase
 from .profile import ProfileTestCase, ProfileAPITestCase
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from users.choices import ActivityChoices
+from users.models import Activity, Profile
+from users.services import create_profile, flush_activities, record_activity
+from users.services.activity import activity_buffer
+from users.signals import flush_activities_on_request_finished
+
+
+class ActivityTestCase(TestCase):
+    """ TestCase для тестирования записи активности users.Activity """
+
+    def setUp(self) -> None:
+        # Буфер общий на процесс - не тащим события из других тестов
+        activity_buffer.drain()
+        self.profiles = [
+            create_profile(
+                username=f'test{i}',
+                email=f'test{i}@foo.ru',
+                password='Passw0rd33',
+                repeat_password='Passw0rd33',
+            )
+            for i in range(3)
+        ]
+
+    def test_flush_activities(self) -> None:
+        """ Тест на пакетную запись активности """
+
+        now = timezone.now()
+        for profile in self.profiles:
+            record_activity(profile.pk, ActivityChoices.GET_PASSWORDS,
+                            date=now - timedelta(minutes=1))
+            record_activity(profile.pk, ActivityChoices.GEN_PASSWORD, date=now)
+
+        # До сброса буфера в базу ничего не пишется
+        self.assertEqual(Activity.objects.count(), 0)
+
+        # INSERT событий и UPDATE профилей внутри одной точки сохранения
+        with self.assertNumQueries(4):
+            self.assertEqual(flush_activities(), 6)
+
+        self.assertEqual(Activity.objects.count(), 6)
+        self.assertEqual(
+            set(Profile.objects.values_list('last_activity_at', flat=True)),
+            {now},
+        )
+        self.assertEqual(Profile.objects.active().count(), 3)
+
+    @override_settings(ACTIVITY_FLUSH_SIZE=2, ACTIVITY_FLUSH_INTERVAL=60)
+    def test_flush_on_request_finished(self) -> None:
+        """ Тест на сброс буфера по окончании запроса при достижении порога """
+
+        record_activity(self.profiles[0].pk, ActivityChoices.GET_PASSWORDS)
+        flush_activities_on_request_finished(sender=self.__class__)
+        self.assertEqual(Activity.objects.count(), 0)
+
+        record_activity(self.profiles[1].pk, ActivityChoices.GET_PASSWORDS)
+        flush_activities_on_request_finished(sender=self.__class__)
+        self.assertEqual(Activity.objects.count(), 2)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+from django.test import TestCase
+
+from users.services import (create_profile, get_user_by_natural_key,
+                            update_profile)
+from users.services.auth import jwt_user_cache
+from utils.cache import TTLCache
+
+
+class JWTUserCacheTestCase(TestCase):
+    """ TestCase для тестирования кэша пользователей по JWT """
+
+    def setUp(self) -> None:
+        jwt_user_cache.clear()
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+
+    def test_get_user_by_natural_key(self) -> None:
+        """ Тест на кэширование пользователя вместе с профилем """
+
+        with self.assertNumQueries(1):
+            user = get_user_by_natural_key('test')
+            self.assertEqual(user.profile, self.profile)
+
+        with self.assertNumQueries(0):
+            cached = get_user_by_natural_key('test')
+            self.assertEqual(cached.profile.user, cached)
+        # Каждый вызов получает свою копию
+        self.assertIsNot(cached, user)
+
+        self.assertIsNone(get_user_by_natural_key('nobody'))
+
+    def test_invalidation(self) -> None:
+        """ Тест на сброс кэша при изменении пользователя """
+
+        get_user_by_natural_key('test')
+        update_profile(
+            user_id=self.profile.user_id,
+            new_username='renamed',
+            new_email=None,
+            new_first_name='Иван',
+            new_last_name=None,
+        )
+
+        # Токены на прежний username больше не действуют
+        self.assertIsNone(get_user_by_natural_key('test'))
+        self.assertEqual(
+            get_user_by_natural_key('renamed').profile.first_name, 'Иван',
+        )
+
+    def test_ttl_cache(self) -> None:
+        """ Тест на вытеснение и устаревание записей """
+
+        cache = TTLCache(maxsize=2, ttl=60, prefix='test')
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+        cache = TTLCache(maxsize=2, ttl=0, prefix='test')
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from passwords.models import Password, Tag
+from users.models import Activity, Profile
+from users.services.activity import activity_buffer
+from utils.benchmark import compare_results, load_results, percentile
+
+
+class BenchmarkTestCase(TestCase):
+    """ TestCase для тестирования нагрузочных замеров """
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_percentile(self) -> None:
+        """ Тест на перцентили по методу ближайшего ранга """
+
+        samples = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([7.0], 99), 7)
+        self.assertEqual(percentile([], 50), 0)
+
+    def test_seed_and_bench(self) -> None:
+        """ Тест на генерацию данных, замер и сравнение с базовым """
+
+        call_command(
+            'seed_benchmark_data', profiles=5, passwords=3, tags=2,
+            activities=4, batch=2, stdout=StringIO(),
+        )
+        owners = Profile.objects.filter(user__username__startswith='bench-')
+        self.assertEqual(owners.count(), 5)
+        self.assertEqual(Password.objects.filter(owner__in=owners).count(), 15)
+        self.assertEqual(Tag.objects.filter(owner__in=owners).count(), 30)
+        self.assertEqual(Activity.objects.filter(profile__in=owners).count(), 20)
+
+        with self.assertRaises(CommandError):
+            call_command('seed_benchmark_data', profiles=1, stdout=StringIO())
+
+        output = Path(self.directory.name) / 'bench.json'
+        call_command(
+            'bench_api', iterations=2, warmup=1, sample=3,
+            output=output, stdout=StringIO(),
+        )
+        results = load_results(output.read_text())
+        self.assertEqual(set(results), {
+            'create_profile', 'update_profile', 'gen_jwt_token',
+            'profiles_active', 'profiles_inactive',
+            'admin_changelist', 'admin_changelist_active',
+            'graphql_vault', 'graphql_password_page',
+            'vault_decrypt_1000', 'vault_key_derivation',
+            'generate_passwords_20', 'autofill_lookup',
+        })
+        for result in results.values():
+            self.assertEqual(result['iterations'], 2)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertEqual(results['profiles_active']['queries_per_op'], 1)
+        # Пользователи сценария create_profile удалены после замера
+        self.assertFalse(User.objects.filter(username__startswith='bench-run-').exists())
+
+        # Базовый замер быстрее и с меньшим числом запросов
+        baseline = {
+            name: dict(result, p50_ms=0, p99_ms=0, queries_per_op=0)
+            for name, result in results.items()
+        }
+        baseline_path = Path(self.directory.name) / 'baseline.json'
+        baseline_path.write_text(json.dumps({'format': 1, 'results': baseline}))
+        with self.assertRaises(CommandError):
+            call_command(
+                'bench_api', iterations=1, warmup=0, sample=3,
+                only=['gen_jwt_token'], compare=baseline_path, stdout=StringIO(),
+            )
+
+        call_command('seed_benchmark_data', profiles=2, clear=True, stdout=StringIO())
+        self.assertEqual(owners.count(), 2)
+
+    def test_compare_results(self) -> None:
+        """ Тест на поиск ухудшений относительно базового замера """
+
+        baseline = {'op': {'p50_ms': 10, 'p99_ms': 20, 'queries_per_op': 2}}
+        self.assertEqual(compare_results(baseline, {
+            'op': {'p50_ms': 11, 'p99_ms': 23, 'queries_per_op': 2},
+            'new': {'p50_ms': 100, 'p99_ms': 200, 'queries_per_op': 20},
+        }, max_slowdown=0.2), [])
+
+        regressions = compare_results(baseline, {
+            'op': {'p50_ms': 10, 'p99_ms': 30, 'queries_per_op': 3},
+        }, max_slowdown=0.2)
+        self.assertEqual(
+            [(regression.metric, regression.current) for regression in regressions],
+            [('p99_ms', 30), ('queries_per_op', 3)],
+        )
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import tempfile
+from io import StringIO
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from users.services import create_profile, update_password
+from users.services.activity import activity_buffer
+from utils.breached import (BreachCorpus, BreachedPasswordValidator,
+                            build_corpus, get_breach_corpus)
+
+
+def sha1_line(password: str, count: int) -> str:
+    return f'{hashlib.sha1(password.encode()).hexdigest().upper()}:{count}\n'
+
+
+class BreachedPasswordTestCase(TestCase):
+    """ TestCase для тестирования проверки паролей по базе утечек """
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'breached.bin')
+
+        source = os.path.join(self.directory.name, 'dump.txt')
+        with open(source, 'w') as file:
+            file.write(sha1_line('Qwerty12345', 100))
+            file.write(sha1_line('Breached77x', 3))
+            file.write(sha1_line('RareOne1234', 1))
+            for number in range(2000):
+                file.write(sha1_line(f'filler{number}', 2))
+            # Дубликаты схлопываются
+            file.write(sha1_line('Qwerty12345', 100))
+        out = StringIO()
+        call_command('build_breach_corpus', source, self.path, min_count=2, stdout=out)
+        self.assertIn('2002', out.getvalue())
+
+    def test_corpus(self) -> None:
+        """ Тест на сборку и поиск в базе утечек """
+
+        corpus = BreachCorpus(self.path)
+        self.addCleanup(corpus.close)
+        self.assertEqual(len(corpus), 2002)
+        self.assertIn('Qwerty12345', corpus)
+        self.assertIn('filler1999', corpus)
+        # Реже min_count и отсутствующие в дампе
+        self.assertNotIn('RareOne1234', corpus)
+        self.assertNotIn('Passw0rd33', corpus)
+
+        plain = os.path.join(self.directory.name, 'plain.bin')
+        self.assertEqual(
+            build_corpus(['secret\n', 'пароль\n', '\n'], plain, prefix_size=4, hashed=False),
+            2,
+        )
+        corpus = BreachCorpus(plain)
+        self.addCleanup(corpus.close)
+        self.assertIn('пароль', corpus)
+        self.assertNotIn('secret2', corpus)
+
+        with self.assertRaises(ValueError):
+            build_corpus(['not a hash\n'], plain)
+        with self.assertRaises(ValueError):
+            build_corpus([], plain, prefix_size=2)
+
+        broken = os.path.join(self.directory.name, 'broken.bin')
+        with open(self.path, 'rb') as source, open(broken, 'wb') as target:
+            target.write(source.read()[:-3])
+        with self.assertRaises(ValueError):
+            BreachCorpus(broken)
+        with self.assertRaises(CommandError):
+            call_command('build_breach_corpus', broken + '.missing', plain)
+
+    def test_validator(self) -> None:
+        """ Тест на отклонение утёкших паролей при регистрации и смене """
+
+        validator = BreachedPasswordValidator(corpus_path=self.path)
+        with self.assertRaises(ValidationError) as error:
+            validator.validate('Qwerty12345')
+        self.assertEqual(error.exception.code, 'password_breached')
+        validator.validate('Passw0rd33')
+        # Без базы проверка отключена
+        BreachedPasswordValidator().validate('Qwerty12345')
+
+        with override_settings(BREACHED_PASSWORDS_CORPUS=self.path):
+            with self.assertRaises(ValidationError):
+                create_profile(
+                    username='test', email='test@foo.ru',
+                    password='Qwerty12345', repeat_password='Qwerty12345',
+                )
+            profile = create_profile(
+                username='test', email='test@foo.ru',
+                password='Passw0rd33', repeat_password='Passw0rd33',
+            )
+            with self.assertRaises(ValidationError):
+                update_password(
+                    profile.user_id, 'Passw0rd33', 'Breached77x', 'Breached77x',
+                )
+            self.assertIs(get_breach_corpus(self.path), get_breach_corpus(self.path))
+
+        with override_settings(BREACHED_PASSWORDS_CORPUS=self.path + '.missing'):
+            with self.assertRaises(ImproperlyConfigured):
+                BreachedPasswordValidator().validate('Qwerty12345')
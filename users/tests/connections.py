@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import close_old_connections, connection
+from django.test import TransactionTestCase
+
+
+class DatabaseConnectionsTestCase(TransactionTestCase):
+    """ TestCase для тестирования постоянных соединений с базой """
+
+    def setUp(self) -> None:
+        self.settings_dict = connection.settings_dict
+        self.previous = {
+            key: self.settings_dict.get(key)
+            for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')
+        }
+        self.settings_dict.update(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        connection.close()
+
+    def tearDown(self) -> None:
+        self.settings_dict.update(self.previous)
+        connection.close()
+
+    def _query(self) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchone()[0]
+
+    def test_persistent_connection(self) -> None:
+        """ Тест на переиспользование соединения между запросами """
+
+        close_old_connections()
+        self._query()
+        raw = connection.connection
+        close_old_connections()
+
+        close_old_connections()
+        self._query()
+        self.assertIs(connection.connection, raw)
+
+    def test_health_check(self) -> None:
+        """ Тест на замену оборванного соединения перед новым запросом """
+
+        close_old_connections()
+        self._query()
+        raw = connection.connection
+        close_old_connections()
+
+        # Сервер закрыл соединение между запросами
+        raw.close()
+
+        close_old_connections()
+        self.assertEqual(self._query(), 1)
+        self.assertIsNot(connection.connection, raw)
+
+    def test_bench_db_connections(self) -> None:
+        """ Тест на сравнение режимов соединений """
+
+        out = StringIO()
+        call_command(
+            'bench_db_connections', requests=5, threads=2, stdout=out,
+        )
+        self.assertIn('CONN_MAX_AGE=0', out.getvalue())
+        self.assertIn('CONN_MAX_AGE=60', out.getvalue())
+        self.assertEqual(self.settings_dict['CONN_MAX_AGE'], 60)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from io import StringIO
+
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from users.services import create_profile, update_password
+from utils import hashers
+
+
+class PasswordHashingTestCase(TestCase):
+    """ TestCase для тестирования настраиваемого хэширования паролей """
+
+    @override_settings(PBKDF2_ITERATIONS=1000)
+    def test_tunable_cost(self) -> None:
+        """ Тест на стоимость хэширования из настроек """
+
+        encoded = make_password('Passw0rd33')
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(check_password('Passw0rd33', encoded))
+
+        # Пароль со старой стоимостью перехэшируется при входе
+        with self.settings(PBKDF2_ITERATIONS=2000):
+            self.assertTrue(get_hasher().must_update(encoded))
+
+    def test_run_hashing(self) -> None:
+        """ Тест на хэширование в отдельном ограниченном пуле """
+
+        thread_name = hashers.run_hashing(lambda: threading.current_thread().name)
+        self.assertTrue(thread_name.startswith('password-hashing'))
+
+        # Вложенный вызов выполняется в том же потоке пула
+        nested = hashers.run_hashing(
+            hashers.run_hashing, lambda: threading.current_thread().name,
+        )
+        self.assertTrue(nested.startswith('password-hashing'))
+
+        with self.settings(PASSWORD_HASHING_WORKERS=0):
+            self.assertEqual(
+                hashers.run_hashing(lambda: threading.current_thread().name),
+                threading.current_thread().name,
+            )
+
+    @override_settings(PASSWORD_HASHING_QUEUE_TIMEOUT=0.01)
+    def test_hashing_busy(self) -> None:
+        """ Тест на отказ, когда очередь пула переполнена """
+
+        hashers.run_hashing(lambda: None)
+        acquired = 0
+        while hashers._slots.acquire(blocking=False):
+            acquired += 1
+        try:
+            with self.assertRaises(hashers.HashingBusyError):
+                hashers.run_hashing(lambda: None)
+        finally:
+            for _ in range(acquired):
+                hashers._slots.release()
+
+    def test_update_password(self) -> None:
+        """ Тест на смену пароля с проверкой старого """
+
+        profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        with self.assertRaises(ValueError):
+            update_password(
+                user_id=profile.user_id, old_password='wrong',
+                new_password='NewPassw0rd', repeat_password='NewPassw0rd',
+            )
+
+        update_password(
+            user_id=profile.user_id, old_password='Passw0rd33',
+            new_password='NewPassw0rd', repeat_password='NewPassw0rd',
+        )
+        profile.user.refresh_from_db()
+        self.assertTrue(profile.user.check_password('NewPassw0rd'))
+
+    def test_tune_hasher(self) -> None:
+        """ Тест на подбор стоимости под целевое время """
+
+        out = StringIO()
+        call_command(
+            'tune_hasher', hasher='pbkdf2', target_ms=5, repeat=1, stdout=out,
+        )
+        self.assertRegex(out.getvalue(), r'PBKDF2_ITERATIONS=\d+')
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY, generate_latest
+
+from users.services import create_profile, gen_jwt_token, update_password
+from users.services.activity import activity_buffer
+from utils.metrics import get_registry
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTestCase(TestCase):
+    """ TestCase для тестирования метрик сервисов и API """
+
+    def setUp(self) -> None:
+        activity_buffer.drain()
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+
+    def test_service_outcomes(self) -> None:
+        """ Тест на подсчёт результатов сервисов """
+
+        success = sample('service_calls_total', service='update_password', outcome='success')
+        rejected = sample('service_calls_total', service='update_password', outcome='ValueError')
+
+        update_password(self.profile.user_id, 'Passw0rd33', 'NewPassw0rd33', 'NewPassw0rd33')
+        with self.assertRaises(ValueError):
+            update_password(self.profile.user_id, 'wrong', 'NewPassw0rd33', 'NewPassw0rd33')
+
+        self.assertEqual(
+            sample('service_calls_total', service='update_password', outcome='success'),
+            success + 1,
+        )
+        self.assertEqual(
+            sample('service_calls_total', service='update_password', outcome='ValueError'),
+            rejected + 1,
+        )
+
+    @override_settings(PASSWORD_HASHING_WORKERS=0)
+    def test_password_hash_time(self) -> None:
+        """ Тест на замер времени хэширования без вложенных вызовов """
+
+        labels = {'algorithm': 'pbkdf2_sha256'}
+        encodes = sample('password_hash_seconds_count', operation='encode', **labels)
+        verifies = sample('password_hash_seconds_count', operation='verify', **labels)
+
+        encoded = make_password('Passw0rd33')
+        self.assertTrue(check_password('Passw0rd33', encoded))
+
+        self.assertEqual(
+            sample('password_hash_seconds_count', operation='encode', **labels),
+            encodes + 1,
+        )
+        self.assertEqual(
+            sample('password_hash_seconds_count', operation='verify', **labels),
+            verifies + 1,
+        )
+
+    def test_jwt_and_request_metrics(self) -> None:
+        """ Тест на метрики JWT, GraphQL операций и времени базы """
+
+        issued = sample('jwt_tokens_total', operation='issue', outcome='success')
+        verified = sample('jwt_tokens_total', operation='verify', outcome='success')
+        failed = sample('jwt_tokens_total', operation='verify', outcome='failure')
+        operations = sample('graphql_operation_seconds_count', operation='Me')
+        db_requests = sample('http_request_db_seconds_count', route='api/')
+        graphql_sql = sample('graphql_request_sql_seconds_count')
+
+        token = gen_jwt_token(profile=self.profile)
+        for authorization in (f'JWT {token}', 'JWT broken'):
+            self.client.post(
+                '/api/', json.dumps({
+                    'query': 'query Me { me { username } }',
+                    'operationName': 'Me',
+                }),
+                content_type='application/json',
+                HTTP_AUTHORIZATION=authorization,
+            )
+
+        self.assertEqual(sample('jwt_tokens_total', operation='issue', outcome='success'), issued + 1)
+        self.assertEqual(sample('jwt_tokens_total', operation='verify', outcome='success'), verified + 1)
+        self.assertEqual(sample('jwt_tokens_total', operation='verify', outcome='failure'), failed + 1)
+        self.assertEqual(sample('graphql_operation_seconds_count', operation='Me'), operations + 2)
+        self.assertEqual(sample('http_request_db_seconds_count', route='api/'), db_requests + 2)
+        self.assertEqual(sample('graphql_request_sql_seconds_count'), graphql_sql + 2)
+
+    def test_multiprocess_registry(self) -> None:
+        """ Тест на сбор метрик из общего каталога воркеров """
+
+        self.assertIs(get_registry(), REGISTRY)
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}):
+                registry = get_registry()
+                self.assertIsNot(registry, REGISTRY)
+                generate_latest(registry)
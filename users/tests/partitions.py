@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from users.choices import ActivityChoices
+from users.models import Activity
+from users.services import (create_activity_partition, create_profile,
+                            prune_activity_partitions)
+from users.services.partitions import (add_months, get_activity_partitions,
+                                       month_start, partition_name)
+from utils import get_current_date
+
+
+class ActivityPartitionsTestCase(TestCase):
+    """ TestCase для тестирования партиций таблицы users.Activity """
+
+    def setUp(self) -> None:
+        self.profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+
+    def test_partitions(self) -> None:
+        """ Тест на создание и удаление помесячных партиций """
+
+        # Таблица переведена на партиции сигналом post_migrate
+        current = month_start(get_current_date())
+        months = [month for _, month in get_activity_partitions()]
+        self.assertIn(current, months)
+        self.assertIn(add_months(current, 1), months)
+
+        old_month = add_months(current, -24)
+        old_date = timezone.make_aware(datetime.combine(
+            old_month + timedelta(days=3), datetime.min.time(),
+        ))
+        Activity.objects.create(
+            profile=self.profile,
+            activity=ActivityChoices.GET_PASSWORDS,
+            date=old_date,
+        )
+        Activity.objects.create(
+            profile=self.profile,
+            activity=ActivityChoices.GET_PASSWORDS,
+        )
+
+        # Старое событие попало в партицию по умолчанию
+        # и переносится при создании партиции его месяца
+        old_partition = create_activity_partition(old_month)
+        self.assertEqual(old_partition, partition_name(old_month))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {old_partition}')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        # Запрос в окне активности не читает старые партиции
+        self.assertEqual(Activity.objects.in_window().count(), 1)
+        with connection.cursor() as cursor:
+            sql, params = (
+                Activity.objects.in_window().values('id').query.sql_with_params()
+            )
+            cursor.execute(f'EXPLAIN {sql}', params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        self.assertIn(partition_name(current), plan)
+        self.assertNotIn(old_partition, plan)
+
+        # Удаление партиций старше границы хранения - это DDL, а не DELETE
+        cutoff = add_months(current, -6)
+        self.assertEqual(
+            prune_activity_partitions(cutoff, dry_run=True), [old_partition],
+        )
+        self.assertEqual(Activity.objects.count(), 2)
+
+        self.assertEqual(prune_activity_partitions(cutoff), [old_partition])
+        self.assertEqual(Activity.objects.count(), 1)
+        self.assertNotIn(
+            old_month, [month for _, month in get_activity_partitions()],
+        )
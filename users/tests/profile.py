@@ -1,12 +1,22 @@
 # -*- coding: utf-8 -*-
 
+from datetime import timedelta
+from unittest import mock
+
+from graphql.error import GraphQLError
 from graphql_relay import from_global_id
 from graphene_django.utils.testing import GraphQLTestCase
 
+from django.conf import settings
 from django.test import TestCase
+from django.utils import timezone
 
+from passwords.services import bulk_upsert_passwords
 from users.models import Profile
-from users.services import create_profile
+from users.schema.profile import ProfileNode
+from users.services import create_profile, gen_jwt_token, update_last_activity
+from users.services.activity import activity_buffer
+from utils import date_helper, get_activity_window_start
 
 
 class ProfileTestCase(TestCase):
@@ -71,6 +81,80 @@ class ProfileTestCase(TestCase):
                 repeat_password='Passw0rd33',
             )
 
+    def test_last_activity(self) -> None:
+        """ Тест на денормализованное время последней активности """
+
+        active = create_profile(
+            username='active',
+            email='active@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        inactive = create_profile(
+            username='inactive',
+            email='inactive@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+
+        now = timezone.now()
+        old = now - timedelta(days=settings.INACTIVE_USER_DAYS + 1)
+        update_last_activity({active.pk: now, inactive.pk: old})
+
+        # Более старое событие не откатывает время активности назад
+        update_last_activity({active.pk: old})
+
+        active.refresh_from_db()
+        self.assertEqual(active.last_activity_at, now)
+
+        self.assertEqual(
+            list(Profile.objects.active()), [active],
+        )
+        self.assertEqual(
+            list(Profile.objects.not_active()), [inactive],
+        )
+
+        # Активность считается в SQL одним запросом
+        with self.assertNumQueries(1):
+            flags = {
+                profile.pk: profile.is_active
+                for profile in Profile.objects.with_is_active()
+            }
+        self.assertEqual(flags, {active.pk: True, inactive.pk: False})
+
+    def test_activity_window(self) -> None:
+        """ Тест на окно активности, которое считается на момент запроса """
+
+        profile = create_profile(
+            username='test',
+            email='test@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+
+        # Окно посчитано "вчера" и устарело - должно пересчитаться
+        stale_start = get_activity_window_start() - timedelta(days=1)
+        date_helper._today_cache = (None, stale_start, 0.0)
+
+        window_start = get_activity_window_start()
+        self.assertEqual(window_start - stale_start, timedelta(days=1))
+        self.assertEqual(
+            (timezone.localdate() - window_start.date()).days,
+            settings.INACTIVE_USER_DAYS - 1,
+        )
+
+        # Граница окна: последний активный и первый неактивный момент
+        update_last_activity({profile.pk: window_start})
+        self.assertEqual(Profile.objects.active().count(), 1)
+        self.assertTrue(Profile.objects.get().is_active)
+
+        Profile.objects.update(
+            last_activity_at=window_start - timedelta(seconds=1),
+        )
+        self.assertEqual(Profile.objects.not_active().count(), 1)
+        self.assertFalse(Profile.objects.get().is_active)
+
+
 class ProfileAPITestCase(GraphQLTestCase):
     """ TestCase для тестирования Profile API """
 
@@ -105,3 +189,72 @@ class ProfileAPITestCase(GraphQLTestCase):
         _, pk = from_global_id(profile_pk)
         new_profile = Profile.objects.get(pk=pk)
         self.assertEqual(new_profile.user.username, 'test_user')
+
+    UPDATE_PROFILE_MUTATION = '''
+    mutation UpdateProfileMutation($input: UpdateProfileMutationInput!) {
+        updateProfile(input: $input) {
+            profile {
+                userId
+                passwords {
+                    title
+                    passwords
+                }
+            }
+        }
+    }
+    '''
+
+    def test_foreign_vault_in_mutation(self) -> None:
+        """ Тест на чтение чужого хранилища через результат мутации """
+
+        activity_buffer.drain()
+        victim = create_profile(
+            username='victim',
+            email='victim@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        bulk_upsert_passwords(owner_id=victim.pk, items=[
+            {'title': 'bank', 'passwords': 'TopSecret!1'},
+        ])
+        attacker = create_profile(
+            username='attacker',
+            email='attacker@foo.ru',
+            password='Passw0rd33',
+            repeat_password='Passw0rd33',
+        )
+        victim_input = {
+            'userId': victim.user_id,
+            'username': '', 'email': '', 'firstName': '', 'lastName': '',
+        }
+
+        # Без токена
+        response = self.query(self.UPDATE_PROFILE_MUTATION, input_data=victim_input)
+        self.assertResponseHasErrors(response)
+        self.assertNotIn('TopSecret!1', response.content.decode())
+
+        # С токеном другого пользователя
+        headers = {'HTTP_AUTHORIZATION': f'JWT {gen_jwt_token(profile=attacker)}'}
+        response = self.query(
+            self.UPDATE_PROFILE_MUTATION, input_data=victim_input, headers=headers,
+        )
+        self.assertResponseHasErrors(response)
+        self.assertNotIn('TopSecret!1', response.content.decode())
+
+        # Свой профиль - из токена, userId не нужен
+        response = self.query(
+            self.UPDATE_PROFILE_MUTATION,
+            input_data={'username': '', 'email': '', 'firstName': 'Eve', 'lastName': ''},
+            headers=headers,
+        )
+        self.assertResponseNoErrors(response)
+        self.assertEqual(response.json()['data']['updateProfile']['profile'], {
+            'userId': attacker.user_id, 'passwords': [],
+        })
+        self.assertEqual(Profile.objects.get(pk=attacker.pk).first_name, 'Eve')
+
+        # Резолверы хранилища не отдают чужие пароли, откуда бы ни пришёл профиль
+        info = mock.Mock(context=mock.Mock(user=attacker.user))
+        self.assertEqual(ProfileNode.resolve_passwords(victim, info), [])
+        with self.assertRaises(GraphQLError):
+            ProfileNode.resolve_password_connection(victim, info, order_by='ID')
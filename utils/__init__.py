@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
 
-from .date_helper import get_current_date
+from . import lookups
+from .date_helper import get_activity_window_start, get_current_date
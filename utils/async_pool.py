@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.http import HttpRequest, HttpResponse
+
+
+T = TypeVar('T')
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """ Общий пул потоков для синхронного кода в ASGI режиме """
+
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ASGI_THREADS,
+                    thread_name_prefix='asgi-sync',
+                )
+    return _executor
+
+
+def _call_with_connections(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    # Соединения с базой живут в потоке пула - закрываем просроченные
+    # до и после вызова, как Django делает на request_started/finished
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Выполняет синхронный код (ORM, сервисы) в ограниченном пуле потоков.
+
+    В отличие от sync_to_async(thread_sensitive=True), запросы
+    не выстраиваются в очередь к одному потоку, а в отличие от потока
+    на запрос - потоков не больше ASGI_THREADS: медленные клиенты
+    ждут чтения и отправки данных в цикле событий, не занимая поток.
+    Контекстные переменные вызывающего кода видны внутри func.
+
+    :param func: Синхронная функция
+    :param args: Позиционные аргументы func
+    :param kwargs: Именованные аргументы func
+
+    :returns: Результат func
+    """
+
+    loop = asyncio.get_running_loop()
+    call = functools.partial(
+        contextvars.copy_context().run,
+        _call_with_connections, func, *args, **kwargs,
+    )
+    return await loop.run_in_executor(get_executor(), call)
+
+
+def pooled_view(view: Callable[..., HttpResponse]) -> Callable[..., Any]:
+    """
+    Делает из синхронного view асинхронный, который выполняется в пуле
+    run_sync. Атрибуты view (например, csrf_exempt) сохраняются.
+
+    :param view: Синхронный view
+
+    :returns: Асинхронный view
+    """
+
+    async def async_view(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        return await run_sync(view, request, *args, **kwargs)
+
+    # functools.wraps скопировал бы __wrapped__, и Django принял бы
+    # view за синхронный - переносим только атрибуты
+    async_view.__name__ = getattr(view, '__name__', 'view')
+    async_view.__doc__ = view.__doc__
+    async_view.__dict__.update(view.__dict__)
+    return async_view
+
+
+class _StreamEnd:
+    pass
+
+
+async def iterate_in_thread(
+    iterator_source: Any, executor: ThreadPoolExecutor,
+):
+    """
+    Асинхронно перебирает синхронный итератор в одном отдельном потоке.
+
+    Потоковые ответы читают базу курсором, который привязан
+    к соединению потока, поэтому весь перебор идёт в одном потоке
+    executor, а соединения закрываются в нём же по окончании.
+
+    :param iterator_source: Итерируемый объект
+    :param executor: Пул из одного потока для этого перебора
+    """
+
+    loop = asyncio.get_running_loop()
+    end = _StreamEnd()
+    iterator = await loop.run_in_executor(executor, iter, iterator_source)
+    try:
+        while True:
+            part = await loop.run_in_executor(executor, next, iterator, end)
+            if part is end:
+                break
+            yield part
+    finally:
+        await loop.run_in_executor(
+            executor, functools.partial(_close_iterator, iterator),
+        )
+
+
+def _close_iterator(iterator: Any) -> None:
+    try:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            close()
+    finally:
+        connections.close_all()
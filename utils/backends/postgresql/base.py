@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from django.db.backends.postgresql import base
+
+from utils.metrics import record_db_time
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с проверкой постоянных соединений (CONN_MAX_AGE > 0).
+
+    Если в настройках базы CONN_HEALTH_CHECKS = True, соединение,
+    оставшееся с прошлого запроса, перед первым использованием
+    в новом запросе проверяется SELECT 1 и переоткрывается, если
+    сервер (или PgBouncer) успел его закрыть. Так ведёт себя
+    одноимённая настройка Django 4.1.
+
+    Время SQL запросов учитывается в метриках (utils.metrics).
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        # Первой в списке, чтобы execute_wrapper() других не сняли её
+        self.execute_wrappers.append(record_db_time)
+
+    def connect(self) -> None:
+        # Только что открытое соединение проверять незачем. Флаг ставим
+        # до подключения: connect сам вызывает ensure_connection
+        self.health_check_done = True
+        super().connect()
+
+    def close_if_unusable_or_obsolete(self) -> None:
+        super().close_if_unusable_or_obsolete()
+        # Соединение переживёт границу запроса - проверим при следующем использовании
+        self.health_check_done = False
+
+    def ensure_connection(self) -> None:
+        if (
+            self.connection is not None
+            and not self.health_check_done
+            and not self.in_atomic_block
+            and self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+        ):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+import json
+import math
+from contextlib import ExitStack
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from django.db import connections
+
+
+# Версия формата файла результатов (bench_api --output)
+RESULTS_FORMAT = 1
+
+
+class BenchmarkResult(NamedTuple):
+    """ Результат замера одной операции """
+
+    name: str
+    iterations: int
+    # Задержка в миллисекундах
+    p50: float
+    p99: float
+    mean: float
+    # Операций в секунду в одном потоке
+    throughput: float
+    # SQL запросов на операцию (по всем базам)
+    queries: float
+
+
+class Regression(NamedTuple):
+    """ Ухудшение операции относительно базового замера """
+
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """
+    Перцентиль по методу ближайшего ранга.
+
+    :param samples: Отсортированные значения
+    :param q: Перцентиль от 0 до 100
+
+    :returns: Значение перцентиля
+    """
+
+    if not samples:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(samples)), 1)
+    return samples[rank - 1]
+
+
+class _QueryCounter:
+    """ Обёртка execute_wrapper: считает SQL запросы всех соединений """
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(
+        self, execute: Callable, sql: str, params: Any, many: bool, context: Dict,
+    ) -> Any:
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_benchmark(
+    name: str, operation: Callable[[int], Any],
+    iterations: int, warmup: int = 0,
+) -> BenchmarkResult:
+    """
+    Замеряет операцию iterations раз подряд в текущем потоке.
+
+    :param name: Имя операции в результатах
+    :param operation: Функция от номера итерации
+    :param iterations: Число замеряемых вызовов
+    :param warmup: Число вызовов до замера (кэши, соединения)
+
+    :returns: Задержки, пропускная способность и SQL запросы на операцию
+    """
+
+    for index in range(warmup):
+        operation(index)
+
+    counter = _QueryCounter()
+    samples = []
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(counter))
+        for index in range(warmup, warmup + iterations):
+            started = perf_counter()
+            operation(index)
+            samples.append(perf_counter() - started)
+
+    samples.sort()
+    total = sum(samples)
+    return BenchmarkResult(
+        name=name,
+        iterations=iterations,
+        p50=percentile(samples, 50) * 1000,
+        p99=percentile(samples, 99) * 1000,
+        mean=total / iterations * 1000,
+        throughput=iterations / total if total else 0.0,
+        queries=counter.count / iterations,
+    )
+
+
+def dump_results(
+    results: Iterable[BenchmarkResult], metadata: Optional[Dict[str, Any]] = None,
+) -> str:
+    """ Результаты в JSON для сравнения между сборками """
+
+    return json.dumps({
+        'format': RESULTS_FORMAT,
+        'metadata': metadata or {},
+        'results': {
+            result.name: {
+                'iterations': result.iterations,
+                'p50_ms': round(result.p50, 3),
+                'p99_ms': round(result.p99, 3),
+                'mean_ms': round(result.mean, 3),
+                'ops_per_second': round(result.throughput, 1),
+                'queries_per_op': round(result.queries, 2),
+            }
+            for result in results
+        },
+    }, indent=2, ensure_ascii=False)
+
+
+def load_results(content: str) -> Dict[str, Dict[str, float]]:
+    """
+    Результаты из JSON, сохранённого dump_results.
+
+    :raises ValueError: Файл не в формате результатов
+    """
+
+    data = json.loads(content)
+    if not isinstance(data, dict) or data.get('format') != RESULTS_FORMAT:
+        raise ValueError('Неизвестный формат результатов')
+    return data['results']
+
+
+def compare_results(
+    baseline: Dict[str, Dict[str, float]],
+    current: Dict[str, Dict[str, float]],
+    max_slowdown: float,
+) -> List[Regression]:
+    """
+    Сравнивает замеры с базовыми. Ухудшением считается p50 или p99
+    больше базового в (1 + max_slowdown) раз и любой рост числа
+    SQL запросов на операцию. Операции без базового замера пропускаются.
+
+    :param baseline: Базовые результаты (load_results)
+    :param current: Новые результаты
+    :param max_slowdown: Допустимое замедление, 0.2 - на 20%
+
+    :returns: Список ухудшений
+    """
+
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if result[metric] > base[metric] * (1 + max_slowdown):
+                regressions.append(
+                    Regression(name, metric, base[metric], result[metric]),
+                )
+        if result['queries_per_op'] > base['queries_per_op']:
+            regressions.append(Regression(
+                name, 'queries_per_op',
+                base['queries_per_op'], result['queries_per_op'],
+            ))
+    return regressions
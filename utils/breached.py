@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+
+
+# Формат файла базы утечек:
+#   заголовок: MAGIC, размер префикса SHA-1, резерв, число записей;
+#   индекс: FANOUT_SIZE + 1 номеров первой записи для каждых первых
+#     двух байт префикса (последний - число записей);
+#   записи: уникальные префиксы SHA-1 фиксированной длины по возрастанию.
+# Префикса в 8 байт хватает, чтобы на сотнях миллионов паролей случайные
+# совпадения почти не встречались, а файл был в 2.5 раза меньше полных хэшей
+MAGIC = b'PBREACH1'
+HEADER = struct.Struct('<8sIIQ')
+FANOUT_SIZE = 1 << 16
+FANOUT = struct.Struct(f'<{FANOUT_SIZE + 1}Q')
+FANOUT_RANGE = struct.Struct('<2Q')
+DEFAULT_PREFIX_SIZE = 8
+MIN_PREFIX_SIZE = 4
+SHA1_SIZE = 20
+
+
+class BreachCorpus:
+    """
+    База SHA-1 утёкших паролей в файле, отображённом в память (mmap).
+
+    Страницы файла берутся из кэша ОС и общие для всех воркеров
+    gunicorn, память процесса не растёт с размером базы. Поиск -
+    индекс по первым двум байтам и двоичный поиск внутри диапазона:
+    около 15 сравнений на сотнях миллионов записей.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self._map, 'madvise'):
+            # Обращения случайные - упреждающее чтение только мешает
+            self._map.madvise(mmap.MADV_RANDOM)
+
+        if len(self._map) < HEADER.size + FANOUT.size:
+            raise ValueError(f'{path}: файл слишком короткий')
+        magic, self.prefix_size, _, self.count = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f'{path}: неизвестный формат файла')
+        self._records = HEADER.size + FANOUT.size
+        if len(self._map) != self._records + self.count * self.prefix_size:
+            raise ValueError(f'{path}: файл повреждён')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _bucket(self, prefix: bytes) -> Tuple[int, int]:
+        bucket = int.from_bytes(prefix[:2], 'big')
+        return FANOUT_RANGE.unpack_from(self._map, HEADER.size + bucket * 8)
+
+    def contains_digest(self, digest: bytes) -> bool:
+        """ Есть ли в базе SHA-1 digest (сравнивается префикс) """
+
+        size = self.prefix_size
+        prefix = digest[:size]
+        low, high = self._bucket(prefix)
+        records, data = self._records, self._map
+        while low < high:
+            middle = (low + high) // 2
+            start = records + middle * size
+            value = data[start:start + size]
+            if value < prefix:
+                low = middle + 1
+            elif value > prefix:
+                high = middle
+            else:
+                return True
+        return False
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_digest(hashlib.sha1(password.encode()).digest())
+
+    def close(self) -> None:
+        self._map.close()
+
+
+_corpora: Dict[str, BreachCorpus] = {}
+_corpora_lock = threading.Lock()
+
+
+def get_breach_corpus(path: str) -> BreachCorpus:
+    """
+    База утечек, открытая один раз на процесс. После пересборки
+    файла (build_breach_corpus заменяет его атомарно) воркеры
+    продолжают читать старую версию до перезапуска.
+    """
+
+    corpus = _corpora.get(path)
+    if corpus is None:
+        with _corpora_lock:
+            corpus = _corpora.get(path)
+            if corpus is None:
+                corpus = _corpora[path] = BreachCorpus(path)
+    return corpus
+
+
+def _parse_line(line: str, hashed: bool, min_count: int) -> Optional[bytes]:
+    """
+    SHA-1 из строки дампа: HEX[:COUNT] (как у Have I Been Pwned)
+    или сам пароль. None - строку нужно пропустить.
+
+    :raises ValueError: Строка не в формате HEX[:COUNT]
+    """
+
+    if not hashed:
+        password = line.rstrip('\r\n')
+        return hashlib.sha1(password.encode()).digest() if password else None
+
+    line = line.strip()
+    if not line:
+        return None
+    value, _, count = line.partition(':')
+    if count and int(count) < min_count:
+        return None
+    digest = bytes.fromhex(value)
+    if len(digest) != SHA1_SIZE:
+        raise ValueError(f'Не SHA-1: {value}')
+    return digest
+
+
+def build_corpus(
+    lines: Iterable[str], output: str,
+    prefix_size: int = DEFAULT_PREFIX_SIZE,
+    hashed: bool = True, min_count: int = 1,
+    temp_dir: Optional[str] = None,
+) -> int:
+    """
+    Собирает файл базы утечек из текстового дампа.
+
+    Префиксы раскладываются по 256 временным файлам по первому байту,
+    затем каждый файл сортируется в памяти отдельно: памяти нужно
+    примерно на 1/256 дампа, а не на весь дамп. Готовый файл
+    записывается рядом и подменяет output атомарно.
+
+    :param lines: Строки дампа
+    :param output: Путь к файлу базы
+    :param prefix_size: Сколько байт SHA-1 хранить
+    :param hashed: Строки - HEX[:COUNT], а не пароли
+    :param min_count: Пропускать хэши, встреченные реже (только для HEX:COUNT)
+    :param temp_dir: Каталог для временных файлов
+
+    :raises ValueError: Неверный размер префикса или строка дампа
+
+    :returns: Число записей в базе
+    """
+
+    if not MIN_PREFIX_SIZE <= prefix_size <= SHA1_SIZE:
+        raise ValueError(
+            f'Размер префикса должен быть от {MIN_PREFIX_SIZE} до {SHA1_SIZE} байт'
+        )
+
+    with tempfile.TemporaryDirectory(dir=temp_dir) as directory:
+        buckets: List[BinaryIO] = [
+            open(os.path.join(directory, f'{index:02x}'), 'wb')
+            for index in range(256)
+        ]
+        try:
+            for number, line in enumerate(lines, start=1):
+                try:
+                    digest = _parse_line(line, hashed, min_count)
+                except ValueError as error:
+                    raise ValueError(f'Строка {number}: {error}')
+                if digest is not None:
+                    buckets[digest[0]].write(digest[:prefix_size])
+        finally:
+            for bucket in buckets:
+                bucket.close()
+
+        fanout = array('Q', [0]) * (FANOUT_SIZE + 1)
+        count = 0
+        partial = f'{output}.partial'
+        with open(partial, 'wb') as file:
+            file.write(bytes(HEADER.size + FANOUT.size))
+            for index in range(256):
+                path = os.path.join(directory, f'{index:02x}')
+                data = Path(path).read_bytes()
+                os.unlink(path)
+                records = sorted({
+                    data[start:start + prefix_size]
+                    for start in range(0, len(data), prefix_size)
+                })
+                for record in records:
+                    fanout[int.from_bytes(record[:2], 'big') + 1] += 1
+                file.write(b''.join(records))
+                count += len(records)
+
+            # Количество записей в диапазонах -> номер первой записи диапазона
+            for bucket in range(1, FANOUT_SIZE + 1):
+                fanout[bucket] += fanout[bucket - 1]
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, prefix_size, 0, count))
+            file.write(FANOUT.pack(*fanout))
+        os.replace(partial, output)
+    return count
+
+
+class BreachedPasswordValidator:
+    """
+    Валидатор пароля (AUTH_PASSWORD_VALIDATORS): отклоняет пароли
+    из локальной базы утечек BREACHED_PASSWORDS_CORPUS. Проверка
+    идёт без обращений к сети, без файла валидатор ничего не делает.
+    """
+
+    def __init__(self, corpus_path: Optional[str] = None) -> None:
+        self.corpus_path = corpus_path
+
+    def get_corpus(self) -> Optional[BreachCorpus]:
+        path = self.corpus_path or settings.BREACHED_PASSWORDS_CORPUS
+        if not path:
+            return None
+        try:
+            return get_breach_corpus(path)
+        except (OSError, ValueError) as error:
+            raise ImproperlyConfigured(f'База утечек паролей недоступна: {error}')
+
+    def validate(self, password: str, user: Any = None) -> None:
+        corpus = self.get_corpus()
+        if corpus is not None and password in corpus:
+            raise ValidationError(
+                'Этот пароль встречается в утечках, выберите другой.',
+                code='password_breached',
+            )
+
+    def get_help_text(self) -> str:
+        return 'Пароль не должен встречаться в известных утечках.'
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Optional, Tuple
+
+from django.core.cache import caches
+
+
+class TTLCache:
+    """
+    Ограниченный LRU кэш в памяти процесса с временем жизни записей.
+
+    Значения хранятся сериализованными (как в LocMemCache), поэтому
+    каждый вызов get возвращает свою копию объекта. Если указан
+    backend - имя кэша из settings.CACHES, - он служит вторым уровнем,
+    общим для всех воркеров.
+    """
+
+    def __init__(
+        self, maxsize: int, ttl: float, prefix: str,
+        backend: Optional[str] = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.prefix = prefix
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._data: 'OrderedDict[str, Tuple[float, bytes]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _backend_key(self, key: str) -> str:
+        return f'{self.prefix}:{key}'
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """ Значение по ключу или default, если его нет или оно устарело """
+
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > monotonic():
+                    self._data.move_to_end(key)
+                    return pickle.loads(value)
+                del self._data[key]
+
+        if self.backend is None:
+            return default
+
+        value = caches[self.backend].get(self._backend_key(key))
+        if value is None:
+            return default
+        self._store(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """ Сохраняет значение на ttl секунд """
+
+        self._store(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        if self.backend is not None:
+            caches[self.backend].set(
+                self._backend_key(key), value, timeout=self.ttl,
+            )
+
+    def _store(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._data[key] = (monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        """ Удаляет значения на обоих уровнях """
+
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+        if self.backend is not None:
+            caches[self.backend].delete_many(
+                [self._backend_key(key) for key in keys]
+            )
+
+    def clear(self) -> None:
+        """ Очищает кэш процесса (общий уровень не трогаем) """
+
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any, Dict, NamedTuple, Optional, Set
+
+from django.conf import settings
+from graphql.error import GraphQLError
+from graphql.language import ast
+from graphql.type.definition import (GraphQLList, GraphQLNonNull,
+                                     get_named_type, is_leaf_type)
+from graphql.type.schema import GraphQLSchema
+
+
+# Аргументы, ограничивающие число элементов списка или connection
+SIZE_ARGUMENTS = ('first', 'last')
+
+
+class QueryCost(NamedTuple):
+    """ Статическая оценка запроса до выполнения """
+
+    # Сколько объектов может вернуть запрос
+    cost: int
+    # Максимальная вложенность полей
+    depth: int
+
+
+class QueryTooComplex(GraphQLError):
+    """ Запрос превышает GRAPHQL_MAX_COST или GRAPHQL_MAX_DEPTH """
+
+
+def _is_list(field_type: Any) -> bool:
+    if isinstance(field_type, GraphQLNonNull):
+        field_type = field_type.of_type
+    return isinstance(field_type, GraphQLList)
+
+
+class _Analyzer:
+    def __init__(
+        self, schema: GraphQLSchema, fragments: Dict[str, ast.FragmentDefinition],
+        variables: Dict[str, Any], defaults: Dict[str, Any],
+    ) -> None:
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables
+        self.defaults = defaults
+        # Фрагменты, раскрываемые на текущем пути: цикл фрагментов
+        # (его отклонит проверка документа) не уводит в бесконечную рекурсию
+        self.expanding: Set[str] = set()
+
+    def size_argument(self, field: ast.Field) -> Optional[int]:
+        for argument in field.arguments or ():
+            if argument.name.value not in SIZE_ARGUMENTS:
+                continue
+            value = argument.value
+            if isinstance(value, ast.Variable):
+                name = value.name.value
+                size = self.variables.get(name, self.defaults.get(name))
+            elif isinstance(value, ast.IntValue):
+                size = int(value.value)
+            else:
+                size = None
+            if isinstance(size, int) and size > 0:
+                return size
+        return None
+
+    def selection_set(
+        self, parent_type: Any, selection_set: ast.SelectionSet,
+        size_hint: Optional[int], depth: int,
+    ) -> QueryCost:
+        """ Стоимость и глубина набора полей одного объекта """
+
+        cost, max_depth = 0, depth
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                result = self.field(parent_type, selection, size_hint, depth)
+            else:
+                spread = None
+                if isinstance(selection, ast.FragmentSpread):
+                    spread = selection.name.value
+                    fragment = self.fragments.get(spread)
+                    if fragment is None or spread in self.expanding:
+                        continue
+                    self.expanding.add(spread)
+                else:
+                    fragment = selection
+                fragment_type = parent_type
+                if fragment.type_condition is not None:
+                    fragment_type = self.schema.get_type(
+                        fragment.type_condition.name.value,
+                    )
+                try:
+                    result = self.selection_set(
+                        fragment_type, fragment.selection_set, size_hint, depth,
+                    )
+                finally:
+                    self.expanding.discard(spread)
+            cost += result.cost
+            max_depth = max(max_depth, result.depth)
+        return QueryCost(cost, max_depth)
+
+    def field(
+        self, parent_type: Any, field: ast.Field,
+        size_hint: Optional[int], depth: int,
+    ) -> QueryCost:
+        name = field.name.value
+        # Интроспекция (__schema, __type, __typename) не считается
+        if name.startswith('__'):
+            return QueryCost(0, depth)
+
+        # Документ с ошибками проверки выполнен не будет - неизвестные
+        # поля и фрагменты просто не учитываются
+        definition = getattr(parent_type, 'fields', {}).get(name)
+        if definition is None or field.selection_set is None:
+            return QueryCost(0, depth)
+        field_type = definition.type
+        if is_leaf_type(get_named_type(field_type)):
+            return QueryCost(0, depth)
+
+        # first/last у connection ограничивают вложенный список edges
+        size = self.size_argument(field)
+        if _is_list(field_type):
+            count = size or size_hint or settings.GRAPHQL_DEFAULT_LIST_SIZE
+            size = None
+        else:
+            count = 1
+
+        children = self.selection_set(
+            get_named_type(field_type), field.selection_set, size, depth + 1,
+        )
+        return QueryCost(count * (1 + children.cost), children.depth)
+
+
+def analyze_query(
+    schema: GraphQLSchema, document_ast: ast.Document,
+    operation_name: Optional[str] = None,
+    variables: Optional[Dict[str, Any]] = None,
+) -> QueryCost:
+    """
+    Оценивает стоимость и глубину операции без обращения к базе.
+
+    Каждое поле-объект стоит 1, поле-список - столько, сколько
+    элементов запрошено аргументом first/last (у connection - у самого
+    поля), иначе GRAPHQL_DEFAULT_LIST_SIZE, умноженное на стоимость
+    вложенных полей. Скалярные поля и интроспекция бесплатны.
+
+    :param schema: Схема GraphQL
+    :param document_ast: Разобранный и проверенный документ
+    :param operation_name: Имя выполняемой операции
+    :param variables: Значения переменных запроса
+
+    :returns: Стоимость и глубина операции
+    """
+
+    operation, fragments = None, {}
+    for definition in document_ast.definitions:
+        if isinstance(definition, ast.FragmentDefinition):
+            fragments[definition.name.value] = definition
+        elif isinstance(definition, ast.OperationDefinition):
+            if operation_name is None or (
+                definition.name is not None
+                and definition.name.value == operation_name
+            ):
+                operation = operation or definition
+    if operation is None:
+        return QueryCost(0, 0)
+
+    defaults = {
+        definition.variable.name.value: int(definition.default_value.value)
+        for definition in operation.variable_definitions or ()
+        if isinstance(definition.default_value, ast.IntValue)
+    }
+    root_type = {
+        'query': schema.get_query_type,
+        'mutation': schema.get_mutation_type,
+        'subscription': schema.get_subscription_type,
+    }[operation.operation]()
+
+    analyzer = _Analyzer(schema, fragments, variables or {}, defaults)
+    return analyzer.selection_set(root_type, operation.selection_set, None, 0)
+
+
+def check_query_cost(
+    schema: GraphQLSchema, document_ast: ast.Document,
+    operation_name: Optional[str] = None,
+    variables: Optional[Dict[str, Any]] = None,
+) -> QueryCost:
+    """
+    Отклоняет запрос дороже GRAPHQL_MAX_COST или глубже GRAPHQL_MAX_DEPTH,
+    чтобы один клиент не занял воркер тысячами SQL запросов.
+
+    :raises QueryTooComplex: Запрос превышает ограничения
+
+    :returns: Стоимость и глубина операции
+    """
+
+    result = analyze_query(schema, document_ast, operation_name, variables)
+    extensions = {'cost': cost_extension(result)}
+    if result.depth > settings.GRAPHQL_MAX_DEPTH:
+        raise QueryTooComplex(
+            f'Глубина запроса {result.depth} больше '
+            f'допустимой {settings.GRAPHQL_MAX_DEPTH}',
+            extensions=extensions,
+        )
+    if result.cost > settings.GRAPHQL_MAX_COST:
+        raise QueryTooComplex(
+            f'Стоимость запроса {result.cost} больше '
+            f'допустимой {settings.GRAPHQL_MAX_COST}',
+            extensions=extensions,
+        )
+    return result
+
+
+def cost_extension(result: QueryCost) -> Dict[str, int]:
+    """ Оценка запроса для extensions ответа """
+
+    return {
+        'requested': result.cost,
+        'maximum': settings.GRAPHQL_MAX_COST,
+        'depth': result.depth,
+        'maxDepth': settings.GRAPHQL_MAX_DEPTH,
+    }
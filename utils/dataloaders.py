@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+from typing import Type
+
+import graphene
+from promise.dataloader import DataLoader
+
+
+def get_dataloader(
+    info: graphene.ResolveInfo, loader_class: Type[DataLoader],
+) -> DataLoader:
+    """
+    Возвращает DataLoader, общий для всего GraphQL запроса.
+    Загрузчики хранятся на объекте запроса, поэтому кеш загрузчика
+    живёт ровно один запрос и не протекает между пользователями.
+
+    :param info: Информация о запросе
+    :param loader_class: Класс загрузчика
+
+    :returns: Экземпляр загрузчика для текущего запроса
+    """
+
+    context = info.context
+    loaders = getattr(context, '_dataloaders', None)
+    if loaders is None:
+        loaders = context._dataloaders = {}
+
+    if loader_class not in loaders:
+        loaders[loader_class] = loader_class()
+    return loaders[loader_class]
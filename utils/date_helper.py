@@ -1,8 +1,47 @@
 # -*- coding: utf-8 -*-
 
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
+from time import time as current_timestamp
+from typing import Optional, Tuple
 
-from django.utils.timezone import get_current_timezone
+from django.conf import settings
+from django.utils.timezone import get_default_timezone, make_aware
+
+
+# (текущая дата, начало окна активности, timestamp окончания текущих суток).
+# Значения пересчитываются только при смене суток, поэтому вызовы из
+# горячих мест (Profile.is_active, запросы менеджера) почти ничего не стоят.
+_today_cache: Tuple[Optional[date], Optional[datetime], float] = (None, None, 0.0)
+
+
+def _local_midnight(day: date) -> datetime:
+    """ Начало суток day в часовом поясе проекта """
+
+    return make_aware(
+        datetime.combine(day, time.min), get_default_timezone(), is_dst=False,
+    )
+
+
+def _get_today() -> Tuple[date, datetime]:
+    """
+    Возвращает текущую дату и начало окна активности,
+    пересчитывая их не чаще одного раза в сутки.
+    """
+
+    global _today_cache
+
+    today, window_start, expires_at = _today_cache
+    if current_timestamp() < expires_at:
+        return today, window_start
+
+    today = datetime.now(get_default_timezone()).date()
+    window_start = _local_midnight(
+        today - timedelta(days=settings.INACTIVE_USER_DAYS - 1)
+    )
+    expires_at = _local_midnight(today + timedelta(days=1)).timestamp()
+
+    _today_cache = (today, window_start, expires_at)
+    return today, window_start
 
 
 def get_current_date() -> date:
@@ -12,5 +51,16 @@ def get_current_date() -> date:
     :returns: Объект datetime.date
     """
 
-    now = datetime.now().replace(tzinfo=get_current_timezone())
-    return now.date()
+    return _get_today()[0]
+
+
+def get_activity_window_start() -> datetime:
+    """
+    Функция которая возвращает начало окна активности пользователей.
+    Пользователь активен, если его последняя активность была не раньше
+    этого момента (то есть меньше INACTIVE_USER_DAYS дней назад).
+
+    :returns: Объект datetime с часовым поясом проекта
+    """
+
+    return _get_today()[1]
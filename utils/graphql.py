@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from graphql.backend import GraphQLBackend, GraphQLDocument
+from graphql.error import GraphQLError
+from graphql.execution import ExecutionResult, execute
+from graphql.language.base import parse
+from graphql.type.schema import GraphQLSchema
+from graphql.validation import validate
+from graphql.validation.rules import NoFragmentCycles
+
+from .cache import TTLCache
+
+
+# Тексты сохранённых запросов (Automatic Persisted Queries) по sha256
+persisted_queries = TTLCache(
+    maxsize=settings.GRAPHQL_PERSISTED_QUERIES_SIZE,
+    ttl=settings.GRAPHQL_PERSISTED_QUERIES_TTL,
+    prefix='graphql-apq',
+    backend=settings.GRAPHQL_PERSISTED_QUERIES_BACKEND,
+)
+
+
+class PersistedQueryNotFound(GraphQLError):
+    """ Клиент прислал только хэш, а текста запроса в реестре нет """
+
+    def __init__(self) -> None:
+        super().__init__(
+            'PersistedQueryNotFound',
+            extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'},
+        )
+
+
+def query_hash(query: str) -> str:
+    """ sha256 текста запроса, как его считает клиент APQ """
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def _invalid(errors: list, *args: Any, **kwargs: Any) -> ExecutionResult:
+    return ExecutionResult(errors=errors, invalid=True)
+
+
+class InvalidGraphQLDocument(GraphQLDocument):
+    """ Документ с ошибками проверки: выполнение сразу вернёт ошибки """
+
+    def __init__(
+        self, schema: GraphQLSchema, document_string: str,
+        document_ast: Any, errors: list,
+    ) -> None:
+        super().__init__(
+            schema=schema,
+            document_string=document_string,
+            document_ast=document_ast,
+            execute=partial(_invalid, errors),
+        )
+        self.errors = errors
+
+
+class CachedGraphQLBackend(GraphQLBackend):
+    """
+    Бэкенд graphql-core с LRU кэшем разобранных и проверенных
+    документов по sha256 текста запроса.
+
+    Повторный запрос с тем же текстом не разбирается и не проверяется
+    по схеме заново - сразу выполняется. Документы с ошибками
+    не кэшируются.
+    """
+
+    def __init__(self, maxsize: int, executor: Any = None) -> None:
+        self.maxsize = maxsize
+        self.execute_params = {'executor': executor}
+        self._lock = threading.Lock()
+        self._documents: 'OrderedDict[str, GraphQLDocument]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._documents.clear()
+
+    def get_cached_document(self, key: str) -> Optional[GraphQLDocument]:
+        """
+        Проверенный документ из кэша.
+
+        :param key: sha256 текста запроса
+
+        :returns: Документ или None
+        """
+
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+            return document
+
+    def document_from_string(
+        self, schema: GraphQLSchema, document_string: str,
+        key: Optional[str] = None,
+    ) -> GraphQLDocument:
+        """
+        Разбирает и проверяет запрос или берёт его из кэша.
+
+        :param schema: Схема GraphQL
+        :param document_string: Текст запроса
+        :param key: sha256 текста, если уже посчитан
+
+        :raises GraphQLSyntaxError: Запрос не разбирается
+
+        :returns: Документ, готовый к выполнению
+        """
+
+        key = key or query_hash(document_string)
+        document = self.get_cached_document(key)
+        if document is not None and document.schema is schema:
+            return document
+
+        document_ast = parse(document_string)
+        # OverlappingFieldsCanBeMerged в graphql-core 2 уходит в бесконечную
+        # рекурсию на цикле фрагментов - циклы проверяются заранее отдельно
+        errors = (
+            validate(schema, document_ast, [NoFragmentCycles])
+            or validate(schema, document_ast)
+        )
+        if errors:
+            return InvalidGraphQLDocument(
+                schema=schema,
+                document_string=document_string,
+                document_ast=document_ast,
+                errors=errors,
+            )
+
+        document = GraphQLDocument(
+            schema=schema,
+            document_string=document_string,
+            document_ast=document_ast,
+            execute=partial(execute, schema, document_ast, **self.execute_params),
+        )
+        with self._lock:
+            self._documents[key] = document
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+        return document
+
+
+graphql_backend = CachedGraphQLBackend(maxsize=settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+
+def get_persisted_document(
+    backend: CachedGraphQLBackend, schema: GraphQLSchema,
+    extension: Dict[str, Any], query: Optional[str],
+) -> GraphQLDocument:
+    """
+    Документ запроса по протоколу Automatic Persisted Queries.
+
+    Клиент присылает sha256 запроса в extensions.persistedQuery.
+    Если сервер его не знает, клиент повторяет запрос вместе
+    с текстом, и текст сохраняется в реестре.
+
+    :param backend: Бэкенд с кэшем документов
+    :param schema: Схема GraphQL
+    :param extension: Значение extensions.persistedQuery
+    :param query: Текст запроса, если клиент его прислал
+
+    :raises PersistedQueryNotFound: Хэш неизвестен, нужен текст запроса
+    :raises GraphQLError: Неподдерживаемая версия или хэш не совпал
+
+    :returns: Документ, готовый к выполнению
+    """
+
+    key = extension.get('sha256Hash')
+    if extension.get('version') != 1 or not isinstance(key, str):
+        raise GraphQLError('Неподдерживаемая версия persistedQuery')
+
+    if query:
+        if query_hash(query) != key:
+            raise GraphQLError('provided sha does not match query')
+        document = backend.document_from_string(schema, query, key=key)
+        persisted_queries.set(key, query)
+        return document
+
+    document = backend.get_cached_document(key)
+    if document is not None and document.schema is schema:
+        return document
+
+    query = persisted_queries.get(key)
+    if query is None:
+        raise PersistedQueryNotFound
+    return backend.document_from_string(schema, query, key=key)
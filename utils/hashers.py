@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from django.conf import settings
+from django.contrib.auth.hashers import (Argon2PasswordHasher,
+                                         BCryptSHA256PasswordHasher,
+                                         PBKDF2PasswordHasher)
+
+from .metrics import password_hash_seconds
+
+
+T = TypeVar('T')
+
+
+class HashingBusyError(Exception):
+    """ Все потоки хэширования заняты дольше PASSWORD_HASHING_QUEUE_TIMEOUT """
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _slots
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = settings.PASSWORD_HASHING_WORKERS
+                _slots = threading.BoundedSemaphore(
+                    workers + settings.PASSWORD_HASHING_QUEUE_SIZE
+                )
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix='password-hashing',
+                    initializer=_mark_hashing_thread,
+                )
+    return _executor
+
+
+def _mark_hashing_thread() -> None:
+    _local.in_pool = True
+
+
+def run_hashing(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Выполняет хэширование пароля в ограниченном пуле потоков.
+
+    hashlib, argon2 и bcrypt отпускают GIL, так что пул ограничивает
+    число ядер, одновременно занятых хэшированием: всплеск логинов
+    и регистраций ждёт в очереди, а не отнимает процессор у остальных
+    запросов. При PASSWORD_HASHING_WORKERS = 0 функция вызывается
+    в текущем потоке.
+
+    :param func: Функция хэширования
+    :param args: Позиционные аргументы func
+    :param kwargs: Именованные аргументы func
+
+    :raises HashingBusyError: Очередь пула переполнена дольше
+     PASSWORD_HASHING_QUEUE_TIMEOUT секунд
+
+    :returns: Результат func
+    """
+
+    # Хэшер может вызывать сам себя (verify -> encode) - уже в пуле
+    if settings.PASSWORD_HASHING_WORKERS <= 0 or getattr(_local, 'in_pool', False):
+        return func(*args, **kwargs)
+
+    executor = _get_executor()
+    if not _slots.acquire(timeout=settings.PASSWORD_HASHING_QUEUE_TIMEOUT):
+        raise HashingBusyError('Сервер перегружен, повторите попытку позже')
+    try:
+        return executor.submit(func, *args, **kwargs).result()
+    finally:
+        _slots.release()
+
+
+def _timed(
+    algorithm: str, operation: str, func: Callable[..., T], *args: Any, **kwargs: Any
+) -> T:
+    # verify у PBKDF2 вызывает encode - вложенный вызов не замеряем
+    if getattr(_local, 'timing', False):
+        return func(*args, **kwargs)
+
+    _local.timing = True
+    try:
+        with password_hash_seconds.labels(algorithm, operation).time():
+            return func(*args, **kwargs)
+    finally:
+        _local.timing = False
+
+
+class PooledHasherMixin:
+    """
+    Хэширование и проверка пароля в пуле run_hashing.
+    Так через пул идут все вызовы: create_user, set_password,
+    check_password и авторизация по паролю в ObtainJSONWebToken.
+    Время самого хэширования попадает в метрику password_hash_seconds.
+    """
+
+    def encode(self, *args: Any, **kwargs: Any) -> str:
+        return run_hashing(
+            _timed, self.algorithm, 'encode', super().encode, *args, **kwargs,
+        )
+
+    def verify(self, *args: Any, **kwargs: Any) -> bool:
+        return run_hashing(
+            _timed, self.algorithm, 'verify', super().verify, *args, **kwargs,
+        )
+
+
+class TunablePBKDF2PasswordHasher(PooledHasherMixin, PBKDF2PasswordHasher):
+    """ PBKDF2 с числом итераций из PBKDF2_ITERATIONS """
+
+    @property
+    def iterations(self) -> int:
+        return settings.PBKDF2_ITERATIONS
+
+
+class TunableArgon2PasswordHasher(PooledHasherMixin, Argon2PasswordHasher):
+    """ Argon2 с параметрами из ARGON2_TIME_COST, ARGON2_MEMORY_COST """
+
+    @property
+    def time_cost(self) -> int:
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self) -> int:
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self) -> int:
+        return settings.ARGON2_PARALLELISM
+
+
+class TunableBCryptSHA256PasswordHasher(
+    PooledHasherMixin, BCryptSHA256PasswordHasher,
+):
+    """ bcrypt с числом раундов из BCRYPT_ROUNDS """
+
+    @property
+    def rounds(self) -> int:
+        return settings.BCRYPT_ROUNDS
+
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any, List, Tuple
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import CharField, Lookup, TextField
+from django.db.models.sql.compiler import SQLCompiler
+
+
+@CharField.register_lookup
+@TextField.register_lookup
+class TrigramIContains(Lookup):
+    """
+    Регистронезависимый поиск подстроки через ILIKE.
+
+    Стандартный icontains в PostgreSQL строится как UPPER(col) LIKE UPPER(%s)
+    и не использует индекс. ILIKE по самой колонке выполняется
+    по GIN индексу с gin_trgm_ops (см. passwords.services.search).
+    """
+
+    lookup_name = 'trgm_icontains'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(
+        self, value: Any, connection: BaseDatabaseWrapper,
+    ) -> Tuple[str, List[str]]:
+        return '%s', ['%%%s%%' % connection.ops.prep_for_like_query(value)]
+
+    def as_sql(
+        self, compiler: SQLCompiler, connection: BaseDatabaseWrapper,
+    ) -> Tuple[str, List[Any]]:
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', lhs_params + rhs_params
+
+    def as_sqlite(
+        self, compiler: SQLCompiler, connection: BaseDatabaseWrapper,
+    ) -> Tuple[str, List[Any]]:
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} LIKE {rhs} ESCAPE '\\'", lhs_params + rhs_params
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+import contextvars
+import hmac
+import os
+import re
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, Optional, Set
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.http import require_GET
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+
+# Метрики собираются в памяти процесса. Под gunicorn entrypoint.sh задаёт
+# PROMETHEUS_MULTIPROC_DIR: каждый воркер пишет значения в свои mmap
+# файлы, а /metrics суммирует их по всем воркерам
+
+SQL_QUERIES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+HASH_SECONDS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+graphql_operation_seconds = Histogram(
+    'graphql_operation_seconds',
+    'Время обработки GraphQL операции',
+    ['operation'],
+)
+graphql_resolver_seconds = Histogram(
+    'graphql_resolver_seconds',
+    'Время выполнения резолвера поля GraphQL',
+    ['field'],
+)
+graphql_resolver_sql_queries = Counter(
+    'graphql_resolver_sql_queries',
+    'SQL запросы, выполненные внутри резолвера поля GraphQL',
+    ['field'],
+)
+graphql_request_sql_queries = Histogram(
+    'graphql_request_sql_queries',
+    'Число SQL запросов на один GraphQL запрос',
+    buckets=SQL_QUERIES_BUCKETS,
+)
+graphql_request_sql_seconds = Histogram(
+    'graphql_request_sql_seconds',
+    'Время SQL запросов на один GraphQL запрос',
+)
+graphql_n_plus_one = Counter(
+    'graphql_n_plus_one',
+    'GraphQL запросы с одинаковым SQL больше GRAPHQL_N_PLUS_ONE_THRESHOLD раз',
+    ['field'],
+)
+http_request_db_seconds = Histogram(
+    'http_request_db_seconds',
+    'Время SQL запросов на один HTTP запрос',
+    ['route'],
+)
+password_hash_seconds = Histogram(
+    'password_hash_seconds',
+    'Время хэширования или проверки пароля (без ожидания в очереди)',
+    ['algorithm', 'operation'],
+    buckets=HASH_SECONDS_BUCKETS,
+)
+jwt_tokens = Counter(
+    'jwt_tokens',
+    'Выпуск и проверка JWT токенов',
+    ['operation', 'outcome'],
+)
+service_calls = Counter(
+    'service_calls',
+    'Вызовы сервисов по результату: success или имя исключения',
+    ['service', 'outcome'],
+)
+
+
+OPERATION_NAME_RE = re.compile(r'^[_A-Za-z][_0-9A-Za-z]{0,63}$')
+
+_operation_names: Set[str] = set()
+_operation_names_lock = threading.Lock()
+
+
+def operation_label(operation_name: Optional[str]) -> str:
+    """
+    Метка операции для метрик. Имена присылает клиент, поэтому
+    различных меток не больше METRICS_MAX_OPERATIONS на процесс,
+    остальные операции считаются как other.
+
+    :param operation_name: Имя GraphQL операции
+
+    :returns: Значение метки operation
+    """
+
+    if not operation_name:
+        return 'anonymous'
+    if not OPERATION_NAME_RE.match(operation_name):
+        return 'invalid'
+    if operation_name in _operation_names:
+        return operation_name
+    with _operation_names_lock:
+        if len(_operation_names) >= settings.METRICS_MAX_OPERATIONS:
+            return 'other'
+        _operation_names.add(operation_name)
+    return operation_name
+
+
+class DatabaseTimer:
+    """ Время SQL запросов в пределах одного HTTP запроса """
+
+    __slots__ = ('seconds', 'queries')
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self.queries = 0
+
+
+_db_timer: 'contextvars.ContextVar[Optional[DatabaseTimer]]' = contextvars.ContextVar(
+    'db_timer', default=None,
+)
+
+
+@contextmanager
+def measure_db_time() -> Iterator[DatabaseTimer]:
+    """
+    Считает время SQL запросов внутри блока, в том числе выполненных
+    в пуле потоков (utils.async_pool копирует контекст).
+    """
+
+    timer = DatabaseTimer()
+    token = _db_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _db_timer.reset(token)
+
+
+def record_db_time(
+    execute: Callable, sql: str, params: Any, many: bool, context: Dict,
+) -> Any:
+    """ Постоянная обёртка execute_wrapper соединений (utils.backends) """
+
+    timer = _db_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.seconds += perf_counter() - started
+        timer.queries += 1
+
+
+def count_outcomes(service: str) -> Callable:
+    """
+    Декоратор сервиса: считает вызовы в service_calls
+    с результатом success или именем исключения.
+
+    :param service: Имя сервиса для метки
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                result = func(*args, **kwargs)
+            except Exception as error:
+                service_calls.labels(service, type(error).__name__).inc()
+                raise
+            service_calls.labels(service, 'success').inc()
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def get_registry() -> CollectorRegistry:
+    """ Реестр метрик: общий для воркеров в режиме multiprocess """
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+@require_GET
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Метрики в текстовом формате Prometheus.
+    Если задан METRICS_TOKEN - только с заголовком
+    Authorization: Bearer <token>.
+    """
+
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        provided = request.META.get('HTTP_AUTHORIZATION', '')
+        if not hmac.compare_digest(provided.encode(), expected.encode()):
+            return HttpResponse(status=401)
+
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST,
+    )
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from typing import Any, Callable
+
+from django.http import HttpRequest, HttpResponse
+
+from .metrics import http_request_db_seconds, measure_db_time
+
+
+class DatabaseMetricsMiddleware:
+    """
+    Время SQL запросов на HTTP запрос в метрику http_request_db_seconds
+    с меткой маршрута. Работает и в WSGI, и в ASGI режиме.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[..., Any]) -> None:
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Django 3.1 так узнаёт асинхронный middleware
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        with measure_db_time() as timer:
+            response = self.get_response(request)
+        self.observe(request, timer.seconds)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        with measure_db_time() as timer:
+            response = await self.get_response(request)
+        self.observe(request, timer.seconds)
+        return response
+
+    @staticmethod
+    def observe(request: HttpRequest, seconds: float) -> None:
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        http_request_db_seconds.labels(route).observe(seconds)
@@ -1,14 +1,203 @@
 # -*- coding: utf-8 -*-
 
-import random
+import math
+import os
 import string
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple, Union
 
-def generate_password(length):
+
+# Символы, которые легко перепутать при чтении или вводе вручную
+AMBIGUOUS = 'Il1|O0o`\'"'
+
+# Слоги для фраз-паролей: согласная + гласная, 80 вариантов
+CONSONANTS = 'bdfghjklmnprstvz'
+VOWELS = 'aeiou'
+SYLLABLES = [consonant + vowel for consonant in CONSONANTS for vowel in VOWELS]
+
+# Бит энтропии для оценок стойкости 1, 2, 3 и 4 (password_strength)
+STRENGTH_THRESHOLDS = (28, 36, 60, 80)
+
+
+class PasswordPolicy(NamedTuple):
+    """ Политика пароля из случайных символов """
+
+    length: int = 16
+    lowercase: bool = True
+    uppercase: bool = True
+    digits: bool = True
+    symbols: bool = True
+    exclude_ambiguous: bool = False
+
+
+class PassphrasePolicy(NamedTuple):
+    """ Политика фразы-пароля из произносимых слов """
+
+    words: int = 5
+    syllables: int = 3
+    separator: str = '-'
+    capitalize: bool = True
+
+
+@lru_cache(maxsize=64)
+def _translation(values: bytes) -> Tuple[bytes, bytes]:
+    """
+    Таблица bytes.translate: байт b < limit переходит в values[b % size],
+    остальные байты удаляются (rejection sampling без перекоса
+    в сторону первых значений).
+    """
+
+    size = len(values)
+    limit = 256 - 256 % size
+    table = bytes(values[b % size] if b < limit else 0 for b in range(256))
+    return table, bytes(range(limit, 256))
+
+
+def random_values(values: bytes, count: int) -> bytes:
+    """
+    count равновероятных значений из values. Случайные байты берутся
+    из os.urandom целым буфером, отображаются и отбрасываются
+    одним вызовом bytes.translate.
+
+    :param values: Допустимые значения (от 1 до 256 байт)
+    :param count: Сколько значений нужно
+    """
+
+    table, rejected = _translation(values)
+    acceptance = 1 - len(rejected) / 256
+    result = b''
+    while len(result) < count:
+        need = count - len(result)
+        # С запасом, чтобы обычно хватало одного буфера
+        buffer = os.urandom(int(need / acceptance * 1.05) + 16)
+        result += buffer.translate(table, rejected)
+    return result[:count]
+
+
+def policy_classes(policy: PasswordPolicy) -> List[str]:
+    """ Наборы символов, каждый из которых должен быть в пароле """
+
+    classes = [
+        alphabet for enabled, alphabet in (
+            (policy.lowercase, string.ascii_lowercase),
+            (policy.uppercase, string.ascii_uppercase),
+            (policy.digits, string.digits),
+            (policy.symbols, string.punctuation),
+        ) if enabled
+    ]
+    if policy.exclude_ambiguous:
+        classes = [
+            ''.join(char for char in alphabet if char not in AMBIGUOUS)
+            for alphabet in classes
+        ]
+    return classes
+
+
+def random_passwords(policy: PasswordPolicy, count: int) -> List[str]:
+    """
+    Генерирует пароли из случайных символов.
+
+    Все символы пароля равновероятны, пароли без символа какого-либо
+    из включённых наборов отбрасываются целиком - так пароли остаются
+    равномерно распределёнными среди подходящих под политику.
+
+    :param policy: Политика пароля
+    :param count: Число паролей
+
+    :raises ValueError: Политика невыполнима
+
+    :returns: Список паролей
+    """
+
+    classes = policy_classes(policy)
+    if not classes:
+        raise ValueError('Не выбран ни один набор символов')
+    if policy.length < len(classes):
+        raise ValueError('Длина пароля меньше числа обязательных наборов')
+
+    alphabet = ''.join(classes).encode()
+    required = [frozenset(chars.encode()) for chars in classes]
+    passwords: List[str] = []
+    while len(passwords) < count:
+        data = random_values(alphabet, (count - len(passwords)) * policy.length)
+        for start in range(0, len(data), policy.length):
+            password = data[start:start + policy.length]
+            if all(not chars.isdisjoint(password) for chars in required):
+                passwords.append(password.decode())
+    return passwords[:count]
+
+
+def random_passphrases(policy: PassphrasePolicy, count: int) -> List[str]:
+    """
+    Генерирует фразы-пароли из произносимых слов (например, Bakito-Zumera).
+
+    :param policy: Политика фразы
+    :param count: Число фраз
+
+    :returns: Список фраз
+    """
+
+    per_phrase = policy.words * policy.syllables
+    indexes = random_values(bytes(range(len(SYLLABLES))), count * per_phrase)
+    phrases = []
+    for phrase_start in range(0, len(indexes), per_phrase):
+        words = []
+        for word_start in range(
+                phrase_start, phrase_start + per_phrase, policy.syllables):
+            word = ''.join(
+                SYLLABLES[index]
+                for index in indexes[word_start:word_start + policy.syllables]
+            )
+            words.append(word.capitalize() if policy.capitalize else word)
+        phrases.append(policy.separator.join(words))
+    return phrases
+
+
+def policy_entropy(policy: Union[PasswordPolicy, PassphrasePolicy]) -> float:
+    """
+    Энтропия одного пароля в битах. Для паролей из символов - оценка
+    сверху: отбрасывание паролей без обязательных наборов её немного снижает.
+    """
+
+    if isinstance(policy, PassphrasePolicy):
+        return policy.words * policy.syllables * math.log2(len(SYLLABLES))
+    alphabet_size = sum(len(alphabet) for alphabet in policy_classes(policy))
+    return policy.length * math.log2(alphabet_size)
+
+
+def password_strength(password: str) -> int:
+    """
+    Оценка стойкости пароля от 0 до 4 по грубой энтропии:
+    длина (повторяющиеся символы учитываются не больше двух раз
+    на уникальный) на размер набора использованных символов.
+
+    :param password: Пароль
+
+    :returns: 0 - очень слабый, 4 - стойкий
+    """
+
+    pool = sum(
+        len(chars) for chars in (
+            string.ascii_lowercase, string.ascii_uppercase,
+            string.digits, string.punctuation,
+        ) if any(char in chars for char in password)
+    )
+    if any(ord(char) > 127 or char == ' ' for char in password):
+        # Буквы других алфавитов и пробелы
+        pool += 64
+    if not pool:
+        return 0
+
+    length = min(len(password), len(set(password)) * 2)
+    bits = length * math.log2(pool)
+    return sum(bits >= threshold for threshold in STRENGTH_THRESHOLDS)
+
+
+def generate_password(length: int) -> str:
     """Генерирует пароль заданной длины"""
 
-    char = string.ascii_letters + string.digits + string.punctuation
-    password = ''.join(random.choice(char) for _ in range(length))
-    return password
+    return random_passwords(PasswordPolicy(length=length), 1)[0]
+
 
 def main():
     """Вводится длина пароля и генерится пароль"""
@@ -17,5 +206,6 @@ def main():
     password = generate_password(length)
     return password
 
+
 if __name__ == "__main__":
     main()
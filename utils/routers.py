@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import contextvars
+import hashlib
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest
+from graphql_jwt.utils import get_credentials
+
+from .cache import TTLCache
+
+
+REPLICA_DB_ALIAS = 'replica'
+
+
+class _RoutingState:
+    """ Маршрутизация запросов к базе в пределах одного HTTP запроса """
+
+    def __init__(self, use_replica: bool) -> None:
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_state: 'contextvars.ContextVar[Optional[_RoutingState]]' = contextvars.ContextVar(
+    'database_routing', default=None,
+)
+
+# Пользователи, которые недавно писали в основную базу, по хэшу токена
+replica_pins = TTLCache(
+    maxsize=settings.REPLICA_PIN_CACHE_SIZE,
+    ttl=settings.REPLICA_STICKY_SECONDS,
+    prefix='replica-pin',
+    backend=settings.REPLICA_PIN_CACHE_BACKEND,
+)
+
+
+def has_replica() -> bool:
+    """ Настроена ли реплика для чтения """
+    return REPLICA_DB_ALIAS in connections.databases
+
+
+def _pin_key(request: HttpRequest) -> Optional[str]:
+    token = get_credentials(request)
+    if not token:
+        return None
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+@contextmanager
+def database_routing(request: HttpRequest, read_only: bool) -> Iterator[None]:
+    """
+    Выбирает базу для чтения на время обработки запроса.
+
+    Запрос только на чтение читает с реплики, если пользователь
+    не писал в основную базу последние REPLICA_STICKY_SECONDS
+    секунд - так он сразу видит свои изменения, несмотря на
+    отставание реплики. После записи пользователь закрепляется
+    за основной базой на это же время.
+
+    :param request: HTTP запрос
+    :param read_only: Запрос не должен ничего менять в базе
+    """
+
+    key = _pin_key(request)
+    use_replica = (
+        read_only and has_replica()
+        and (key is None or not replica_pins.get(key, False))
+    )
+    state = _RoutingState(use_replica)
+    token = _state.set(state)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+        if state.wrote and key is not None:
+            replica_pins.set(key, True)
+
+
+class ReplicaRouter:
+    """
+    Роутер реплики для чтения (DATABASE_ROUTERS).
+
+    Запись всегда идёт в основную базу. Чтение идёт в реплику только
+    внутри database_routing для запроса на чтение, вне транзакций
+    (@atomic читает и пишет в одну базу) и до первой записи.
+    """
+
+    def db_for_read(self, model: Any, **hints: Any) -> Optional[str]:
+        state = _state.get()
+        if (
+            state is not None
+            and state.use_replica
+            and not state.wrote
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model: Any, **hints: Any) -> str:
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Any, obj2: Any, **hints: Any) -> Optional[bool]:
+        databases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, **hints: Any) -> bool:
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import graphene
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest
+from graphene.types.resolver import (attr_resolver, dict_or_attr_resolver,
+                                     dict_resolver)
+from graphql.type.definition import get_named_type, is_leaf_type
+
+from .metrics import (graphql_n_plus_one, graphql_request_sql_queries,
+                      graphql_request_sql_seconds, graphql_resolver_seconds,
+                      graphql_resolver_sql_queries)
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESOLVERS = (attr_resolver, dict_resolver, dict_or_attr_resolver)
+
+# Поля, которые не трассируются: скаляры с резолвером по умолчанию
+_trivial_fields: Dict[Tuple[str, str], bool] = {}
+
+
+class FieldStats:
+    """ Время и SQL запросы одного поля (или пути) за запрос """
+
+    __slots__ = ('calls', 'seconds', 'sql_count', 'sql_seconds')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+class RequestTrace:
+    """
+    Трассировка одного GraphQL запроса: время резолверов
+    и SQL запросы, в том числе в разрезе полей.
+    """
+
+    def __init__(self, detailed: bool) -> None:
+        self.detailed = detailed
+        self.started = perf_counter()
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.sql_templates: 'Counter[str]' = Counter()
+        # Поле -> шаблоны его SQL, чтобы указать виновника N+1
+        self.sql_owners: Dict[str, 'Counter[str]'] = {}
+        self.fields: Dict[str, FieldStats] = {}
+        self.paths: List[Dict[str, Any]] = []
+        self._stack: List[FieldStats] = []
+        self._stack_fields: List[str] = []
+
+    def execute_sql(
+        self, execute: Any, sql: str, params: Any, many: bool, context: Dict,
+    ) -> Any:
+        """ Обёртка connection.execute_wrapper """
+
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - started
+            self.sql_count += 1
+            self.sql_seconds += elapsed
+            self.sql_templates[sql] += 1
+            if self._stack:
+                stats = self._stack[-1]
+                stats.sql_count += 1
+                stats.sql_seconds += elapsed
+                owner = self._stack_fields[-1]
+                self.sql_owners.setdefault(owner, Counter())[sql] += 1
+
+    def enter(self, field: str) -> FieldStats:
+        stats = FieldStats()
+        self._stack.append(stats)
+        self._stack_fields.append(field)
+        return stats
+
+    def leave(self, field: str, path: List[Any], stats: FieldStats, elapsed: float) -> None:
+        self._stack.pop()
+        self._stack_fields.pop()
+        stats.calls = 1
+        stats.seconds = elapsed
+
+        total = self.fields.get(field)
+        if total is None:
+            total = self.fields[field] = FieldStats()
+        total.calls += 1
+        total.seconds += elapsed
+        total.sql_count += stats.sql_count
+        total.sql_seconds += stats.sql_seconds
+
+        if self.detailed:
+            self.paths.append({
+                'path': path,
+                'field': field,
+                'duration': round(elapsed * 1000, 3),
+                'sqlCount': stats.sql_count,
+                'sqlDuration': round(stats.sql_seconds * 1000, 3),
+            })
+
+    def n_plus_one(self) -> List[Tuple[str, int]]:
+        """ SQL шаблоны, повторённые больше GRAPHQL_N_PLUS_ONE_THRESHOLD раз """
+
+        threshold = settings.GRAPHQL_N_PLUS_ONE_THRESHOLD
+        return [
+            (sql, count) for sql, count in self.sql_templates.most_common()
+            if count > threshold
+        ]
+
+    def owner_of(self, sql: str) -> str:
+        """ Поле, резолвер которого чаще всех выполнял этот SQL """
+
+        owners = [
+            (templates[sql], field)
+            for field, templates in self.sql_owners.items() if sql in templates
+        ]
+        return max(owners)[1] if owners else 'request'
+
+    def as_extension(self) -> Dict[str, Any]:
+        return {
+            'duration': round(self.duration * 1000, 3),
+            'sql': {
+                'count': self.sql_count,
+                'duration': round(self.sql_seconds * 1000, 3),
+            },
+            'resolvers': self.paths,
+            'nPlusOne': [
+                {'sql': sql, 'count': count, 'field': self.owner_of(sql)}
+                for sql, count in self.n_plus_one()
+            ],
+        }
+
+
+def get_trace(request: HttpRequest) -> Optional[RequestTrace]:
+    return getattr(request, '_graphql_trace', None)
+
+
+def wants_tracing(request: HttpRequest) -> bool:
+    """
+    Нужна ли подробная трассировка в extensions.tracing:
+    запрос с заголовком GRAPHQL_TRACING_HEADER.
+    """
+
+    return bool(request.META.get(settings.GRAPHQL_TRACING_HEADER))
+
+
+def can_see_tracing(request: HttpRequest) -> bool:
+    """ SQL и время резолверов видны только в DEBUG и персоналу """
+
+    user = getattr(request, 'user', None)
+    return settings.DEBUG or bool(getattr(user, 'is_staff', False))
+
+
+@contextmanager
+def trace_request(request: HttpRequest, operation_name: Optional[str]) -> Iterator[RequestTrace]:
+    """
+    Трассирует выполнение GraphQL запроса.
+
+    SQL запросы всех соединений потока считаются через
+    connection.execute_wrapper, время полей - TracingMiddleware.
+    После запроса агрегаты уходят в метрики (utils.metrics),
+    повторяющийся SQL пишется в лог как возможный N+1.
+
+    :param request: HTTP запрос
+    :param operation_name: Имя операции для лога
+    """
+
+    trace = RequestTrace(detailed=wants_tracing(request))
+    request._graphql_trace = trace
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(trace.execute_sql),
+                )
+            yield trace
+    finally:
+        trace.duration = perf_counter() - trace.started
+        request._graphql_trace = None
+        _export(trace, operation_name)
+
+
+def _export(trace: RequestTrace, operation_name: Optional[str]) -> None:
+    graphql_request_sql_queries.observe(trace.sql_count)
+    graphql_request_sql_seconds.observe(trace.sql_seconds)
+    for field, stats in trace.fields.items():
+        histogram = graphql_resolver_seconds.labels(field)
+        # Поле списка вызывается для каждого элемента - одно наблюдение
+        # со средним временем, чтобы не раздувать стоимость экспорта
+        histogram.observe(stats.seconds / stats.calls)
+        if stats.sql_count:
+            graphql_resolver_sql_queries.labels(field).inc(stats.sql_count)
+
+    for sql, count in trace.n_plus_one():
+        field = trace.owner_of(sql)
+        graphql_n_plus_one.labels(field).inc()
+        logger.warning(
+            'Возможный N+1 в операции %s (%s): %d одинаковых SQL запросов: %s',
+            operation_name or '<без имени>', field, count, sql[:300],
+        )
+
+
+def _is_trivial(info: graphene.ResolveInfo) -> bool:
+    key = (info.parent_type.name, info.field_name)
+    trivial = _trivial_fields.get(key)
+    if trivial is None:
+        field = info.parent_type.fields[info.field_name]
+        resolver = field.resolver
+        trivial = (
+            is_leaf_type(get_named_type(field.type))
+            and isinstance(resolver, partial)
+            and resolver.func in DEFAULT_RESOLVERS
+        )
+        _trivial_fields[key] = trivial
+    return trivial
+
+
+class TracingMiddleware:
+    """
+    Middleware graphene: время резолверов и SQL запросы внутри них.
+
+    Скалярные поля с резолвером по умолчанию не трассируются - они
+    только читают атрибут объекта. У резолверов, вернувших Promise
+    (DataLoader), учитывается синхронная часть: SQL загрузчика
+    выполняется позже и относится ко всему запросу.
+    """
+
+    def resolve(self, next: Any, root: Any, info: graphene.ResolveInfo, **args: Any) -> Any:
+        trace = get_trace(info.context)
+        if trace is None or _is_trivial(info):
+            return next(root, info, **args)
+
+        field = f'{info.parent_type.name}.{info.field_name}'
+        stats = trace.enter(field)
+        started = perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            trace.leave(field, info.path, stats, perf_counter() - started)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import ipaddress
+from typing import Optional
+from urllib.parse import urlsplit
+
+
+MAX_HOST_LENGTH = 253
+
+# Публичные суффиксы из нескольких меток, под которыми регистрируют
+# домены (как в Public Suffix List). Не весь список - только частые
+# в хранилищах случаи: для остальных доменов регистрируемым считается
+# домен второго уровня, и автозаполнение просто объединит чуть больше сайтов
+PUBLIC_SUFFIXES = frozenset({
+    # Национальные домены второго уровня
+    'co.uk', 'org.uk', 'me.uk', 'ac.uk', 'gov.uk', 'ltd.uk', 'plc.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au',
+    'co.nz', 'org.nz', 'co.za', 'co.in', 'net.in', 'org.in',
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'co.kr', 'or.kr',
+    'com.br', 'net.br', 'org.br', 'com.ar', 'com.mx', 'com.tr',
+    'com.cn', 'net.cn', 'org.cn', 'com.hk', 'com.tw', 'com.sg',
+    'com.ua', 'org.ua', 'kiev.ua', 'com.by', 'com.kz',
+    'com.ru', 'net.ru', 'org.ru', 'msk.ru', 'spb.ru', 'msk.su',
+    # Хостинги, где у каждого клиента свой поддомен
+    'github.io', 'gitlab.io', 'herokuapp.com', 'appspot.com',
+    'blogspot.com', 'azurewebsites.net', 'cloudfront.net',
+    'netlify.app', 'vercel.app', 'pages.dev', 'workers.dev',
+    'firebaseapp.com', 'web.app',
+})
+
+
+def url_host(url: Optional[str]) -> Optional[str]:
+    """
+    Нормализованный хост URL: в нижнем регистре, в punycode, без порта,
+    учётных данных, точки в конце и префикса www. Схема не обязательна
+    (example.com/login тоже URL).
+
+    :param url: URL из хранилища или адрес страницы
+
+    :returns: Хост или None, если его не выделить
+    """
+
+    value = (url or '').strip()
+    if not value:
+        return None
+    if '://' not in value:
+        value = '//' + value
+    try:
+        host = urlsplit(value).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+
+    host = host.rstrip('.')
+    try:
+        host = host.encode('idna').decode('ascii')
+    except UnicodeError:
+        return None
+    if host.startswith('www.'):
+        host = host[len('www.'):]
+    if not host or len(host) > MAX_HOST_LENGTH or ' ' in host:
+        return None
+    return host
+
+
+def registrable_domain(host: str) -> str:
+    """
+    Регистрируемый домен хоста: accounts.example.co.uk -> example.co.uk.
+    IP адреса и хосты из одной метки (localhost) возвращаются как есть.
+
+    :param host: Хост из url_host
+    """
+
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+
+    labels = host.split('.')
+    # Самый длинный известный суффикс, иначе - последняя метка
+    suffix_size = 1
+    for size in range(len(labels) - 1, 1, -1):
+        if '.'.join(labels[-size:]) in PUBLIC_SUFFIXES:
+            suffix_size = size
+            break
+    if len(labels) <= suffix_size:
+        return host
+    return '.'.join(labels[-suffix_size - 1:])
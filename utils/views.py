@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from django.http import HttpRequest, HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.views import GraphQLView, HttpError
+from graphql.execution import ExecutionResult
+
+from .complexity import QueryTooComplex, check_query_cost, cost_extension
+from .graphql import (InvalidGraphQLDocument, PersistedQueryNotFound,
+                      get_persisted_document)
+from .metrics import graphql_operation_seconds, operation_label
+from .routers import database_routing
+from .tracing import can_see_tracing, trace_request
+
+
+class APIGraphQLView(GraphQLView):
+    """
+    GraphQL view API.
+
+    Поддерживает Automatic Persisted Queries: клиент может прислать
+    вместо текста запроса его sha256 (utils.graphql). Запросы без
+    мутаций читают с реплики (utils.routers), мутации выполняются
+    на основной базе. Слишком дорогие запросы отклоняются до выполнения
+    (utils.complexity), оценка возвращается в extensions.cost.
+    Время резолверов и SQL запросы трассируются (utils.tracing).
+    """
+
+    def get_persisted_query(
+        self, request: HttpRequest, data: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
+        """ extensions.persistedQuery из тела или параметров запроса """
+
+        extensions = data.get('extensions') or request.GET.get('extensions')
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+        if not isinstance(extensions, dict):
+            return None
+        persisted = extensions.get('persistedQuery')
+        return persisted if isinstance(persisted, dict) else None
+
+    def execute_graphql_request(
+        self,
+        request: HttpRequest,
+        data: Dict[str, Any],
+        query: Optional[str],
+        variables: Optional[Dict[str, Any]],
+        operation_name: Optional[str],
+        show_graphiql: bool = False,
+    ) -> Optional[ExecutionResult]:
+        persisted = self.get_persisted_query(request, data)
+        if not query and persisted is None:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        backend = self.get_backend(request)
+        try:
+            if persisted is not None:
+                document = get_persisted_document(
+                    backend, self.schema, persisted, query,
+                )
+            else:
+                document = backend.document_from_string(self.schema, query)
+        except PersistedQueryNotFound as error:
+            # Не ошибка запроса: клиент повторит его вместе с текстом
+            return ExecutionResult(errors=[error])
+        except Exception as error:
+            return ExecutionResult(errors=[error], invalid=True)
+
+        operation_type = document.get_operation_type(operation_name)
+        if request.method.lower() == 'get' and operation_type not in (None, 'query'):
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ['POST'],
+                f'Can only perform a {operation_type} operation from a POST request.',
+            ))
+
+        # Документ с ошибками проверки не выполняется - оценивать нечего
+        if isinstance(document, InvalidGraphQLDocument):
+            return document.execute()
+        try:
+            cost = check_query_cost(
+                self.schema, document.document_ast, operation_name, variables,
+            )
+        except QueryTooComplex as error:
+            return ExecutionResult(errors=[error], invalid=True)
+
+        extra_options = {}
+        if self.executor:
+            extra_options['executor'] = self.executor
+
+        with database_routing(request, read_only=operation_type == 'query'), \
+                trace_request(request, operation_name) as trace:
+            try:
+                result = document.execute(
+                    root_value=self.get_root_value(request),
+                    variable_values=variables,
+                    operation_name=operation_name,
+                    context_value=self.get_context(request),
+                    middleware=self.get_middleware(request),
+                    **extra_options
+                )
+            except Exception as error:
+                return ExecutionResult(errors=[error], invalid=True)
+
+        result.extensions['cost'] = cost_extension(cost)
+        if trace.detailed and can_see_tracing(request):
+            result.extensions['tracing'] = trace.as_extension()
+        return result
+
+    def get_response(
+        self, request: HttpRequest, data: Dict[str, Any],
+        show_graphiql: bool = False,
+    ) -> Tuple[Optional[str], int]:
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        with graphql_operation_seconds.labels(operation_label(operation_name)).time():
+            execution_result = self.execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql,
+            )
+        if not execution_result:
+            return None, 200
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            response['errors'] = [
+                self.format_error(error) for error in execution_result.errors
+            ]
+        if execution_result.invalid:
+            status_code = 400
+        else:
+            response['data'] = execution_result.data
+        # Стоимость запроса (utils.complexity) и прочие расширения
+        if execution_result.extensions:
+            response['extensions'] = execution_result.extensions
+        if self.batch:
+            response['id'] = id
+            response['status'] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code